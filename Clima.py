@@ -2,9 +2,22 @@ import subprocess
 import sys
 import importlib
 import os
+import time
+import random
+import asyncio
+import threading
 import requests
+import numpy as np
 import pandas as pd
-from typing import Optional, Dict
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, List, Tuple
+
+import gazetteer
+import metricas
+from cache import ArmazemSQLite, CacheTTL, normalizar_texto
+from concorrencia import BaldeTokens, VooUnico
 
 # ------------------ INSTALAR PACOTES ------------------ #
 def instalar_requisitos(arquivo_requisitos="requirements.txt"):
@@ -36,60 +49,372 @@ def instalar_requisitos(arquivo_requisitos="requirements.txt"):
 GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
 FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
 
+# ------------------ TRANSPORTE HTTP ------------------ #
+# Sessão única com keep-alive (evita handshake TCP+TLS a cada chamada),
+# orçamentos separados de conexão/leitura dentro de um prazo total por
+# chamada, nova tentativa com jitter em 429/5xx e, opcionalmente, uma segunda
+# requisição "hedge" quando a primeira passa do percentil de latência
+# observado para o host.
+TIMEOUT_CONEXAO_S = float(os.getenv("CLIMA_TIMEOUT_CONEXAO", "3.05"))
+TIMEOUT_LEITURA_S = float(os.getenv("CLIMA_TIMEOUT_LEITURA", "6"))
+TENTATIVAS_MAX = int(os.getenv("CLIMA_TENTATIVAS", "3"))
+PRAZO_TOTAL_S = float(os.getenv("CLIMA_PRAZO_TOTAL_S", "10"))   # tentativas + esperas, somadas
+PRAZO_MIN_TENTATIVA_S = 0.2   # com menos que isso sobrando, não vale outra tentativa
+BACKOFF_BASE_S = 0.25
+BACKOFF_MAX_S = 4.0
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+HEDGE_ATIVO = os.getenv("CLIMA_HEDGE", "0") == "1"
+HEDGE_PERCENTIL = 95
+HEDGE_MIN_AMOSTRAS = 20
+
+# Orçamento de requisições à Open-Meteo, comum a todas as sessões: em rajadas
+# as chamadas esperam a vez em vez de tomar 429
+TAXA_REQ_S = float(os.getenv("CLIMA_TAXA_REQ_S", "8"))
+RAJADA_REQ = float(os.getenv("CLIMA_RAJADA_REQ", "20"))
+_balde_open_meteo = BaldeTokens(TAXA_REQ_S, RAJADA_REQ)
+
+_sessao: Optional[requests.Session] = None
+_sessao_lock = threading.Lock()
+_executor_hedge = ThreadPoolExecutor(max_workers=8, thread_name_prefix="clima-hedge")
+
+# últimas chamadas (para diagnóstico) e latências por host (para o hedge)
+_tempos_http: deque = deque(maxlen=500)
+_latencias_host: Dict[str, deque] = {}
+
+def _get_sessao() -> requests.Session:
+    global _sessao
+    if _sessao is None:
+        with _sessao_lock:
+            if _sessao is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _sessao = s
+    return _sessao
+
+def _host(url: str) -> str:
+    return url.split("/")[2] if "://" in url else url
+
+def _percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[k]
+
+def _get_simples(url: str, params: Dict, timeout: Tuple[float, float]) -> requests.Response:
+    return _get_sessao().get(url, params=params, timeout=timeout)
+
+def _get_com_hedge(url: str, params: Dict, timeout: Tuple[float, float]) -> Tuple[requests.Response, bool]:
+    """
+    Dispara a requisição; se ela passar do percentil de latência do host,
+    dispara uma segunda igual (se houver token livre no orçamento da
+    Open-Meteo) e fica com a que responder primeiro.
+    """
+    amostras = _latencias_host.get(_host(url))
+    if not HEDGE_ATIVO or not amostras or len(amostras) < HEDGE_MIN_AMOSTRAS:
+        return _get_simples(url, params, timeout), False
+
+    limiar = _percentil(amostras, HEDGE_PERCENTIL) / 1000
+    primeira = _executor_hedge.submit(_get_simples, url, params, timeout)
+    feitas, _ = wait([primeira], timeout=limiar)
+    if feitas:
+        return primeira.result(), False
+
+    # o hedge também é uma requisição: só sai se couber no orçamento agora
+    if _balde_open_meteo.reservar(espera_max=0) is None:
+        metricas.contar("http_hedge_sem_orcamento")
+        return primeira.result(), False
+    segunda = _executor_hedge.submit(_get_simples, url, params, timeout)
+    pendentes = {primeira, segunda}
+    erro = None
+    while pendentes:
+        feitas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for f in feitas:
+            try:
+                return f.result(), f is segunda
+            except requests.exceptions.RequestException as e:
+                erro = e
+    raise erro
+
+def _espera_retry(tentativa: int, r: Optional[requests.Response]) -> float:
+    """Backoff exponencial com jitter completo; respeita Retry-After curto."""
+    if r is not None and r.status_code == 429:
+        try:
+            return min(BACKOFF_MAX_S, float(r.headers.get("Retry-After", "")))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (tentativa - 1)))
+
+def _http_get(url: str, params: Dict) -> requests.Response:
+    """
+    GET pela sessão compartilhada, com retry/backoff e hedge opcional, tudo
+    dentro de PRAZO_TOTAL_S: timeouts e esperas são cortados ao que sobra.
+    Lança requests.exceptions.RequestException em caso de falha.
+    """
+    inicio = time.perf_counter()
+    prazo = inicio + PRAZO_TOTAL_S
+    r, erro, hedge, tentativa = None, None, False, 0
+    for tentativa in range(1, TENTATIVAS_MAX + 1):
+        espera = _balde_open_meteo.reservar(espera_max=max(0.0, prazo - time.perf_counter() - PRAZO_MIN_TENTATIVA_S))
+        if espera is None:
+            metricas.contar("http_prazo_esgotado")
+            erro = erro or requests.exceptions.Timeout("sem orçamento da Open-Meteo dentro do prazo")
+            break
+        if espera:
+            metricas.observar("espera_orcamento_open_meteo", espera)
+            time.sleep(espera)
+        restante = prazo - time.perf_counter()
+        timeout = (min(TIMEOUT_CONEXAO_S, restante), min(TIMEOUT_LEITURA_S, restante))
+        t0 = time.perf_counter()
+        try:
+            r, hedge = _get_com_hedge(url, params, timeout)
+            erro = None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            r, erro = None, e
+        else:
+            _latencias_host.setdefault(_host(url), deque(maxlen=200)).append(
+                (time.perf_counter() - t0) * 1000
+            )
+        if r is not None and r.status_code not in STATUS_RETENTAVEIS:
+            break
+        if tentativa == TENTATIVAS_MAX:
+            break
+        recuo = _espera_retry(tentativa, r)
+        if prazo - time.perf_counter() - recuo < PRAZO_MIN_TENTATIVA_S:
+            metricas.contar("http_prazo_esgotado")
+            break
+        time.sleep(recuo)
+
+    metricas.observar("http_get", time.perf_counter() - inicio)
+    if tentativa > 1:
+        metricas.contar("http_retentativas", tentativa - 1)
+    if r is None or r.status_code >= 400:
+        metricas.contar("http_erros")
+    _tempos_http.append({
+        "host": _host(url),
+        "ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "status": r.status_code if r is not None else None,
+        "tentativas": tentativa,
+        "hedge": hedge,
+        "erro": type(erro).__name__ if erro else None,
+    })
+    if r is None:
+        raise erro
+    r.raise_for_status()
+    return r
+
+def tempos_http(n: int = 50) -> List[Dict]:
+    """Últimas `n` chamadas HTTP (host, ms, status, tentativas, hedge, erro)."""
+    return list(_tempos_http)[-n:]
+
+def resumo_tempos_http() -> Dict[str, Dict]:
+    """Latência p50/p95 e contagem de chamadas por host."""
+    por_host: Dict[str, List[float]] = {}
+    for t in list(_tempos_http):
+        por_host.setdefault(t["host"], []).append(t["ms"])
+    return {
+        h: {"chamadas": len(v), "p50_ms": _percentil(v, 50), "p95_ms": _percentil(v, 95)}
+        for h, v in por_host.items()
+    }
+
+# ------------------ CACHE DE PREVISÃO ------------------ #
+# A Open-Meteo roda os modelos ~1x por hora; dentro desse intervalo a resposta
+# para a mesma célula da grade é idêntica. As coordenadas são arredondadas para a
+# grade (~5 km) e a entrada vence quando a próxima rodada deve estar publicada.
+GRADE_MODELO_GRAUS = 0.05
+INTERVALO_MODELO_S = 3600
+ATRASO_MODELO_S = 10 * 60  # margem até a rodada aparecer na API
+
+_cache_previsao = CacheTTL(max_itens=512)
+_voo_previsao = VooUnico()   # N sessões pedindo o mesmo lugar -> 1 requisição
+
+def _snap(valor: float, grade: float = GRADE_MODELO_GRAUS) -> float:
+    """Arredonda uma coordenada para o ponto de grade mais próximo."""
+    return round(round(float(valor) / grade) * grade, 4)
+
+def _chave_previsao(lat: float, lon: float, tz: str) -> Tuple[float, float, str]:
+    return _snap(lat), _snap(lon), (tz or "auto")
+
+def proxima_atualizacao_modelo(agora: Optional[float] = None) -> float:
+    """
+    Epoch (s) em que a próxima rodada do modelo deve estar disponível.
+    """
+    agora = time.time() if agora is None else agora
+    base = agora - ATRASO_MODELO_S
+    return (base // INTERVALO_MODELO_S + 1) * INTERVALO_MODELO_S + ATRASO_MODELO_S
+
+def estatisticas_cache_previsao() -> Dict:
+    """Hits/misses/tamanho do cache de previsões (para diagnóstico)."""
+    return _cache_previsao.estatisticas()
+
+# ------------------ CACHE DE GEOCODIFICAÇÃO ------------------ #
+# Nomes de lugares praticamente não mudam de coordenada: o resultado fica num
+# LRU em memória e num SQLite ao lado do app (sobrevive a reinícios).
+# Buscas sem resultado também são guardadas, mas vencem bem antes.
+GEOCODE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite3")
+TTL_GEOCODE_S = 30 * 24 * 3600
+TTL_GEOCODE_NEGATIVO_S = 6 * 3600
+
+_NAO_ENCONTRADO = object()
+_cache_geocode = CacheTTL(max_itens=2048, ttl=TTL_GEOCODE_S)
+_armazem_geocode = ArmazemSQLite(GEOCODE_DB, tabela="geocode")
+_voo_geocode = VooUnico()
+
+def _chave_geocode(city: str, country_hint: Optional[str]) -> str:
+    return f"{normalizar_texto(city)}|{normalizar_texto(country_hint or '')}"
+
+def estatisticas_cache_geocode() -> Dict:
+    """Hits/misses do LRU de geocodificação (o SQLite atende os misses)."""
+    return _cache_geocode.estatisticas()
+
 # ------------------ FUNÇÕES DE API ------------------ #
+@metricas.cronometrado("geocode")
 def geocode(query: str) -> Optional[Dict]:
     """
     Faz geocodificação de uma cidade, retornando coordenadas.
+    Consulta primeiro o cache em memória, depois o SQLite, o gazetteer
+    offline e só então a API.
     """
-    try:
-        parts = [p.strip() for p in query.split(",")]
-        city = parts[0]
-        country_hint = parts[1].lower() if len(parts) > 1 else None
+    parts = [p.strip() for p in (query or "").split(",")]
+    city = parts[0]
+    country_hint = parts[1].lower() if len(parts) > 1 else None
+    if not city:
+        return None
+
+    chave = _chave_geocode(city, country_hint)
+    cacheado = _cache_geocode.get(chave, _NAO_ENCONTRADO)
+    if cacheado is not _NAO_ENCONTRADO:
+        metricas.contar("geocode_cache_memoria")
+        return cacheado
+
+    encontrado, valor, expira_em = _armazem_geocode.get(chave)
+    if encontrado:
+        metricas.contar("geocode_cache_sqlite")
+        _cache_geocode.set(chave, valor, expira_em=expira_em)
+        return valor
+
+    # Gazetteer offline (GeoNames): nome ou nome alternativo, sem acentos nem
+    # maiúsculas. Exibe o nome do GeoNames quando é o mesmo que o digitado
+    # ("sao paulo" -> "São Paulo"); se bateu por um alternativo ("Lisboa" ->
+    # Lisbon), mantém o que o usuário digitou.
+    offline = gazetteer.procurar(city, country_hint)
+    if offline is not None:
+        metricas.contar("geocode_gazetteer")
+        if normalizar_texto(offline["name"]) != normalizar_texto(city):
+            offline = {**offline, "name": city if not city.islower() else city.title()}
+        _cache_geocode.set(chave, offline)
+        return offline
+
+    metricas.contar("geocode_api")
+    return _voo_geocode.executar(chave, lambda: _geocode_api(city, country_hint, chave))
 
-        r = requests.get(GEOCODE_URL, params={
+def _geocode_api(city: str, country_hint: Optional[str], chave: str) -> Optional[Dict]:
+    cacheado = _cache_geocode.get(chave, _NAO_ENCONTRADO)
+    if cacheado is not _NAO_ENCONTRADO:
+        return cacheado
+    try:
+        r = _http_get(GEOCODE_URL, params={
             "name": city,
             "count": 10,
             "language": "pt",
             "format": "json"
-        }, timeout=10)
-        r.raise_for_status()
+        })
         data = r.json()
-        results = data.get("results") or []
-        if not results:
-            return None
+    except requests.exceptions.RequestException:
+        # falha de rede não é "não encontrado": não entra no cache
+        return None
 
+    results = data.get("results") or []
+    escolhido = None
+    if results:
+        escolhido = results[0]
         if country_hint:
+            # mesma normalização da chave do cache: "França" e "Franca" escolhem igual
+            alvo = normalizar_texto(country_hint)
             def match_country(res):
-                cc = (res.get("country_code") or "").lower()
-                nm = (res.get("country") or "").lower()
-                return country_hint in (cc, nm)
+                cc = normalizar_texto(res.get("country_code") or "")
+                nm = normalizar_texto(res.get("country") or "")
+                return alvo in (cc, nm)
             filtered = [res for res in results if match_country(res)]
             if filtered:
-                return filtered[0]
+                escolhido = filtered[0]
 
-        return results[0]
-    except requests.exceptions.RequestException:
-        return None
+    ttl = TTL_GEOCODE_S if escolhido else TTL_GEOCODE_NEGATIVO_S
+    _cache_geocode.set(chave, escolhido, ttl=ttl)
+    _armazem_geocode.set(chave, escolhido, ttl=ttl)
+    return escolhido
+
+# Variáveis horárias pedidas: clima + irradiância (para estimar a geração solar).
+# A radiação da Open-Meteo é a média da hora que TERMINA no horário informado.
+VARIAVEIS_HORARIAS = [
+    "temperature_2m",
+    "precipitation",
+    "shortwave_radiation",
+    "direct_radiation",
+    "diffuse_radiation",
+    "direct_normal_irradiance",
+    "cloud_cover",
+]
+DIAS_PREVISAO = int(os.getenv("CLIMA_DIAS_PREVISAO", "7"))
 
+def _params_previsao(lat, lon, tz) -> Dict:
+    """
+    Parâmetros da consulta de previsão. `lat`/`lon`/`tz` podem ser listas
+    separadas por vírgula (consulta de vários locais numa requisição só).
+    """
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": tz,
+        "timeformat": "unixtime",
+        "forecast_days": DIAS_PREVISAO,
+        "current": "temperature_2m,precipitation,weather_code",
+        "hourly": ",".join(VARIAVEIS_HORARIAS),
+        "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum"
+    }
+
+@metricas.cronometrado("get_forecast")
 def get_forecast(lat: float, lon: float, tz: str = "auto") -> Optional[Dict]:
     """
     Consulta a API de previsão e retorna JSON bruto.
+    Respostas ficam no cache do processo até a próxima rodada do modelo.
     """
+    chave = _chave_previsao(lat, lon, tz)
+    cacheado = _cache_previsao.get(chave)
+    if cacheado is not None:
+        metricas.contar("previsao_cache_hit")
+        return cacheado
+
+    metricas.contar("previsao_cache_miss")
+    return _voo_previsao.executar(chave, lambda: _buscar_previsao(chave))
+
+def _buscar_previsao(chave: Tuple[float, float, str]) -> Optional[Dict]:
+    # outra chamada pode ter preenchido o cache entre a consulta e o voo
+    cacheado = _cache_previsao.get(chave)
+    if cacheado is not None:
+        return cacheado
     try:
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "timezone": tz,
-            "current": "temperature_2m,precipitation,weather_code",
-            "hourly": "temperature_2m,precipitation",
-            "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum"
-        }
-        r = requests.get(FORECAST_URL, params=params, timeout=10)
-        r.raise_for_status()
-        return r.json()
+        lat_grade, lon_grade, tz = chave
+        params = _params_previsao(lat_grade, lon_grade, tz)
+        r = _http_get(FORECAST_URL, params=params)
+        data = r.json()
     except requests.exceptions.RequestException:
         return None
 
+    _cache_previsao.set(chave, data, expira_em=proxima_atualizacao_modelo())
+    return data
+
+def estatisticas_chamadas() -> Dict:
+    """Coalescência (single-flight) e orçamento de requisições à Open-Meteo."""
+    return {
+        "voo_previsao": _voo_previsao.estatisticas(),
+        "voo_geocode": _voo_geocode.estatisticas(),
+        "orcamento_open_meteo": _balde_open_meteo.estatisticas(),
+    }
+
 # ------------------ LISTA DE LUGARES ------------------ #
 lugares_cadastrados = [
     {"nome": "São Paulo", "latitude": -23.5475, "longitude": -46.6361, "timezone": "America/Sao_Paulo"}
@@ -108,13 +433,32 @@ def resolver_timezone(lugar: Dict, wx: Dict) -> str:
     return tz
 
 # ------------------ CONSULTAR API ------------------ #
-def consultar_api(lugar):
+def _arrays_bloco(bloco: Dict) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
     """
-    Consulta a API e retorna apenas:
-    - hourly_hoje: DataFrame com as 24h do dia atual no timezone correto
-    - daily_df: DataFrame com previsões diárias
+    Separa um bloco "hourly"/"daily" em epoch int64 + colunas float32.
+    Valores nulos da API viram NaN.
+    """
+    epoch = np.asarray(bloco["time"], dtype=np.int64)
+    colunas = {
+        nome: np.asarray(valores, dtype=np.float32)
+        for nome, valores in bloco.items()
+        if nome != "time"
+    }
+    return epoch, colunas
+
+def _montar_df(epoch: np.ndarray, colunas: Dict[str, np.ndarray], tz: str) -> pd.DataFrame:
+    df = pd.DataFrame(colunas)
+    df.insert(0, "time", epoch)
+    # epoch inteiro → datetime sem passar por parsing de string
+    df["date"] = pd.to_datetime(epoch, unit="s", utc=True).tz_convert(tz)
+    return df
+
+@metricas.cronometrado("converter_previsao")
+def _converter_previsao(lugar: Dict, forecast: Optional[Dict]):
+    """
+    Converte o JSON bruto da previsão em (hourly_hoje, daily_df).
+    Espera `timeformat=unixtime`: os horários chegam como epoch inteiro.
     """
-    forecast = get_forecast(lugar["latitude"], lugar["longitude"], lugar.get("timezone", "auto"))
     if not forecast:
         return None, None
 
@@ -124,33 +468,184 @@ def consultar_api(lugar):
     if not hourly or not daily:
         return None, None
 
-    # ---------- Processa dados horários ----------
-    hourly_df = pd.DataFrame(hourly)
-
     # Descobre timezone válido
     tz = resolver_timezone(lugar, forecast)
 
-    # Converte para datetime com fuso horário
-    hourly_df["date"] = pd.to_datetime(hourly_df["time"], utc=True).dt.tz_convert(tz)
-    hourly_df["temperature_2m"] = pd.to_numeric(hourly_df["temperature_2m"], errors="coerce")
-    if "precipitation" in hourly_df.columns:
-        hourly_df["precipitation"] = pd.to_numeric(hourly_df["precipitation"], errors="coerce")
+    # ---------- Processa dados horários ----------
+    epoch_h, colunas_h = _arrays_bloco(hourly)
 
-    # Mantém somente as próximas 24h do dia atual no timezone local
+    # Mantém somente as 24h do dia atual no timezone local (filtro no epoch)
     hoje_local = pd.Timestamp.now(tz=tz).normalize()
     amanha_local = hoje_local + pd.Timedelta(days=1)
-    mask_hoje = (hourly_df["date"] >= hoje_local) & (hourly_df["date"] < amanha_local)
-    hourly_hoje = hourly_df.loc[mask_hoje].reset_index(drop=True)
+    ini, fim = hoje_local.value // 10**9, amanha_local.value // 10**9
+    mask_hoje = (epoch_h >= ini) & (epoch_h < fim)
+    if not mask_hoje.any():
+        mask_hoje = np.arange(len(epoch_h)) < 24
 
-    if hourly_hoje.empty:
-        hourly_hoje = hourly_df.head(24).reset_index(drop=True)
+    hourly_hoje = _montar_df(
+        epoch_h[mask_hoje], {k: v[mask_hoje] for k, v in colunas_h.items()}, tz
+    )
 
     # ---------- Processa dados diários ----------
-    daily_df = pd.DataFrame(daily)
-    daily_df["date"] = pd.to_datetime(daily_df["time"], utc=True).dt.tz_convert(tz)
-
-    for col in ["temperature_2m_min", "temperature_2m_max", "precipitation_sum"]:
-        if col in daily_df.columns:
-            daily_df[col] = pd.to_numeric(daily_df[col], errors="coerce")
+    epoch_d, colunas_d = _arrays_bloco(daily)
+    daily_df = _montar_df(epoch_d, colunas_d, tz)
 
     return hourly_hoje, daily_df
+
+@metricas.cronometrado("converter_horario")
+def _converter_horario(lugar: Dict, forecast: Optional[Dict]) -> Optional[pd.DataFrame]:
+    """Converte o bloco horário inteiro (todo o horizonte da previsão)."""
+    if not forecast or not forecast.get("hourly"):
+        return None
+    epoch_h, colunas_h = _arrays_bloco(forecast["hourly"])
+    return _montar_df(epoch_h, colunas_h, resolver_timezone(lugar, forecast))
+
+# Conversões prontas, compartilhadas entre sessões: enquanto o JSON da previsão
+# for o mesmo objeto do cache e o dia local não virar, todas as sessões recebem
+# os MESMOS DataFrames (somente leitura), em vez de uma cópia cada.
+_cache_convertido = CacheTTL(max_itens=1024, ttl=INTERVALO_MODELO_S + ATRASO_MODELO_S)
+
+def _convertido(tipo: str, lugar: Dict, forecast: Optional[Dict], converter):
+    if not forecast:
+        return converter(lugar, forecast)
+    tz = resolver_timezone(lugar, forecast)
+    hoje = pd.Timestamp.now(tz=tz).date()
+    chave = (tipo, id(forecast), tz)
+    item = _cache_convertido.get(chave)
+    if item is not None and item[0] is forecast and item[1] == hoje:
+        metricas.contar("conversao_compartilhada")
+        return item[2]
+    resultado = converter(lugar, forecast)
+    _cache_convertido.set(chave, (forecast, hoje, resultado))
+    return resultado
+
+def ids_compartilhados() -> set:
+    """ids dos DataFrames que estão no cache de conversões (para contabilizar memória)."""
+    ids = set()
+    for _, _, resultado in _cache_convertido.valores():
+        for df in (resultado if isinstance(resultado, tuple) else (resultado,)):
+            if df is not None:
+                ids.add(id(df))
+    return ids
+
+def consultar_horario(lugar: Dict) -> Optional[pd.DataFrame]:
+    """
+    Previsão horária de todo o horizonte (não só hoje), com as variáveis de
+    irradiância. Usa o mesmo cache de consultar_api.
+    """
+    forecast = get_forecast(lugar["latitude"], lugar["longitude"], lugar.get("timezone", "auto"))
+    return _convertido("horario", lugar, forecast, _converter_horario)
+
+def consultar_api(lugar):
+    """
+    Consulta a API e retorna apenas:
+    - hourly_hoje: DataFrame com as 24h do dia atual no timezone correto
+    - daily_df: DataFrame com previsões diárias
+    """
+    forecast = get_forecast(lugar["latitude"], lugar["longitude"], lugar.get("timezone", "auto"))
+    return _convertido("previsao", lugar, forecast, _converter_previsao)
+
+# ------------------ CONSULTA EM LOTE ------------------ #
+# A Open-Meteo aceita listas de latitude/longitude/timezone separadas por vírgula
+# e devolve uma lista de previsões na mesma ordem. Os lugares são agrupados em
+# blocos e os blocos saem em paralelo (aiohttp), com limite de concorrência.
+LOTE_MAX_LOCAIS = 50
+LOTE_CONCORRENCIA = 4
+
+async def _buscar_bloco(session, sem, bloco: List[Tuple[float, float, str]]) -> List[Optional[Dict]]:
+    params = _params_previsao(
+        ",".join(str(lat) for lat, _, _ in bloco),
+        ",".join(str(lon) for _, lon, _ in bloco),
+        ",".join(tz for _, _, tz in bloco),
+    )
+    async with sem:
+        # a Open-Meteo conta cada local do bloco como uma chamada
+        espera = _balde_open_meteo.reservar(len(bloco))
+        if espera:
+            metricas.observar("espera_orcamento_open_meteo", espera)
+            await asyncio.sleep(espera)
+        try:
+            async with session.get(FORECAST_URL, params=params) as r:
+                r.raise_for_status()
+                data = await r.json()
+        except Exception:
+            return [None] * len(bloco)
+    # um único local vem como objeto, vários vêm como lista
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or len(data) != len(bloco):
+        return [None] * len(bloco)
+    return data
+
+async def _buscar_lote(chaves: List[Tuple[float, float, str]]) -> Dict[Tuple, Optional[Dict]]:
+    import aiohttp
+
+    blocos = [chaves[i:i + LOTE_MAX_LOCAIS] for i in range(0, len(chaves), LOTE_MAX_LOCAIS)]
+    sem = asyncio.Semaphore(LOTE_CONCORRENCIA)
+    timeout = aiohttp.ClientTimeout(sock_connect=TIMEOUT_CONEXAO_S, sock_read=TIMEOUT_LEITURA_S)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        respostas = await asyncio.gather(*(_buscar_bloco(session, sem, b) for b in blocos))
+
+    resultado = {}
+    for bloco, previsoes in zip(blocos, respostas):
+        resultado.update(zip(bloco, previsoes))
+    return resultado
+
+def _rodar_async(coro):
+    """Roda uma corrotina a partir de código síncrono (com ou sem loop ativo)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+def consultar_api_lote(lugares: List[Dict]) -> List[Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]]:
+    """
+    Consulta a previsão de vários lugares de uma vez.
+    Retorna uma lista de (hourly_hoje, daily_df) na mesma ordem de `lugares`.
+    Lugares já presentes no cache não geram requisição.
+    """
+    chaves = [
+        _chave_previsao(l["latitude"], l["longitude"], l.get("timezone", "auto"))
+        for l in lugares
+    ]
+
+    previsoes, _ = _previsoes_lote(chaves)
+    return [_convertido("previsao", l, previsoes.get(c), _converter_previsao) for l, c in zip(lugares, chaves)]
+
+
+def _previsoes_lote(chaves: List[Tuple[float, float, str]]) -> Tuple[Dict[Tuple, Optional[Dict]], List[Tuple]]:
+    """
+    JSON de cada chave: do cache ou de uma única rodada de requisições em lote.
+    Retorna (previsões, chaves que precisaram ir à API).
+    """
+    previsoes = {}
+    faltando = []
+    for chave in dict.fromkeys(chaves):
+        cacheado = _cache_previsao.get(chave)
+        if cacheado is not None:
+            previsoes[chave] = cacheado
+        else:
+            faltando.append(chave)
+
+    if faltando:
+        expira_em = proxima_atualizacao_modelo()
+        for chave, data in _rodar_async(_buscar_lote(faltando)).items():
+            if data:
+                _cache_previsao.set(chave, data, expira_em=expira_em)
+            previsoes[chave] = data
+    return previsoes, faltando
+
+
+def aquecer_previsoes(lugares: List[Dict]) -> Tuple[int, int]:
+    """
+    Deixa no cache a previsão de `lugares` (sem converter em DataFrame).
+    Retorna (buscados na API, falhas). Usado pela pré-busca em segundo plano.
+    """
+    chaves = [
+        _chave_previsao(l["latitude"], l["longitude"], l.get("timezone", "auto"))
+        for l in lugares
+    ]
+    previsoes, faltando = _previsoes_lote(chaves)
+    return len(faltando), sum(1 for c in faltando if not previsoes.get(c))
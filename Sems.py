@@ -0,0 +1,265 @@
+"""
+Integração (opcional) com o SEMS Portal da GoodWe.
+
+O pacote `sems_portal_api` só é importado quando alguma função daqui é usada,
+para não pesar no carregamento do app de quem não abre a parte da usina.
+"""
+import asyncio
+import importlib
+import importlib.util
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+
+# ------------------ CARREGAMENTO SOB DEMANDA ------------------ #
+def disponivel() -> bool:
+    """True se o pacote sems_portal_api estiver instalado."""
+    return importlib.util.find_spec("sems_portal_api") is not None
+
+
+@lru_cache(maxsize=None)
+def carregar_api() -> SimpleNamespace:
+    """
+    Importa o sems_portal_api na primeira chamada e devolve as funções usadas
+    pelo app. Lança ImportError se o pacote não estiver instalado.
+    """
+    sems_auth = importlib.import_module("sems_portal_api.sems_auth")
+    sems_region = importlib.import_module("sems_portal_api.sems_region")
+    sems_home_wrapper = importlib.import_module("sems_portal_api.sems_home_wrapper")
+    sems_plant_details = importlib.import_module("sems_portal_api.sems_plant_details")
+    sems_charts = importlib.import_module("sems_portal_api.sems_charts")
+    return SimpleNamespace(
+        login_to_sems=sems_auth.login_to_sems,
+        login_response_to_token=sems_auth.login_response_to_token,
+        get_station_ids=getattr(sems_auth, "get_station_ids", None),
+        set_region=sems_region.set_region,
+        get_collated_plant_details=sems_home_wrapper.get_collated_plant_details,
+        get_plant_power_chart=getattr(sems_charts, "get_plant_power_chart", None),
+        sems_plant_details=sems_plant_details,
+        sems_charts=sems_charts,
+    )
+
+
+# ------------------ TOKEN ------------------ #
+# Helper: extrai token de diferentes respostas de forks
+def _token_from_auth(auth):
+    if isinstance(auth, str) and auth:
+        return auth
+    if isinstance(auth, dict):
+        for path in [
+            ("token",),
+            ("data", "token"),
+            ("result", "token"),
+            ("Authorization",),
+        ]:
+            cur = auth
+            for k in path:
+                if not isinstance(cur, dict) or k not in cur:
+                    cur = None
+                    break
+                cur = cur[k]
+            if isinstance(cur, str) and cur:
+                return cur
+    return None
+
+
+# ------------------ LOOP ASSÍNCRONO DO PROCESSO ------------------ #
+# O Streamlit reexecuta o script a cada interação; para reaproveitar a mesma
+# aiohttp.ClientSession entre reruns, todo o I/O do SEMS roda num event loop
+# próprio, numa thread de fundo que vive enquanto o processo viver.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="sems-loop", daemon=True).start()
+        return _loop
+
+
+def rodar(coro, timeout: Optional[float] = 60):
+    """Executa uma corrotina no loop do SEMS e espera o resultado (chamada síncrona)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+# ------------------ CLIENTE ------------------ #
+TTL_TOKEN_S = 6 * 3600
+CONCORRENCIA_PADRAO = 8
+
+
+def _falha_de_autenticacao(exc: BaseException) -> bool:
+    """
+    401 explícito ou resposta com data=None (o SEMS devolve 200 com data=None
+    quando o token expira, e o sems_portal_api quebra ao indexar esse None).
+    Outros KeyError/TypeError (id de usina errado, formato novo da resposta)
+    não são de login: seguem para o tratamento de erro de cada usina.
+    """
+    if getattr(exc, "status", None) == 401:
+        return True
+    return isinstance(exc, TypeError) and "'NoneType' object is not subscriptable" in str(exc)
+
+
+class ClienteSems:
+    """
+    Cliente do SEMS para uma conta:
+    - faz login uma vez e guarda o token até expirar (ou até um 401);
+    - reaproveita uma única aiohttp.ClientSession;
+    - busca detalhes/gráficos de várias usinas em paralelo, com limite de concorrência.
+
+    `api` permite trocar o sems_portal_api por funções falsas (testes locais).
+    """
+
+    def __init__(self, conta: str, senha: str, regiao: Optional[str] = None, api=None,
+                 concorrencia: int = CONCORRENCIA_PADRAO, ttl_token_s: float = TTL_TOKEN_S):
+        self.conta = conta
+        self._senha = senha
+        self.regiao = regiao
+        self.concorrencia = concorrencia
+        self.ttl_token_s = ttl_token_s
+        self._api = api
+        self._sessao = None
+        self._token: Optional[str] = None
+        self._token_expira = 0.0
+        self._lock_login: Optional[asyncio.Lock] = None
+        self.logins = 0
+
+    @property
+    def api(self):
+        if self._api is None:
+            self._api = carregar_api()
+        return self._api
+
+    async def _get_sessao(self):
+        if self._sessao is None or self._sessao.closed:
+            import aiohttp
+            self._sessao = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concorrencia * 2, keepalive_timeout=60),
+            )
+        return self._sessao
+
+    async def token(self, recusado: Optional[str] = None) -> str:
+        """
+        Token válido (faz login só se não houver um em cache). `recusado` é o
+        token que o servidor rejeitou: várias chamadas paralelas que falham
+        com o mesmo token geram um único novo login.
+        """
+        if self._lock_login is None:
+            self._lock_login = asyncio.Lock()
+        async with self._lock_login:
+            valido = self._token and time.time() < self._token_expira
+            if valido and self._token != recusado:
+                return self._token
+            if self.regiao:
+                self.api.set_region(self.regiao)
+            dados = await self.api.login_to_sems(await self._get_sessao(), self.conta, self._senha)
+            if not dados:
+                raise PermissionError("Login no SEMS recusado (conta ou senha inválidas).")
+            conversor = getattr(self.api, "login_response_to_token", None)
+            token = conversor(dados) if conversor else _token_from_auth(dados)
+            if not token:
+                raise PermissionError("Login no SEMS não retornou token.")
+            self._token = token
+            self._token_expira = time.time() + self.ttl_token_s
+            self.logins += 1
+            return token
+
+    def invalidar_token(self) -> None:
+        self._token, self._token_expira = None, 0.0
+
+    async def _chamar(self, func, *args, **kwargs):
+        """Chama `func(session, ..., token=...)`; em falha de auth, renova o token e tenta de novo."""
+        sessao = await self._get_sessao()
+        token = await self.token()
+        try:
+            dados = await func(sessao, *args, token=token, **kwargs)
+        except Exception as e:
+            if not _falha_de_autenticacao(e):
+                raise
+        else:
+            if dados is not None:   # data=None devolvido direto (ex.: gráficos) também é token vencido
+                return dados
+        token = await self.token(recusado=token)
+        return await func(sessao, *args, token=token, **kwargs)
+
+    async def usinas(self) -> List[str]:
+        """Ids das usinas (power stations) da conta."""
+        if self.api.get_station_ids is None:
+            return []
+        dados = await self._chamar(self.api.get_station_ids)
+        if isinstance(dados, list):
+            return [str(d.get("id", d)) if isinstance(d, dict) else str(d) for d in dados]
+        return [str(dados)] if dados else []
+
+    async def detalhes(self, plant_id: str) -> Dict:
+        return await self._chamar(self.api.get_collated_plant_details, power_station_id=plant_id)
+
+    async def grafico(self, plant_id: str, dia: datetime):
+        return await self._chamar(self.api.get_plant_power_chart, plant_id=plant_id, targetDate=dia)
+
+    async def _em_paralelo(self, chamadas: Dict[object, "asyncio.Future"]) -> Dict[object, object]:
+        sem = asyncio.Semaphore(self.concorrencia)
+
+        async def limitada(coro):
+            async with sem:
+                try:
+                    return await coro
+                except Exception as e:  # uma usina com erro não derruba as outras
+                    return e
+
+        chaves = list(chamadas)
+        resultados = await asyncio.gather(*(limitada(chamadas[k]) for k in chaves))
+        return dict(zip(chaves, resultados))
+
+    async def detalhes_varias(self, plant_ids: Iterable[str]) -> Dict[str, object]:
+        """Detalhes de várias usinas em paralelo: {id: dados ou Exception}."""
+        await self.token()  # login (se preciso) antes do fan-out
+        return await self._em_paralelo({pid: self.detalhes(pid) for pid in plant_ids})
+
+    async def graficos_varias(self, plant_ids: Iterable[str], dia: datetime) -> Dict[str, object]:
+        """Curva de potência de várias usinas para `dia`: {id: dados ou Exception}."""
+        await self.token()
+        return await self._em_paralelo({pid: self.grafico(pid, dia) for pid in plant_ids})
+
+    async def graficos_dias(self, plant_id: str, dias: Iterable[datetime]) -> Dict[object, object]:
+        """Curva de potência de uma usina em vários dias: {dia: dados ou Exception}."""
+        await self.token()
+        return await self._em_paralelo({dia: self.grafico(plant_id, dia) for dia in dias})
+
+    async def fechar(self) -> None:
+        if self._sessao is not None and not self._sessao.closed:
+            await self._sessao.close()
+
+
+# Um cliente por conta no processo (sobrevive aos reruns do Streamlit)
+_clientes: Dict[tuple, ClienteSems] = {}
+_clientes_lock = threading.Lock()
+
+
+def cliente_para(conta: str, senha: str, regiao: Optional[str] = None) -> ClienteSems:
+    """Devolve o cliente (com token e sessão em cache) desta conta."""
+    chave = (conta, regiao)
+    with _clientes_lock:
+        cliente = _clientes.get(chave)
+        if cliente is None or cliente._senha != senha:
+            cliente = ClienteSems(conta, senha, regiao)
+            _clientes[chave] = cliente
+        return cliente
+
+
+def descartar_cliente(conta: str) -> None:
+    """Remove (e fecha) os clientes da conta — usado no logout."""
+    with _clientes_lock:
+        chaves = [k for k in _clientes if k[0] == conta]
+        clientes = [_clientes.pop(k) for k in chaves]
+    for c in clientes:
+        try:
+            rodar(c.fechar(), timeout=5)
+        except Exception:
+            pass
@@ -0,0 +1,134 @@
+"""
+Pré-busca de previsões em segundo plano.
+
+Os lugares que as pessoas realmente olham (lugares_cadastrados + os
+ss.wx_places de cada sessão) ficam registrados aqui. Logo depois de cada
+rodada do modelo da Open-Meteo, uma thread renova o cache desses lugares,
+em ondas espalhadas por uma janela (jitter) e com concorrência limitada
+pelo próprio lote do Clima. Assim, "Consultar previsão" e o chat quase
+sempre encontram o cache quente.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+import Clima
+
+JANELA_JITTER_S = float(os.getenv("CLIMA_PREFETCH_JANELA", "120"))
+TAMANHO_ONDA = Clima.LOTE_MAX_LOCAIS
+ESQUECER_APOS_S = 24 * 3600   # lugar que nenhuma sessão registra há 1 dia sai da lista
+
+
+class AgendadorPrevisoes:
+    """Thread única que mantém quentes as previsões dos lugares registrados."""
+
+    def __init__(self, janela_s: float = JANELA_JITTER_S, tamanho_onda: int = TAMANHO_ONDA):
+        self.janela_s = janela_s
+        self.tamanho_onda = tamanho_onda
+        self._lugares: Dict[tuple, Dict] = {}      # chave da previsão -> lugar
+        self._vistos: Dict[tuple, float] = {}      # chave -> último registro
+        self._fila: deque = deque()                # ondas pendentes (listas de lugares)
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ultima_atualizacao: Optional[float] = None
+        self.proxima_rodada: Optional[float] = None
+        self.buscados = 0
+        self.falhas = 0
+
+    # ---------- registro ----------
+    def registrar(self, lugares: Iterable[Dict]) -> None:
+        """Inclui lugares na pré-busca (chamar a cada rerun é barato)."""
+        agora = time.time()
+        novos = False
+        with self._lock:
+            for l in lugares:
+                chave = Clima._chave_previsao(l["latitude"], l["longitude"], l.get("timezone", "auto"))
+                novos |= chave not in self._lugares
+                self._lugares[chave] = l
+                self._vistos[chave] = agora
+        if novos:
+            self._acordar.set()   # lugar novo: aquece já, sem esperar a próxima rodada
+
+    def _lugares_ativos(self) -> List[Dict]:
+        limite = time.time() - ESQUECER_APOS_S
+        with self._lock:
+            for chave in [c for c, t in self._vistos.items() if t < limite]:
+                self._lugares.pop(chave, None)
+                self._vistos.pop(chave, None)
+            return list(self._lugares.values())
+
+    # ---------- estado ----------
+    def estado(self) -> Dict:
+        """Profundidade da fila, idade da última atualização e contadores."""
+        with self._lock:
+            fila = sum(len(onda) for onda in self._fila)
+            n = len(self._lugares)
+        ultima = self.ultima_atualizacao
+        return {
+            "ativo": bool(self._thread and self._thread.is_alive()),
+            "lugares": n,
+            "fila": fila,
+            "idade_ultima_atualizacao_s": None if ultima is None else round(time.time() - ultima, 1),
+            "proxima_rodada": self.proxima_rodada,
+            "buscados": self.buscados,
+            "falhas": self.falhas,
+        }
+
+    # ---------- execução ----------
+    def iniciar(self) -> "AgendadorPrevisoes":
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name="clima-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._acordar.set()
+
+    def _aquecer(self, lugares: List[Dict]) -> None:
+        try:
+            buscados, falhas = Clima.aquecer_previsoes(lugares)
+        except Exception:
+            buscados, falhas = 0, len(lugares)
+        self.buscados += buscados
+        self.falhas += falhas
+        self.ultima_atualizacao = time.time()
+
+    def _rodada(self, inicio: float) -> None:
+        """Divide os lugares em ondas e espalha cada uma num instante aleatório da janela."""
+        lugares = self._lugares_ativos()
+        ondas = [lugares[i:i + self.tamanho_onda] for i in range(0, len(lugares), self.tamanho_onda)]
+        atrasos = sorted(random.uniform(0, self.janela_s) for _ in ondas)
+        with self._lock:
+            self._fila.extend(ondas)
+        for atraso in atrasos:
+            espera = inicio + atraso - time.time()
+            if espera > 0 and self._parar.wait(espera):
+                return
+            with self._lock:
+                onda = self._fila.popleft() if self._fila else None
+            if onda:
+                self._aquecer(onda)
+
+    def _laco(self) -> None:
+        # primeira passada imediata: só busca o que ainda não estiver no cache
+        self._aquecer(self._lugares_ativos())
+        while not self._parar.is_set():
+            self.proxima_rodada = Clima.proxima_atualizacao_modelo()
+            espera = max(0.0, self.proxima_rodada - time.time())
+            if self._acordar.wait(espera):
+                self._acordar.clear()
+                if self._parar.is_set():
+                    break
+                # acordado por lugar novo: aquece o que faltar e volta a esperar
+                self._aquecer(self._lugares_ativos())
+                continue
+            self._rodada(time.time())
+        with self._lock:
+            self._fila.clear()
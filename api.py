@@ -0,0 +1,287 @@
+"""
+API HTTP (JSON) sem interface, para integrações: automação residencial,
+relatórios em lote etc. Usa as mesmas funções e caches do app:
+
+- GET  /geocode?q=Lisboa
+- GET  /forecast?q=Lisboa  ou  ?lat=..&lon=..&tz=..   (&horario=1: horizonte inteiro)
+- GET  /ia?msg=...  ou  POST /ia {"msg": "...", "usinas": {"id": "nome"}, "sessao": "abc"}
+  (com `sessao`, a conversa continua: "e amanhã?" usa a pergunta anterior)
+  (429 quando o orçamento de chamadas ao Gemini se esgota, 502 quando o Gemini falha)
+- GET  /saude, GET /metrics (Prometheus)
+
+As funções do projeto são bloqueantes (requests, SQLite, Gemini): rodam num
+pool de threads limitado; com a fila cheia a API responde 503 na hora, em vez
+de acumular espera. Tabelas saem em colunas ({"colunas": [...], "dados":
+{coluna: [valores]}}), com horários em epoch, e o JSON de uma previsão já
+serializada é reaproveitado enquanto ela estiver no cache do Clima.
+
+Uso (na raiz do projeto):
+    python api.py --porta 8080
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+import Clima
+import main
+import metricas
+from cache import CacheTTL
+from conversa import ContextoConversa
+
+API_THREADS = int(os.getenv("API_THREADS", "16"))
+API_FILA_MAX = int(os.getenv("API_FILA_MAX", "256"))   # pedidos aguardando o pool
+CASAS_DECIMAIS = 3
+SESSAO_TTL_S = 3600
+
+# contexto de conversa por sessão de cliente (some após 1 h sem uso)
+_sessoes = CacheTTL(max_itens=10000, ttl=SESSAO_TTL_S)
+
+# JSON pronto de cada tabela, enquanto o DataFrame (compartilhado pelo Clima) for o mesmo
+_cache_json = CacheTTL(max_itens=2048, ttl=Clima.INTERVALO_MODELO_S + Clima.ATRASO_MODELO_S)
+
+
+# ------------------ SERIALIZAÇÃO ------------------ #
+def _coluna(valores: np.ndarray) -> list:
+    """Coluna numérica em lista JSON (NaN vira null, floats arredondados)."""
+    if valores.dtype.kind in "iub":
+        return valores.tolist()
+    v = np.round(valores.astype(np.float64), CASAS_DECIMAIS)
+    lista = v.tolist()
+    nulos = np.flatnonzero(np.isnan(v))
+    for i in nulos.tolist():
+        lista[i] = None
+    return lista
+
+
+def colunar(df: Optional[pd.DataFrame]) -> Optional[Dict]:
+    """DataFrame -> {"colunas": [...], "dados": {col: [...]}} (sem a coluna `date`)."""
+    if df is None:
+        return None
+    colunas = [c for c in df.columns if c != "date"]
+    return {"colunas": colunas, "linhas": len(df), "dados": {c: _coluna(df[c].to_numpy()) for c in colunas}}
+
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _tabela_json(df: Optional[pd.DataFrame]) -> bytes:
+    if df is None:
+        return b"null"
+    item = _cache_json.get(id(df))
+    if item is not None and item[0] is df:
+        metricas.contar("api_json_reaproveitado")
+        return item[1]
+    corpo = _json(colunar(df))
+    _cache_json.set(id(df), (df, corpo))
+    return corpo
+
+
+def _resposta(corpo: bytes, status: int = 200, **headers) -> web.Response:
+    return web.Response(body=corpo, status=status, content_type="application/json",
+                        charset="utf-8", headers=headers or None)
+
+
+def _erro(status: int, mensagem: str, **headers) -> web.Response:
+    return _resposta(_json({"erro": mensagem}), status, **headers)
+
+
+# ------------------ EXECUÇÃO NO POOL ------------------ #
+class _Pool:
+    """Pool de threads com fila limitada (além dela, o pedido é recusado)."""
+
+    def __init__(self, threads: int, fila_max: int):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="api")
+        self.threads = threads
+        self.fila_max = fila_max
+        self.em_uso = 0
+        self.recusados = 0
+
+    async def rodar(self, func, *args):
+        if self.em_uso >= self.threads + self.fila_max:
+            self.recusados += 1
+            metricas.contar("api_recusada_fila_cheia")
+            return None, False
+        self.em_uso += 1   # só a thread do loop mexe neste contador
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args), True
+        finally:
+            self.em_uso -= 1
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {"threads": self.threads, "fila_max": self.fila_max,
+                "em_uso": self.em_uso, "recusados": self.recusados}
+
+
+_FILA_CHEIA = {"Retry-After": "1"}
+# tempo até o balde do Gemini ganhar mais uma ficha
+_ORCAMENTO_ESGOTADO = {"Retry-After": str(max(1, math.ceil(60 / main.IA_REQ_POR_MIN)))}
+
+
+# ------------------ ROTAS ------------------ #
+def _lugar_da_consulta(q: Dict) -> Optional[Dict]:
+    """Lugar a partir de ?q=cidade (geocode) ou ?lat=&lon=&tz=."""
+    if q.get("q"):
+        lugar = Clima.geocode(q["q"])
+        if not lugar:
+            return None
+        return {
+            "nome": lugar.get("name", q["q"]),
+            "latitude": lugar["latitude"],
+            "longitude": lugar["longitude"],
+            "timezone": lugar.get("timezone", "auto"),
+        }
+    lat, lon = float(q["lat"]), float(q["lon"])
+    return {"nome": q.get("nome", f"{lat:.3f},{lon:.3f}"), "latitude": lat, "longitude": lon,
+            "timezone": q.get("tz", "auto")}
+
+
+def _geocode(nome: str) -> bytes:
+    with metricas.span("api_geocode"):
+        lugar = Clima.geocode(nome)
+        return _json({"lugar": lugar}) if lugar else b""
+
+
+def _forecast(q: Dict) -> bytes:
+    with metricas.span("api_forecast"):
+        lugar = _lugar_da_consulta(q)
+        if lugar is None:
+            return b""
+        if q.get("horario") in ("1", "true"):
+            tabelas = {"horario": Clima.consultar_horario(lugar)}
+        else:
+            hoje, diario = Clima.consultar_api(lugar)
+            tabelas = {"hoje": hoje, "diario": diario}
+        if all(t is None for t in tabelas.values()):
+            raise RuntimeError("previsão indisponível agora")
+        tz = next(t for t in tabelas.values() if t is not None)["date"].dt.tz
+        # cabeçalho pequeno + tabelas já serializadas (sem reconverter a cada pedido)
+        partes = [b'{"lugar":', _json(lugar), b',"timezone":', _json(str(tz))]
+        for nome, df in tabelas.items():
+            partes += [b',"', nome.encode(), b'":', _tabela_json(df)]
+        return b"".join(partes) + b"}"
+
+
+def _contexto(sessao: Optional[str]) -> Optional[ContextoConversa]:
+    if not sessao:
+        return None
+    contexto = _sessoes.get(sessao)
+    if contexto is None:
+        contexto = ContextoConversa()
+    _sessoes.set(sessao, contexto)   # renova o prazo a cada pergunta
+    return contexto
+
+
+def _ia(msg: str, usinas, sessao: Optional[str]) -> bytes:
+    with metricas.span("api_ia"):
+        return _json({"resposta": main.responder(msg, usinas=usinas, contexto=_contexto(sessao))})
+
+
+async def geocode(request: web.Request) -> web.Response:
+    nome = request.query.get("q", "").strip()
+    if not nome:
+        return _erro(400, "informe ?q=cidade")
+    corpo, ok = await request.app["pool"].rodar(_geocode, nome)
+    if not ok:
+        return _erro(503, "servidor ocupado", **_FILA_CHEIA)
+    return _resposta(corpo) if corpo else _erro(404, f"lugar não encontrado: {nome}")
+
+
+async def forecast(request: web.Request) -> web.Response:
+    q = dict(request.query)
+    if not q.get("q") and not (q.get("lat") and q.get("lon")):
+        return _erro(400, "informe ?q=cidade ou ?lat=..&lon=..")
+    try:
+        corpo, ok = await request.app["pool"].rodar(_forecast, q)
+    except ValueError:
+        return _erro(400, "lat/lon inválidos")
+    except RuntimeError as e:
+        return _erro(502, str(e))
+    if not ok:
+        return _erro(503, "servidor ocupado", **_FILA_CHEIA)
+    return _resposta(corpo) if corpo else _erro(404, f"lugar não encontrado: {q.get('q')}")
+
+
+async def ia(request: web.Request) -> web.Response:
+    usinas, sessao = None, request.query.get("sessao")
+    if request.method == "POST":
+        try:
+            corpo = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return _erro(400, "corpo JSON inválido")
+        if not isinstance(corpo, dict):
+            return _erro(400, "corpo JSON deve ser um objeto")
+        msg = str(corpo.get("msg", "")).strip()
+        usinas = corpo.get("usinas")
+        if usinas is not None and not isinstance(usinas, dict):
+            return _erro(400, "usinas deve ser um objeto {id: nome}")
+        sessao = corpo.get("sessao") or sessao
+    else:
+        msg = request.query.get("msg", "").strip()
+    if not msg:
+        return _erro(400, "informe a mensagem em msg")
+    try:
+        resposta, ok = await request.app["pool"].rodar(_ia, msg, usinas, sessao and str(sessao))
+    except main.OrcamentoEsgotado as e:
+        return _erro(429, str(e), **_ORCAMENTO_ESGOTADO)
+    except RuntimeError as e:   # FalhaLLM, previsão indisponível
+        return _erro(502, str(e))
+    if not ok:
+        return _erro(503, "servidor ocupado", **_FILA_CHEIA)
+    return _resposta(resposta)
+
+
+async def saude(request: web.Request) -> web.Response:
+    return _resposta(_json({
+        "ok": True,
+        "pool": request.app["pool"].estatisticas(),
+        "previsao": Clima.estatisticas_cache_previsao(),
+        "json_reaproveitado": _cache_json.estatisticas(),
+        "sessoes": len(_sessoes),
+    }))
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metricas.texto_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+# ------------------ APLICAÇÃO ------------------ #
+def criar_app(threads: int = API_THREADS, fila_max: int = API_FILA_MAX) -> web.Application:
+    app = web.Application()
+    app["pool"] = _Pool(threads, fila_max)
+    app.router.add_get("/geocode", geocode)
+    app.router.add_get("/forecast", forecast)
+    app.router.add_get("/ia", ia)
+    app.router.add_post("/ia", ia)
+    app.router.add_get("/saude", saude)
+    app.router.add_get("/metrics", metrics)
+
+    async def fechar_pool(app):
+        app["pool"].executor.shutdown(wait=False, cancel_futures=True)
+    app.on_cleanup.append(fechar_pool)
+    return app
+
+
+def main_():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    ap.add_argument("--porta", type=int, default=int(os.getenv("API_PORTA", "8080")))
+    ap.add_argument("--threads", type=int, default=API_THREADS)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    app = criar_app(args.threads)
+    print(f"API pronta em {(time.perf_counter() - t0) * 1000:.0f} ms: http://{args.host}:{args.porta}")
+    web.run_app(app, host=args.host, port=args.porta, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main_()
@@ -1,62 +1,67 @@
+import os
+import time
+from contextlib import contextmanager
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as pl
-from main import ia   # Importa a função ia do seu main.py
+from streamlit.errors import StreamlitAPIException
+from main import ia_stream   # Importa a versão em streaming da ia() do main.py
+from conversa import HistoricoChat
 
 ##############################################################
 # PARA O CLIMA:
-from Clima import geocode, consultar_api, lugares_cadastrados
+from Clima import geocode, consultar_api, consultar_api_lote, lugares_cadastrados
+import gazetteer
 
 ##############################################################
 
 # ----------------- IMPORTS / FUNÇÕES NECESSÁRIAS -----------------
-import sys, asyncio, aiohttp, inspect, re
-
-# Pacote SEMS (precisa estar instalado)
-from sems_portal_api.sems_auth import login_to_sems
-from sems_portal_api.sems_region import set_region
-from sems_portal_api.sems_home_wrapper import get_collated_plant_details
-from sems_portal_api import sems_plant_details, sems_charts
-from sems_portal_api.sems_auth import login_to_sems, login_response_to_token
+import sys, asyncio
 
+# Pacote SEMS: opcional, carregado pelo Sems.py só quando for usado
+# (matplotlib e o SDK do Gemini também são importados sob demanda)
 
 # Windows: evita problemas de event loop
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-# Helper: extrai token de diferentes respostas de forks
-def _token_from_auth(auth):
-    if isinstance(auth, str) and auth:
-        return auth
-    if isinstance(auth, dict):
-        for path in [
-            ("token",),
-            ("data", "token"),
-            ("result", "token"),
-            ("Authorization",),
-        ]:
-            cur = auth
-            for k in path:
-                if not isinstance(cur, dict) or k not in cur:
-                    cur = None
-                    break
-                cur = cur[k]
-            if isinstance(cur, str) and cur:
-                return cur
-    return None
-
 ##############################################################
 
 # Configurações da página
 st.set_page_config(page_title="Painel Solar", layout="wide")
 st.title("PAINEL SOLAR")
 
+# Marca o início do rerun completo (para comparar com o tempo de cada aba)
+_inicio_rerun = time.perf_counter()
+
+##############################################################
+# Cada aba é um fragmento (@st.fragment): interagir com uma aba reexecuta só
+# aquela aba, não o app inteiro. O estado vai explícito (ss = session_state).
+@contextmanager
+def _cronometro(ss, nome: str):
+    """Mede o tempo de execução de uma aba e mostra no rodapé dela."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        # registra também quando a aba levanta ou pede st.rerun(scope="fragment")
+        ms = (time.perf_counter() - t0) * 1000
+        tempos = ss.setdefault("tempos_ui", {})
+        tempos[nome] = ms
+    completo = tempos.get("rerun completo")
+    st.caption(
+        f"⏱ esta aba: {ms:.0f} ms"
+        + (f" · último rerun completo do app: {completo:.0f} ms" if completo is not None else "")
+    )
+
 ##############################################################
 # função de logout
 def do_logout(clear_creds: bool = False):
     ss = st.session_state
-    for k in ("token", "plant_data", "plants", "plant_id"):
+    if ss.get("account"):
+        import Sems
+        Sems.descartar_cliente(ss["account"])
+    for k in ("token", "plant_data", "plants", "plant_id", "plant_nomes", "usinas_cfg"):
         ss.pop(k, None)
     ss.pop("messages", None)
     if clear_creds:
@@ -67,14 +72,207 @@ def do_logout(clear_creds: bool = False):
 
 ##############################################################    
 # Cria abas no app
-tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4 = st.tabs([
+    "Minha usina",
     "Preferencias", 
     "Acesso de dados", 
     "Solar I.A."
 ])
 
+def _rerun_aba():
+    """Reexecuta só a aba atual; se o app estiver num rerun completo, reexecuta tudo."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def _rerun_app():
+    """Reexecuta o app inteiro: lugares, lugar escolhido e sistema FV são lidos pelas outras abas."""
+    st.rerun()
+
+# ---------------- TAB 1 ----------------
+@st.fragment
+def aba_usina(ss):
+    with _cronometro(ss, "usina"):
+        _aba_usina(ss)
+
+def _aba_usina(ss):
+    import Sems   # leve; o sems_portal_api/aiohttp só carregam no login
+
+    if not Sems.disponivel():
+        st.info("Instale o pacote sems-portal-api para acompanhar sua usina GoodWe.")
+        return
+
+    # 1) Login (o cliente guarda o token e a sessão HTTP entre reruns)
+    if not ss.get("token"):
+        c1, c2, c3 = st.columns([3, 3, 1])
+        ss["account"] = c1.text_input("Conta SEMS", ss.get("account", ""))
+        ss["password"] = c2.text_input("Senha", ss.get("password", ""), type="password")
+        ss["sems_regiao"] = c3.selectbox("Região", ["eu", "us", "au"], index=0)
+        if st.button("Entrar", key="sems_entrar"):
+            cliente = Sems.cliente_para(ss["account"], ss["password"], ss["sems_regiao"])
+            try:
+                ss["token"] = Sems.rodar(cliente.token())
+                ss["plants"] = Sems.rodar(cliente.usinas())
+            except Exception as e:
+                st.error(f"Não foi possível entrar no SEMS: {e}")
+                return
+            _rerun_aba()
+        return
+
+    cliente = Sems.cliente_para(ss["account"], ss["password"], ss.get("sems_regiao"))
+
+    # 2) Usinas da conta (ou digitadas à mão, se a conta não listar)
+    plantas = ss.get("plants") or []
+    extras = st.text_input("Outros IDs de usina (separe por vírgula)", "")
+    plantas = list(dict.fromkeys(plantas + [i.strip() for i in extras.split(",") if i.strip()]))
+    if not plantas:
+        st.info("Nenhuma usina encontrada nesta conta.")
+
+    col_a, col_b = st.columns(2)
+    atualizar = col_a.button("Atualizar usinas", disabled=not plantas)
+    if atualizar:
+        # todas as usinas em paralelo, numa única sessão HTTP
+        ss["plant_data"] = Sems.rodar(cliente.detalhes_varias(plantas))
+    if col_b.button("Sair"):
+        do_logout()
+
+    # 3) Exibição
+    dados = ss.get("plant_data") or {}
+    linhas = []
+    nomes = ss.setdefault("plant_nomes", {})
+    for pid, d in dados.items():
+        if isinstance(d, Exception):
+            st.warning(f"Usina {pid}: {d}")
+            continue
+        info = (d or {}).get("powerPlant", {}).get("info", {})
+        nomes[pid] = info.get("name", pid)
+        linhas.append({
+            "Usina": info.get("name", pid),
+            "Capacidade (kW)": info.get("capacity"),
+            "Agora (W)": info.get("generationLive"),
+            "Hoje (kWh)": info.get("generationToday"),
+            "Mês (kWh)": info.get("monthGeneration"),
+            "Total (kWh)": info.get("allTimeGeneration"),
+        })
+    if linhas:
+        st.dataframe(pd.DataFrame(linhas), width="stretch", hide_index=True)
+
+    # 4) Rendimento medido x esperado (estado incremental por usina)
+    if plantas:
+        _desempenho_usinas(ss, cliente, plantas, atualizar)
+
+    # 5) Histórico de potência (do disco; só os dias que faltam vêm do SEMS)
+    if plantas:
+        _historico_usina(ss, cliente, plantas)
+
+
+@st.cache_resource
+def _get_historico():
+    from historico_usina import HistoricoUsina
+    return HistoricoUsina()
+
+def _desempenho_usinas(ss, cliente, plantas, atualizar: bool):
+    import desempenho
+    import fotovoltaico
+
+    st.markdown("#### Rendimento")
+    # onde fica cada usina (lugares da aba de clima) e seu kWp; o SEMS não informa a posição
+    lugares = ss.get("wx_places") or lugares_cadastrados
+    por_nome = {l["nome"]: l for l in lugares}
+    nomes = ss.get("plant_nomes", {})
+    cfg = ss.setdefault("usinas_cfg", {})
+    for pid in plantas:
+        info = (ss.get("plant_data") or {}).get(pid)
+        capacidade = info.get("powerPlant", {}).get("info", {}).get("capacity") if isinstance(info, dict) else None
+        cfg.setdefault(pid, {"local": lugares[0]["nome"], "kwp": float(capacidade or fotovoltaico.SISTEMA_PADRAO["kwp"])})
+        if cfg[pid]["local"] not in por_nome:
+            cfg[pid]["local"] = lugares[0]["nome"]
+    with st.expander("Local e potência das usinas"):
+        editada = st.data_editor(
+            pd.DataFrame({
+                "ID": plantas,
+                "Usina": [nomes.get(p, p) for p in plantas],
+                "Local": [cfg[p]["local"] for p in plantas],
+                "kWp": [float(cfg[p]["kwp"]) for p in plantas],
+            }),
+            hide_index=True, width="stretch", key="usinas_editor",
+            disabled=["ID", "Usina"],
+            column_config={
+                "Local": st.column_config.SelectboxColumn(options=list(por_nome), required=True),
+                "kWp": st.column_config.NumberColumn(min_value=0.1, max_value=10000.0, step=0.1),
+            },
+        )
+        for pid, _, local, kwp in editada.itertuples(index=False):
+            cfg[pid] = {"local": local or lugares[0]["nome"], "kwp": float(kwp or cfg[pid]["kwp"])}
+
+    monitor = desempenho.monitor()
+    if atualizar:
+        base = ss.get("pv_sistema") or fotovoltaico.SISTEMA_PADRAO
+        usinas = {
+            pid: {"lugar": por_nome[cfg[pid]["local"]], "sistema": {**base, "kwp": cfg[pid]["kwp"]}}
+            for pid in plantas
+        }
+        t0 = time.perf_counter()
+        try:
+            desempenho.atualizar_frota(monitor, _get_historico(), cliente, usinas)
+            ss["desempenho_ms"] = (time.perf_counter() - t0) * 1000
+        except Exception as e:
+            st.warning(f"Não foi possível atualizar o rendimento: {e}")
+
+    # só lê o estado salvo: nada é recalculado a cada rerun
+    diagnosticos = monitor.diagnosticos(plantas)
+    if not diagnosticos:
+        st.caption("Clique em **Atualizar usinas** para começar a comparar a geração com a irradiância.")
+        return
+    st.dataframe(pd.DataFrame({
+        "Usina": [nomes.get(d["usina"], d["usina"]) for d in diagnosticos],
+        "Status": [d["status"] for d in diagnosticos],
+        "Agora (% do esperado)": [None if d["razao_recente"] is None else round(d["razao_recente"] * 100) for d in diagnosticos],
+        "Média (% do esperado)": [None if d["razao_media"] is None else round(d["razao_media"] * 100) for d in diagnosticos],
+        "Pontos": [d["amostras"] for d in diagnosticos],
+        "Sinais": ["; ".join(d["causas"]) for d in diagnosticos],
+    }), hide_index=True, width="stretch")
+    if ss.get("desempenho_ms") is not None:
+        st.caption(f"{len(plantas)} usina(s) atualizada(s) em {ss['desempenho_ms']:.0f} ms")
+
+def _historico_usina(ss, cliente, plantas):
+    import graficos
+    from historico_usina import carregar
+
+    st.markdown("#### Histórico de potência")
+    hoje = pd.Timestamp.now().date()
+    c1, c2 = st.columns([2, 3])
+    usina = c1.selectbox("Usina", plantas, key="hist_usina")
+    intervalo = c2.date_input("Período", (hoje - pd.Timedelta(days=6), hoje), max_value=hoje, key="hist_periodo")
+    if not isinstance(intervalo, (tuple, list)) or len(intervalo) != 2:
+        return
+
+    historico = _get_historico()
+    if st.button("Carregar histórico"):
+        try:
+            ss["hist"] = (usina, tuple(intervalo), carregar(historico, cliente, usina, *intervalo))
+        except Exception as e:
+            st.error(f"Falha ao buscar o histórico no SEMS: {e}")
+    carregado = ss.get("hist")
+    if not carregado or carregado[:2] != (usina, tuple(intervalo)) or carregado[2].empty:
+        return
+    df = carregado[2]
+    series = [c for c in df.columns if c != "date"]
+    escolhidas = st.multiselect("Séries", series, default=series[:1], key="hist_series")
+    png = graficos.grafico_usina(usina, df[["date", *escolhidas]] if escolhidas else None)
+    if png:
+        st.image(png, width="stretch")
+    st.caption(f"{len(df)} pontos · histórico local: {historico.estatisticas()}")
+
+
 # ---------------- TAB 2 ----------------
-with tab2:
+@st.fragment
+def aba_preferencias(ss):
+    with _cronometro(ss, "preferencias"):
+        _aba_preferencias(ss)
+
+def _aba_preferencias(ss):
     st.write("Digite os itens que você usa em casa e classifique em importância.")
 
     # Usuário digita os itens separados por vírgula
@@ -104,31 +302,124 @@ with tab2:
         # Exibe um multiselect também para "menos importante"
         menos_importantes = st.multiselect("Menos importante", menos_importantes)
 
+        # Agenda dos aparelhos classificados pela geração solar prevista
+        classificados = (
+            [(i, 0) for i in importantes] + [(i, 1) for i in medios] + [(i, 2) for i in menos_importantes]
+        )
+        if classificados:
+            _agenda_aparelhos(ss, classificados)
+
+
+def _agenda_aparelhos(ss, classificados):
+    import agenda
+    import fotovoltaico
+
+    st.markdown("#### Melhor horário para cada aparelho")
+    st.caption("Ajuste potência e duração; os mais importantes ficam com as horas de mais sol.")
+
+    # potência/duração ficam na sessão (valores típicos como ponto de partida)
+    cfg = ss.setdefault("aparelhos_cfg", {})
+    for nome, _ in classificados:
+        cfg.setdefault(nome, agenda.valores_tipicos(nome))
+    tabela = pd.DataFrame({
+        "Aparelho": [n for n, _ in classificados],
+        "Potência (kW)": [float(cfg[n][0]) for n, _ in classificados],
+        "Duração (h)": [int(cfg[n][1]) for n, _ in classificados],
+    })
+    editada = st.data_editor(
+        tabela, hide_index=True, width="stretch", key="agenda_editor",
+        disabled=["Aparelho"],
+        column_config={
+            "Potência (kW)": st.column_config.NumberColumn(min_value=0.0, max_value=50.0, step=0.05),
+            "Duração (h)": st.column_config.NumberColumn(min_value=1, max_value=24, step=1),
+        },
+    )
+    for nome, kw, h in editada.itertuples(index=False):
+        cfg[nome] = (float(kw or 0.0), int(h or 1))
+
+    # previsão do lugar selecionado na aba de clima (ou o primeiro cadastrado)
+    lugares = ss.get("wx_places") or lugares_cadastrados
+    lugar = lugares[min(ss.get("wx_selected_idx", 0), len(lugares) - 1)]
+    geracao = fotovoltaico.previsao_geracao(lugar, ss.get("pv_sistema"))
+    if geracao is None:
+        st.info("Sem previsão de geração agora para montar a agenda.")
+        return
+
+    t0 = time.perf_counter()
+    matriz, datas, hora_atual = agenda.matriz_geracao(geracao)
+    aparelhos = [
+        {"nome": n, "prioridade": p, "potencia_kw": cfg[n][0], "duracao_h": cfg[n][1]}
+        for n, p in classificados
+    ]
+    plano = agenda.agendar(aparelhos, matriz, hora_atual)
+    ms = (time.perf_counter() - t0) * 1000
+    if plano.empty:
+        return
+
+    a1, a2 = st.columns([1, 2])
+    a1.metric("Energia dos aparelhos vinda do sol", f"{agenda.autoconsumo(plano):.0%}")
+    dia = a2.selectbox("Dia", range(len(datas)), format_func=lambda d: datas[d].strftime("%d/%m"), key="agenda_dia")
+    do_dia = plano[plano["dia"] == dia]
+    st.dataframe(pd.DataFrame({
+        "Aparelho": do_dia["aparelho"],
+        "Prioridade": do_dia["prioridade"],
+        "Horário": [f"{i:02d}h–{f:02d}h" for i, f in zip(do_dia["inicio"], do_dia["fim"])],
+        "kWh": do_dia["kwh"],
+        "kWh do sol": do_dia["kwh_solar"],
+    }), hide_index=True, width="stretch")
+    st.caption(f"{lugar['nome']} · agenda de {len(aparelhos)} aparelho(s) em {len(datas)} dia(s) calculada em {ms:.1f} ms")
+
 
 # ---------------- TAB 3 ----------------
-with tab3:
+@st.cache_resource
+def _get_agendador():
+    """Pré-busca em segundo plano (uma por processo); CLIMA_PREFETCH=0 desliga."""
+    if os.getenv("CLIMA_PREFETCH", "1") != "1":
+        return None
+    from agendador import AgendadorPrevisoes
+    agendador = AgendadorPrevisoes()
+    agendador.registrar(lugares_cadastrados)
+    return agendador.iniciar()
+
+@st.fragment
+def aba_clima(ss):
+    with _cronometro(ss, "clima"):
+        _aba_clima(ss)
+
+def _aba_clima(ss):
     st.title("Clima / Previsão")
 
-    ss = st.session_state
     # 1) Inicializa a lista de lugares na sessão a partir do seed do Clima.py
     if "wx_places" not in ss:
         ss.wx_places = list(lugares_cadastrados)  # cópia para poder editar no app
     ss.setdefault("wx_hourly", None)
     ss.setdefault("wx_daily", None)
     ss.setdefault("wx_selected_idx", 0)
+    agendador = _get_agendador()
+    if agendador is not None:
+        agendador.registrar(ss.wx_places)
 
     # 2) Linha para adicionar um novo lugar por geocode
     c1, c2 = st.columns([3, 1])
     with c1:
         nova_cidade = st.text_input("Adicionar cidade (ex.: Paris, França)", "")
+        # sugestões por prefixo do gazetteer offline (sem ir à rede)
+        sugestoes = gazetteer.sugerir(nova_cidade) if nova_cidade.strip() else []
+        escolhida = st.pills(
+            "Sugestões", range(len(sugestoes)), format_func=lambda i: gazetteer.rotulo(sugestoes[i]),
+            key=f"wx_sugestao_{nova_cidade}",
+        ) if sugestoes else None
     with c2:
         if st.button("Adicionar"):
             q = (nova_cidade or "").strip()
             if not q:
                 st.error("Digite cidade e país, ex.: 'Paris, França'.")
             else:
-                with st.spinner("Buscando coordenadas..."):
-                    place = geocode(q)
+                if escolhida is not None:
+                    place = sugestoes[escolhida]
+                else:
+                    with st.spinner("Buscando coordenadas..."):
+                        place = geocode(q)
                 if not place:
                     st.error("Local não encontrado. Tente outro nome.")
                 else:
@@ -144,26 +435,32 @@ with tab3:
                             "timezone": place.get("timezone", "auto"),
                         })
                         st.success(f"'{nome}' adicionado.")
-                        st.rerun()
+                        _rerun_app()
 
     # 3) Seletor do lugar cadastrado
     if not ss.wx_places:
+        # return (e não st.stop) para não interromper as outras abas
         st.info("Nenhum lugar cadastrado ainda. Adicione um acima.")
-        st.stop()
+        return
 
     options = [
         f"{p['nome']} ({p['latitude']:.3f}, {p['longitude']:.3f}) [{p.get('timezone','auto')}]"
         for p in ss.wx_places
     ]
+    anterior = ss.wx_selected_idx
     ss.wx_selected_idx = st.selectbox("Lugares", range(len(options)), 
                                       format_func=lambda i: options[i], 
                                       index=min(ss.wx_selected_idx, len(options)-1))
+    if ss.wx_selected_idx != anterior:
+        _rerun_app()
 
     # 4) Linha de ações (mesma da Tab1: botão principal à esquerda)
-    a1, a2 = st.columns([2, 1])
+    a1, a2, a3 = st.columns([2, 1, 1])
     with a1:
         consultar_clicked = st.button("Consultar previsão")
     with a2:
+        atualizar_todos_clicked = st.button("Atualizar todos", type="secondary")
+    with a3:
         remover_clicked = st.button("Remover lugar", type="secondary")
 
     if remover_clicked:
@@ -172,9 +469,30 @@ with tab3:
             st.toast(f"Removido: {removido['nome']}")
             ss.wx_hourly, ss.wx_daily = None, None
             ss.wx_selected_idx = 0
-            st.rerun()
+            _rerun_app()
+
+    if agendador is not None:
+        est = agendador.estado()
+        idade = est["idade_ultima_atualizacao_s"]
+        st.caption(
+            f"Pré-busca: {est['lugares']} lugar(es) · fila {est['fila']} · "
+            + ("ainda não rodou" if idade is None else f"última atualização há {idade / 60:.0f} min")
+        )
 
     # 5) Consulta à API e armazenamento na sessão
+    if atualizar_todos_clicked:
+        # uma requisição por bloco de lugares; o resultado fica no cache do Clima
+        with st.spinner(f"Atualizando {len(ss.wx_places)} lugar(es)..."):
+            resultados = consultar_api_lote(ss.wx_places)
+        ok = sum(1 for h, d in resultados if h is not None and d is not None)
+        hourly, daily = resultados[ss.wx_selected_idx]
+        if hourly is not None and daily is not None:
+            ss.wx_hourly, ss.wx_daily = hourly, daily
+        if ok == len(resultados):
+            st.success(f"Previsão atualizada para {ok} lugar(es).")
+        else:
+            st.warning(f"Previsão atualizada para {ok} de {len(resultados)} lugar(es).")
+
     if consultar_clicked:
         lugar = ss.wx_places[ss.wx_selected_idx]
         with st.spinner("Consultando previsão..."):
@@ -209,74 +527,67 @@ with tab3:
         # --- Tabelas ---
         st.subheader("Tabela — próximas 24h (hora local)")
         st.dataframe(hourly[["date", "temperature_2m"] + (["precipitation"] if "precipitation" in hourly.columns else [])],
-                     use_container_width=True)
+                     width="stretch")
 
         st.subheader("Tabela — próximos dias")
         cols = ["date"] + [c for c in ["temperature_2m_min","temperature_2m_max","precipitation_sum"] if c in daily.columns]
-        st.dataframe(daily[cols], use_container_width=True)
+        st.dataframe(daily[cols], width="stretch")
 
-        # --- Gráficos (matplotlib) ---
-        import matplotlib.pyplot as plt
-        import numpy as np
+        # --- Gráficos (PNG em cache; só redesenha quando a previsão muda) ---
+        import graficos
 
         st.subheader("Gráficos")
-        
-        # Tamanho reduzido dos gráficos
-        FIG_w, FIG_H, DPI = 6, 2.8, 120
-
-        def grafico_temp_horaria():
-            fig, ax = plt.subplots(figsize=(7, 3))
-            x = hourly["date"].dt.strftime("%Hh")
-            y = hourly["temperature_2m"]
-            ax.plot(x, y, marker=".", linewidth=1.6)
-            ax.set_title(f"Temperatura — hoje — {lugar['nome']}")
-            ax.set_xlabel("Hora"); ax.set_ylabel("°C")
-            # reduz número de rótulos para não poluir
-            step = max(1, len(x)//8)
-            ax.set_xticks(np.arange(0, len(x), step))
-            ax.grid(True, linestyle="--", alpha=0.35)
-            plt.tight_layout()
-            st.pyplot(fig, clear_figure=True)
-
-        def grafico_semana_min_max():
-            if {"temperature_2m_min","temperature_2m_max"}.issubset(daily.columns):
-                fig, ax = plt.subplots(figsize=(7, 3))
-                xd = daily["date"].dt.strftime("%d/%m")
-                ax.plot(xd, daily["temperature_2m_min"], marker="o", label="Mín")
-                ax.plot(xd, daily["temperature_2m_max"], marker="o", label="Máx")
-                ax.fill_between(xd, daily["temperature_2m_min"], daily["temperature_2m_max"], alpha=0.15)
-                ax.set_title(f"Temperaturas — semana — {lugar['nome']}")
-                ax.set_xlabel("Data"); ax.set_ylabel("°C"); ax.legend(loc="upper left")
-                ax.grid(True, linestyle="--", alpha=0.35)
-                plt.tight_layout()
-                st.pyplot(fig, clear_figure=True)
-
-        def grafico_semana_chuva():
-            if "precipitation_sum" in daily.columns:
-                fig, ax = plt.subplots(figsize=(7, 3))
-                xd = daily["date"].dt.strftime("%d/%m")
-                yb = daily["precipitation_sum"].clip(lower=0)
-                ax.bar(xd, yb)
-                ax.set_ylim(0, max(5.0, float(yb.max()) + 2.0))
-                ax.set_title(f"Precipitação — semana — {lugar['nome']}")
-                ax.set_xlabel("Data"); ax.set_ylabel("mm")
-                ax.grid(axis="y", linestyle="--", alpha=0.5)
-                plt.tight_layout()
-                st.pyplot(fig, clear_figure=True)
+
+        def _mostrar(png):
+            if png is not None:
+                st.image(png, width="stretch")
 
         # --- layout ---
         c1, c2 = st.columns(2, gap="medium")
-        with c1: grafico_temp_horaria()
-        with c2: grafico_semana_min_max()
+        with c1: _mostrar(graficos.grafico_temp_horaria(lugar, hourly))
+        with c2: _mostrar(graficos.grafico_semana_min_max(lugar, daily))
 
         c3, c4 = st.columns(2, gap="medium")
-        with c3: grafico_semana_chuva()
+        with c3: _mostrar(graficos.grafico_semana_chuva(lugar, daily))
         with c4: st.empty()
 
+        # --- Geração solar prevista (a partir da irradiância) ---
+        import fotovoltaico
+
+        st.subheader("Geração solar prevista")
+        sistema = ss.setdefault("pv_sistema", dict(fotovoltaico.SISTEMA_PADRAO))
+        sistema_antes = dict(sistema)
+        with st.expander("Configuração do sistema fotovoltaico"):
+            k1, k2, k3, k4 = st.columns(4)
+            sistema["kwp"] = k1.number_input("Potência (kWp)", 0.1, 10000.0, float(sistema["kwp"]), 0.1)
+            sistema["inclinacao"] = k2.number_input("Inclinação (°)", 0.0, 90.0, float(sistema["inclinacao"]), 1.0)
+            sistema["azimute"] = k3.number_input("Azimute (° a partir do norte)", 0.0, 359.0, float(sistema["azimute"]), 5.0)
+            sistema["inversor_kw"] = k4.number_input("Inversor (kW)", 0.1, 10000.0, float(sistema["inversor_kw"]), 0.1)
+        if sistema != sistema_antes:
+            _rerun_app()
+
+        geracao = fotovoltaico.previsao_geracao(lugar, sistema)
+        if geracao is None:
+            st.info("Sem dados de irradiância para estimar a geração deste lugar.")
+        else:
+            diaria = fotovoltaico.geracao_diaria(geracao)
+            hoje_local = pd.Timestamp.now(tz=geracao["date"].dt.tz).normalize()
+            por_dia = dict(zip(diaria["dia"], diaria["kwh"]))
+            g1, g2, g3 = st.columns(3)
+            g1.metric("Geração hoje (kWh)", f"{por_dia.get(hoje_local, 0.0):.1f}")
+            g2.metric("Geração amanhã (kWh)", f"{por_dia.get((hoje_local + pd.Timedelta(days=1)).normalize(), 0.0):.1f}")
+            g3.metric(f"Próximos {len(diaria)} dias (kWh)", f"{float(diaria['kwh'].sum()):.0f}")
+            _mostrar(graficos.grafico_geracao(lugar, geracao))
+
 
 
 # ---------------- TAB 4 ----------------
-with tab4:
+@st.fragment
+def aba_chat(ss):
+    with _cronometro(ss, "chat"):
+        _aba_chat(ss)
+
+def _aba_chat(ss):
     st.subheader("SOLAR I.A.")
     st.markdown(
         "<h3 style='text-align: center;'>Faça a sua pergunta: </h3>",
@@ -284,13 +595,19 @@ with tab4:
     )
 
     # Inicializa o histórico de mensagens se ainda não existir
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    
-    # Mostra o histórico de mensagens na tela
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):  # Pode ser "user" ou "assistant"
-            st.markdown(message["content"])
+    # (tamanho limitado: só as últimas viram balões; as anteriores ficam arquivadas)
+    if not isinstance(ss.get("messages"), HistoricoChat):
+        ss.messages = HistoricoChat()
+
+    if ss.messages.antigas:
+        if st.toggle(f"Mostrar {len(ss.messages.antigas)} mensagens anteriores", key="chat_antigas"):
+            with st.container(height=300):
+                st.markdown(ss.messages.texto_antigas())
+
+    # Mostra as mensagens recentes na tela
+    for message in ss.messages:
+        with st.chat_message(message.role):  # Pode ser "user" ou "assistant"
+            st.markdown(message.content)
 
     # Input do usuário (chat)
     if msg := st.chat_input("Digite sua pergunta aqui..."):
@@ -298,13 +615,97 @@ with tab4:
         st.chat_message("user").markdown(msg)
 
         # Salva no histórico
-        st.session_state.messages.append({"role": "user", "content": msg})
+        ss.messages.adicionar("user", msg)
 
-        # Gera resposta usando sua função ia()
-        resposta = ia(msg)
-
-        # Mostra a resposta do assistente no chat
-        st.chat_message("assistant").markdown(resposta, unsafe_allow_html=True)
+        # Gera a resposta em streaming: os pedaços aparecem conforme chegam
+        with st.chat_message("assistant"):
+            usinas = {p: ss.get("plant_nomes", {}).get(p, p) for p in ss.get("plants") or []}
+            resposta = st.write_stream(ia_stream(msg, sistema=ss.get("pv_sistema"), usinas=usinas,
+                                                 contexto=ss.messages.contexto))
 
         # Salva a resposta no histórico
-        st.session_state.messages.append({"role": "assistant", "content": resposta})
+        ss.messages.adicionar("assistant", resposta if isinstance(resposta, str) else "".join(map(str, resposta)))
+
+
+# ---------------- DIAGNÓSTICO (oculto: ?diag=1) ----------------
+@st.cache_resource
+def _iniciar_exportador_metricas():
+    """
+    Exporta as métricas no formato do Prometheus se METRICAS_PORTA estiver
+    definida. Devolve (porta, erro); porta ocupada não derruba o app: o
+    exportador fica desligado e o aviso sai uma vez no log (e no painel).
+    """
+    porta = os.getenv("METRICAS_PORTA")
+    if not porta:
+        return None, None
+    import metricas
+    try:
+        metricas.iniciar_exportador(int(porta))
+    except (OSError, ValueError) as e:
+        print(f"[métricas] exportador desligado (METRICAS_PORTA={porta}): {e}", file=sys.stderr)
+        return porta, str(e)
+    return porta, None
+
+def painel_diagnostico(ss):
+    import Clima
+    import graficos
+    import main
+    import metricas
+
+    with st.expander("Diagnóstico", expanded=True):
+        dados = metricas.resumo()
+        st.markdown("**Etapas** (ms)")
+        if dados["etapas"]:
+            st.dataframe(pd.DataFrame.from_dict(dados["etapas"], orient="index"), width="stretch")
+        else:
+            st.caption("Nenhuma etapa medida ainda" + ("" if metricas.ATIVO else " (METRICAS=0)."))
+        st.markdown("**Contadores**")
+        st.json(dados["contadores"], expanded=False)
+        st.markdown("**Caches**")
+        st.json({
+            "previsao": Clima.estatisticas_cache_previsao(),
+            "geocode": Clima.estatisticas_cache_geocode(),
+            "respostas": main.estatisticas_cache_respostas(),
+            "graficos": graficos.estatisticas_cache_graficos(),
+        }, expanded=False)
+        st.markdown("**Coalescência e orçamento de chamadas**")
+        st.json({**Clima.estatisticas_chamadas(), **main.estatisticas_chamadas_llm()}, expanded=False)
+        st.markdown("**HTTP por host**")
+        st.json(Clima.resumo_tempos_http(), expanded=False)
+        st.markdown("**Memória desta sessão**")
+        compartilhados = Clima.ids_compartilhados()
+        por_chave = {
+            str(k): metricas.bytes_aproximados(v, compartilhados)
+            for k, v in ss.to_dict().items()
+        }
+        total = sum(por_chave.values())
+        st.caption(
+            f"{total / 1024:.1f} KiB nesta sessão (previsões compartilhadas entre sessões não entram)"
+            + (f" · pico do processo: {metricas.memoria_processo_mb()} MB" if metricas.memoria_processo_mb() else "")
+        )
+        st.json({k: v for k, v in sorted(por_chave.items(), key=lambda kv: -kv[1])}, expanded=False)
+        st.markdown("**Tempos da interface** (ms)")
+        st.json({k: round(v, 1) for k, v in ss.get("tempos_ui", {}).items()}, expanded=False)
+        porta, erro = _iniciar_exportador_metricas()
+        if erro:
+            st.warning(f"Exportador Prometheus desligado (porta {porta}): {erro}")
+        elif porta:
+            st.caption(f"Prometheus: http://127.0.0.1:{porta}/metrics")
+
+
+# ---------------- MONTAGEM DAS ABAS ----------------
+ss = st.session_state
+with tab1:
+    aba_usina(ss)
+with tab2:
+    aba_preferencias(ss)
+with tab3:
+    aba_clima(ss)
+with tab4:
+    aba_chat(ss)
+
+_iniciar_exportador_metricas()
+if st.query_params.get("diag") == "1":
+    painel_diagnostico(ss)
+
+ss.setdefault("tempos_ui", {})["rerun completo"] = (time.perf_counter() - _inicio_rerun) * 1000
@@ -0,0 +1,57 @@
+"""
+Benchmark do agendador de aparelhos (agenda.agendar).
+
+Mede quanto tempo leva para reotimizar a agenda de dezenas de aparelhos num
+horizonte de vários dias (o que acontece a cada edição na aba Preferências).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_agenda.py --aparelhos 40 --dias 16
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agenda import APARELHOS_TIPICOS, agendar, autoconsumo  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--aparelhos", type=int, default=40)
+    ap.add_argument("--dias", type=int, default=16)
+    ap.add_argument("--repeticoes", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(3)
+    hora = np.arange(24)
+    sol = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None)
+    geracao = sol * rng.uniform(1.5, 4.5, (args.dias, 1))
+    tipicos = list(APARELHOS_TIPICOS.items())
+    aparelhos = [
+        {"nome": f"{nome} {i}", "prioridade": i % 3, "potencia_kw": kw, "duracao_h": h}
+        for i, (nome, (kw, h)) in enumerate(tipicos[i % len(tipicos)] for i in range(args.aparelhos))
+    ]
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        t0 = time.perf_counter()
+        plano = agendar(aparelhos, geracao, hora_atual=10)
+        tempos.append(time.perf_counter() - t0)
+
+    print(json.dumps({
+        "bench": "agenda_aparelhos",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "aparelhos": args.aparelhos,
+        "dias": args.dias,
+        "min_ms": round(min(tempos) * 1000, 2),
+        "mediana_ms": round(float(np.median(tempos)) * 1000, 2),
+        "autoconsumo": round(autoconsumo(plano), 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark de carga da API HTTP (api.py).
+
+Sobe a API no próprio processo, com o Open-Meteo falso (servidor_falso.py) e
+um LLM falso, e dispara pedidos concorrentes de um cliente aiohttp por
+alguns segundos em cada rota. Mostra pedidos/s e latência por rota; a
+primeira rodada de cada cidade paga a previsão, o resto sai dos caches.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_api.py --concorrencia 64 --segundos 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import Clima  # noqa: E402
+import api  # noqa: E402
+import main  # noqa: E402
+from bench_servicos import CIDADES, limpar_caches, resumo  # noqa: E402
+from servidor_falso import LLMFalso, ServidorFalso  # noqa: E402
+
+
+async def carga(url_base: str, caminhos, concorrencia: int, segundos: float) -> dict:
+    tempos, status = [], {}
+    fim = time.perf_counter() + segundos
+    conector = aiohttp.TCPConnector(limit=concorrencia)
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+        async def trabalhador(i: int):
+            k = i
+            while time.perf_counter() < fim:
+                t0 = time.perf_counter()
+                async with sessao.get(url_base + caminhos[k % len(caminhos)]) as r:
+                    await r.read()
+                tempos.append(time.perf_counter() - t0)
+                status[r.status] = status.get(r.status, 0) + 1
+                k += concorrencia
+        t0 = time.perf_counter()
+        await asyncio.gather(*(trabalhador(i) for i in range(concorrencia)))
+        total = time.perf_counter() - t0
+    return {"pedidos_por_s": round(len(tempos) / total, 1), "latencia": resumo(tempos),
+            "status": {str(k): v for k, v in sorted(status.items())}}
+
+
+async def rodar(args) -> list:
+    app = api.criar_app(threads=args.threads)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    porta = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{porta}"
+
+    cidades = [c.replace(" ", "%20") for c in CIDADES]
+    rotas = {
+        "geocode": [f"/geocode?q={c}" for c in cidades],
+        "forecast": [f"/forecast?q={c}" for c in cidades],
+        "forecast_horario": [f"/forecast?q={c}&horario=1" for c in cidades],
+        "ia_clima": [f"/ia?msg=tempo%20em%20{c}" for c in cidades],
+        # perguntas distintas dentro da rajada do orçamento do Gemini (o resto sai do cache)
+        "ia_llm": [f"/ia?msg=o%20que%20%C3%A9%20irradi%C3%A2ncia%20{i}%3F" for i in range(int(main.IA_RAJADA))],
+    }
+    resultados = []
+    for nome, caminhos in rotas.items():
+        r = await carga(url, caminhos, args.concorrencia, args.segundos)
+        resultados.append({"rota": nome, **r})
+    await runner.cleanup()
+    return resultados
+
+
+def main_():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latencia-ms", type=float, default=40.0)
+    ap.add_argument("--concorrencia", type=int, default=64)
+    ap.add_argument("--segundos", type=float, default=5.0)
+    ap.add_argument("--threads", type=int, default=api.API_THREADS)
+    args = ap.parse_args()
+
+    srv = ServidorFalso(args.latencia_ms, 5.0).iniciar()
+    srv.apontar_clima()
+    llm = LLMFalso(primeiro_ms=300.0)
+    main.get_llm = lambda: llm
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        limpar_caches(dir_tmp)
+        resultados = asyncio.run(rodar(args))
+
+    srv.parar()
+    print(json.dumps({
+        "bench": "api",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"latencia_ms": args.latencia_ms, "concorrencia": args.concorrencia,
+                   "segundos": args.segundos, "threads": args.threads},
+        "requisicoes_servidor": srv.requisicoes,
+        "llm_chamadas": llm.chamadas,
+        "previsao": Clima.estatisticas_cache_previsao(),
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,69 @@
+"""
+Benchmark do contexto de conversa enviado ao Gemini (conversa.ContextoConversa).
+
+Simula uma conversa longa (perguntas de clima intercaladas com perguntas
+livres) e mede, em marcos do número de turnos, o tamanho do prompt e o tempo
+para registrar o turno e montar o próximo, comparando com mandar o histórico
+inteiro. Com o orçamento, os dois ficam constantes.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_conversa.py --turnos 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from conversa import ContextoConversa, estimar_tokens  # noqa: E402
+from main import Intencao  # noqa: E402
+
+RESPOSTA = ("Irradiância é a potência da luz do sol que chega a uma área, em W/m². "
+            "Ela varia com a hora, as nuvens e a inclinação do painel. ") * 4
+CLIMA = "**{0}**\n- Agora: **24.8°C**\n- Hoje: **mín 15.0°C / máx 25.0°C**, chuva **0.0 mm** nas 24h"
+CIDADES = ["Lisboa", "Porto", "São Paulo", "Recife", "Madrid", "Roma"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--turnos", type=int, default=2000)
+    args = ap.parse_args()
+
+    contexto = ContextoConversa()
+    tokens_ingenuo = 0
+    marcos = {10, 100, 1000, args.turnos}
+    resultados = []
+    for i in range(1, args.turnos + 1):
+        t0 = time.perf_counter()
+        if i % 3 == 0:
+            cidade = CIDADES[i % len(CIDADES)]
+            resposta = CLIMA.format(cidade)
+            contexto.registrar_ferramenta(f"tempo em {cidade}", Intencao("clima", cidade, "hoje"), resposta)
+            pergunta = f"tempo em {cidade}"
+        else:
+            pergunta = f"pergunta {i}: como a irradiância afeta meus painéis?"
+            resposta = RESPOSTA
+            contexto.registrar(pergunta, resposta)
+        prompt = contexto.montar("e por quê?")
+        us = (time.perf_counter() - t0) * 1e6
+        tokens_ingenuo += estimar_tokens(pergunta) + estimar_tokens(resposta)
+        if i in marcos:
+            resultados.append({
+                "turno": i,
+                "tokens_prompt": sum(estimar_tokens(p["parts"][0]) for p in prompt),
+                "tokens_historico_inteiro": tokens_ingenuo,
+                "us_registrar_e_montar": round(us, 1),
+            })
+
+    print(json.dumps({
+        "bench": "contexto_conversa",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "orcamento_tokens": contexto.orcamento,
+        "estado": contexto.estatisticas(),
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark da conversão JSON → DataFrame da previsão.
+
+Compara o caminho antigo (horários ISO + pd.to_datetime/pd.to_numeric por coluna)
+com o caminho atual do Clima (timeformat=unixtime + arrays int64/float32).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_conversao.py --dias 16 --variaveis 12
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Clima import _converter_previsao, resolver_timezone  # noqa: E402
+
+TZ = "America/Sao_Paulo"
+
+
+def gerar_payloads(dias: int, variaveis: int):
+    """Gera o mesmo payload nos formatos ISO (antigo) e unixtime (atual)."""
+    inicio = pd.Timestamp.now(tz=TZ).normalize()
+    horas = pd.date_range(inicio, periods=dias * 24, freq="h")
+    datas = pd.date_range(inicio, periods=dias, freq="D")
+    rng = np.random.default_rng(42)
+
+    nomes_h = ["temperature_2m", "precipitation"] + [f"var_{i}" for i in range(max(0, variaveis - 2))]
+    valores_h = {n: rng.normal(20, 5, len(horas)).round(1).tolist() for n in nomes_h}
+    valores_d = {
+        "temperature_2m_max": rng.normal(28, 3, dias).round(1).tolist(),
+        "temperature_2m_min": rng.normal(16, 3, dias).round(1).tolist(),
+        "precipitation_sum": rng.gamma(1, 2, dias).round(1).tolist(),
+    }
+
+    iso = {
+        "timezone": TZ,
+        "hourly": {"time": horas.strftime("%Y-%m-%dT%H:%M").tolist(), **valores_h},
+        "daily": {"time": datas.strftime("%Y-%m-%d").tolist(), **valores_d},
+    }
+    unix = {
+        "timezone": TZ,
+        "hourly": {"time": horas.as_unit("s").asi8.tolist(), **valores_h},
+        "daily": {"time": datas.as_unit("s").asi8.tolist(), **valores_d},
+    }
+    return iso, unix
+
+
+def converter_antigo(lugar, forecast):
+    """Cópia do caminho anterior de consultar_api (referência)."""
+    hourly = forecast.get("hourly", {})
+    daily = forecast.get("daily", {})
+    hourly_df = pd.DataFrame(hourly)
+    tz = resolver_timezone(lugar, forecast)
+    hourly_df["date"] = pd.to_datetime(hourly_df["time"], utc=True).dt.tz_convert(tz)
+    for col in hourly_df.columns:
+        if col not in ("time", "date"):
+            hourly_df[col] = pd.to_numeric(hourly_df[col], errors="coerce")
+    hoje_local = pd.Timestamp.now(tz=tz).normalize()
+    amanha_local = hoje_local + pd.Timedelta(days=1)
+    mask_hoje = (hourly_df["date"] >= hoje_local) & (hourly_df["date"] < amanha_local)
+    hourly_hoje = hourly_df.loc[mask_hoje].reset_index(drop=True)
+    if hourly_hoje.empty:
+        hourly_hoje = hourly_df.head(24).reset_index(drop=True)
+    daily_df = pd.DataFrame(daily)
+    daily_df["date"] = pd.to_datetime(daily_df["time"], utc=True).dt.tz_convert(tz)
+    for col in ["temperature_2m_min", "temperature_2m_max", "precipitation_sum"]:
+        if col in daily_df.columns:
+            daily_df[col] = pd.to_numeric(daily_df[col], errors="coerce")
+    return hourly_hoje, daily_df
+
+
+def medir(func, *args, repeticoes: int):
+    tempos = timeit.repeat(lambda: func(*args), number=1, repeat=repeticoes)
+    return {
+        "min_ms": round(min(tempos) * 1000, 3),
+        "mediana_ms": round(float(np.median(tempos)) * 1000, 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dias", type=int, default=16)
+    ap.add_argument("--variaveis", type=int, default=12)
+    ap.add_argument("--repeticoes", type=int, default=50)
+    args = ap.parse_args()
+
+    lugar = {"nome": "bench", "latitude": -23.55, "longitude": -46.64, "timezone": TZ}
+    iso, unix = gerar_payloads(args.dias, args.variaveis)
+
+    antigo = medir(converter_antigo, lugar, iso, repeticoes=args.repeticoes)
+    atual = medir(_converter_previsao, lugar, unix, repeticoes=args.repeticoes)
+    print(json.dumps({
+        "bench": "conversao_previsao",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dias": args.dias,
+        "variaveis_horarias": args.variaveis,
+        "antigo": antigo,
+        "atual": atual,
+        "ganho": round(antigo["mediana_ms"] / max(atual["mediana_ms"], 1e-9), 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark do detector de baixo rendimento (desempenho.MonitorDesempenho).
+
+Alimenta uma frota de usinas com um dia de pontos de 5 min (medido x
+esperado) e mede o custo por ponto e o tempo para ler os diagnósticos de
+todas (o que o painel e o chat fazem a cada rerun).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_desempenho.py --usinas 500 --dias 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from desempenho import MonitorDesempenho  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--usinas", type=int, default=500)
+    ap.add_argument("--dias", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(7)
+    ts = np.arange(0, args.dias * 86400, 300, dtype=np.int64) + 20000 * 86400
+    hora = (ts % 86400) / 3600
+    esperado = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None) * 4.0
+    fatores = rng.uniform(0.6, 0.95, args.usinas)
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        monitor = MonitorDesempenho(os.path.join(dir_tmp, "desempenho.sqlite3"))
+        t0 = time.perf_counter()
+        for i in range(args.usinas):
+            real = esperado * fatores[i] * (1 + 0.05 * rng.standard_normal(ts.size))
+            monitor.alimentar(f"u{i}", ts, real, esperado, kwp=5.0)
+        alimentar = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        monitor.salvar()
+        salvar = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        diagnosticos = monitor.diagnosticos()
+        ler = time.perf_counter() - t0
+
+    pontos = args.usinas * ts.size
+    print(json.dumps({
+        "bench": "desempenho_usinas",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "usinas": args.usinas,
+        "pontos": pontos,
+        "us_por_ponto": round(alimentar / pontos * 1e6, 2),
+        "salvar_ms": round(salvar * 1000, 2),
+        "diagnosticos_ms": round(ler * 1000, 2),
+        "status": {s: sum(d["status"] == s for d in diagnosticos) for s in ("ok", "atenção", "falha", "aprendendo")},
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
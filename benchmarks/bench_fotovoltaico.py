@@ -0,0 +1,59 @@
+"""
+Benchmark do motor fotovoltaico vetorizado (fotovoltaico.gerar_frota).
+
+Mede quanto tempo leva para estimar a geração de uma frota de usinas
+(usinas × horas) numa única chamada.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_fotovoltaico.py --usinas 500 --dias 16
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fotovoltaico import SISTEMA_PADRAO, gerar_frota  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--usinas", type=int, default=500)
+    ap.add_argument("--dias", type=int, default=16)
+    ap.add_argument("--repeticoes", type=int, default=10)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1)
+    p, h = args.usinas, args.dias * 24
+    epoch = int(time.time()) // 3600 * 3600 + np.arange(h) * 3600
+    lat = rng.uniform(-33, 5, p)
+    lon = rng.uniform(-73, -35, p)
+    hora = (epoch // 3600) % 24
+    ghi = np.clip(np.sin((hora - 9) / 12 * np.pi), 0, None) * rng.uniform(300, 1000, (p, 1))
+    dhi = ghi * rng.uniform(0.15, 0.6, (p, h))
+    temp = rng.normal(25, 4, (p, h))
+    sistemas = [dict(SISTEMA_PADRAO, kwp=float(k)) for k in rng.uniform(3, 75, p)]
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        t0 = time.perf_counter()
+        kwh = gerar_frota(epoch, lat, lon, ghi, dhi, temp, sistemas=sistemas)
+        tempos.append(time.perf_counter() - t0)
+
+    print(json.dumps({
+        "bench": "motor_fotovoltaico",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "usinas": p,
+        "horas": h,
+        "celulas": p * h,
+        "min_ms": round(min(tempos) * 1000, 2),
+        "mediana_ms": round(float(np.median(tempos)) * 1000, 2),
+        "kwh_total": round(float(kwh.sum()), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
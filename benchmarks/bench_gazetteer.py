@@ -0,0 +1,86 @@
+"""
+Benchmark do gazetteer offline (gazetteer.py).
+
+Gera um arquivo sintético do tamanho de um dump grande do GeoNames (nomes
+aleatórios, alguns com acento), abre por mmap e mede a busca exata (usada
+pelo Clima.geocode) e as sugestões por prefixo (campo de cidade), curtas e
+longas.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_gazetteer.py --lugares 200000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gazetteer import Gazetteer, gerar  # noqa: E402
+
+SILABAS = ["sa", "o", "pau", "lo", "ri", "de", "ja", "nei", "ro", "be", "lém", "por", "to", "ale", "gre",
+           "ma", "na", "us", "cu", "ri", "ti", "ba", "são", "jo", "sé", "flo", "ria", "nó", "po", "lis"]
+
+
+def medir(func, consultas) -> dict:
+    tempos = []
+    for c in consultas:
+        t0 = time.perf_counter()
+        func(c)
+        tempos.append(time.perf_counter() - t0)
+    us = np.asarray(tempos) * 1e6
+    return {"p50_us": round(float(np.percentile(us, 50)), 1), "p99_us": round(float(np.percentile(us, 99)), 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lugares", type=int, default=200000)
+    ap.add_argument("--consultas", type=int, default=2000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(11)
+    nomes = [
+        " ".join("".join(rng.choice(SILABAS, rng.integers(2, 4))).capitalize()
+                 for _ in range(rng.integers(1, 3)))
+        for _ in range(args.lugares)
+    ]
+    lugares = [
+        {"nome": n, "alternativos": [], "lat": float(rng.uniform(-60, 70)), "lon": float(rng.uniform(-180, 180)),
+         "pais": "BR", "fuso": "America/Sao_Paulo", "pop": int(rng.pareto(1.2) * 1000)}
+        for n in nomes
+    ]
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho = os.path.join(dir_tmp, "gazetteer.bin")
+        t0 = time.perf_counter()
+        tamanho = gerar(lugares, caminho, {"BR": "Brasil"}, "sintético")
+        gerar_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        g = Gazetteer(caminho)
+        abrir_ms = (time.perf_counter() - t0) * 1000
+
+        amostra = rng.choice(nomes, args.consultas)
+        resultados = {
+            "procurar_exato": medir(g.procurar, amostra),
+            "procurar_inexistente": medir(g.procurar, [n + " do norte" for n in amostra]),
+            "sugerir_2_letras": medir(g.sugerir, [n[:2] for n in amostra]),
+            "sugerir_5_letras": medir(g.sugerir, [n[:5] for n in amostra]),
+        }
+        del g
+
+    print(json.dumps({
+        "bench": "gazetteer",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **tamanho,
+        "gerar_s": round(gerar_s, 2),
+        "abrir_ms": round(abrir_ms, 2),
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
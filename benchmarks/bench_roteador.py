@@ -0,0 +1,209 @@
+"""
+Benchmark do roteador de intenções do chat (main.classificar).
+
+Gera um corpus de alguns milhares de perguntas no estilo real (PT/EN), cada uma
+com a intenção, o lugar e o horizonte esperados, e mede vazão e acerto.
+
+Os modelos (MODELOS, SEM_LUGAR, LLM) foram escritos junto com o roteador; o
+acerto neles mede regressão, não generalização. Por isso há um conjunto à
+parte, FORA_DOS_MODELOS, com formulações livres e negativos difíceis
+(perguntas para o Gemini que citam chuva, clima ou geração). A primeira metade
+já orientou ajustes das regras; a segunda entrou depois, sem ajuste. O relatório traz acerto e precisão/revocação por intenção nos
+dois conjuntos.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_roteador.py --n 3000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import classificar  # noqa: E402
+
+CIDADES = [
+    "São Paulo", "Lisboa", "Porto Alegre", "Rio de Janeiro", "Belo Horizonte",
+    "Curitiba", "Recife", "Paris, França", "London", "New York", "Tokyo",
+    "Fortaleza", "Salvador", "Manaus", "Porto", "Buenos Aires", "Madrid",
+]
+
+# (modelo, tipo, horizonte) — {c} é o lugar
+MODELOS = [
+    ("previsão do tempo em {c}", "clima", "hoje"),
+    ("tempo de {c}", "clima", "hoje"),
+    ("qual a temperatura em {c}?", "clima", "hoje"),
+    ("como está o clima agora em {c}", "clima", "hoje"),
+    ("Previsão para amanhã em {c}", "clima", "amanha"),
+    ("temperatura amanhã em {c}?", "clima", "amanha"),
+    ("previsão de chuva em {c}", "clima", "hoje"),
+    ("vai chover hoje em {c}?", "chuva", "hoje"),
+    ("Vai chover amanhã em {c}?", "chuva", "amanha"),
+    ("vai chover em {c} amanhã?", "chuva", "amanha"),
+    ("vai chover no fim de semana em {c}?", "chuva", "semana"),
+    ("choverá em {c} esta semana?", "chuva", "semana"),
+    ("previsão da semana para {c}", "semana", "semana"),
+    ("previsão do tempo para a próxima semana em {c}", "semana", "semana"),
+    ("como fica o tempo em {c} essa semana?", "semana", "semana"),
+    ("What's the weather in {c}?", "clima", "hoje"),
+    ("weather forecast for {c} this week", "semana", "semana"),
+    ("Will it rain in {c} tomorrow?", "chuva", "amanha"),
+    ("will it rain in {c} today", "chuva", "hoje"),
+    ("temperature in {c} now", "clima", "hoje"),
+    ("quanto vou gerar amanhã em {c}?", "geracao", "amanha"),
+    ("previsão de geração em {c} esta semana", "geracao", "semana"),
+    ("how much will I generate in {c} today?", "geracao", "hoje"),
+    # conectores depois do lugar não entram no nome
+    ("tempo em {c} para amanhã", "clima", "amanha"),
+    ("vai chover em {c} pra amanhã?", "chuva", "amanha"),
+    ("weather in {c} for tomorrow", "clima", "amanha"),
+    ("vai chover em {c} durante a semana?", "chuva", "semana"),
+    ("tempo em {c} de manhã", "clima", "hoje"),
+    ("previsão para {c} à noite", "clima", "hoje"),
+]
+
+SEM_LUGAR = [
+    ("previsão do tempo", "clima", "hoje"),
+    ("vai chover?", "chuva", "hoje"),
+    ("vai chover amanhã?", "chuva", "amanha"),
+    ("previsão para a semana", "semana", "semana"),
+    ("qual a temperatura agora?", "clima", "hoje"),
+    ("will it rain tomorrow?", "chuva", "amanha"),
+    ("quanto vou gerar amanhã?", "geracao", "amanha"),
+    ("qual a produção prevista para hoje?", "geracao", "hoje"),
+]
+
+LLM = [
+    "o que é irradiância?",
+    "como funciona um inversor?",
+    "Quantos painéis preciso para 500 kWh por mês?",
+    "what is a solar inverter?",
+    "qual a diferença entre kW e kWh?",
+    "me explique o que é geolocalização",
+    "how do I clean solar panels?",
+    # falam de geração sem pedir previsão: vão para o Gemini
+    "o que é geração distribuída?",
+    "como funciona a geração de energia solar?",
+    "qual a produção de um painel de 400W?",
+    "how does solar generation work?",
+]
+
+
+# Formulações livres, mantidas fora dos modelos acima: (texto, tipo, lugar, horizonte)
+FORA_DOS_MODELOS = [
+    ("Lisboa, como tá o tempo aí?", "clima", "Lisboa", "hoje"),
+    ("preciso de guarda-chuva amanhã em Curitiba?", "chuva", "Curitiba", "amanha"),
+    ("tá frio em Porto Alegre agora?", "clima", "Porto Alegre", "hoje"),
+    ("quantos graus faz em Recife?", "clima", "Recife", "hoje"),
+    ("será que chove amanhã?", "chuva", "", "amanha"),
+    ("como vai estar o clima no fim de semana em Salvador?", "semana", "Salvador", "semana"),
+    ("quantos kWh minha usina deve gerar amanhã?", "geracao", "", "amanha"),
+    ("vou produzir bem hoje?", "geracao", "", "hoje"),
+    ("is it going to be hot in Madrid tomorrow?", "clima", "Madrid", "amanha"),
+    ("how much energy will my panels produce this week?", "geracao", "", "semana"),
+    ("minha usina está rendendo bem?", "desempenho", "", None),
+    ("how are my plants performing?", "desempenho", "", None),
+    # negativos difíceis: vocabulário de clima/geração, mas a pergunta é para o Gemini
+    ("por que chove mais no verão?", "llm", "", None),
+    ("o que é geração distribuída?", "llm", "", None),
+    ("como funciona a geração de energia solar?", "llm", "", None),
+    ("qual a produção de um painel de 400W?", "llm", "", None),
+    ("how does solar generation work?", "llm", "", None),
+    ("a chuva limpa os painéis solares?", "llm", "", None),
+    ("o clima frio aumenta a eficiência dos painéis?", "llm", "", None),
+    ("what is the difference between weather and climate?", "llm", "", None),
+    ("por que a produção cai no inverno?", "llm", "", None),
+    ("o que é desempenho de um inversor?", "llm", "", None),
+    ("faz sol amanhã em Fortaleza?", "clima", "Fortaleza", "amanha"),
+    ("vai esfriar em Curitiba essa semana?", "semana", "Curitiba", "semana"),
+    ("como estará o tempo em Manaus pela manhã?", "clima", "Manaus", "hoje"),
+    ("chove hoje em Belo Horizonte?", "chuva", "Belo Horizonte", "hoje"),
+    ("tem previsão de tempestade para Porto amanhã?", "clima", "Porto", "amanha"),
+    ("será que vai fazer frio no Rio de Janeiro amanhã?", "clima", "Rio de Janeiro", "amanha"),
+    ("is it raining in London right now?", "chuva", "London", "hoje"),
+    ("how cold will it be in Tokyo this weekend?", "semana", "Tokyo", "semana"),
+    ("quanto a minha usina gera num dia de chuva?", "llm", "", None),
+    ("qual o melhor ângulo dos painéis no inverno?", "llm", "", None),
+    ("chuva de granizo estraga painel solar?", "llm", "", None),
+    ("explique a previsão de irradiância", "llm", "", None),
+    ("quanto tempo leva para instalar uma usina?", "llm", "", None),
+    ("does cloudy weather stop solar panels from working?", "llm", "", None),
+]
+
+
+def gerar_corpus(n: int, semente: int = 7):
+    rnd = random.Random(semente)
+    corpus = []
+    while len(corpus) < n:
+        sorteio = rnd.random()
+        if sorteio < 0.65:
+            modelo, tipo, horizonte = rnd.choice(MODELOS)
+            cidade = rnd.choice(CIDADES)
+            texto = modelo.format(c=cidade)
+        elif sorteio < 0.8:
+            texto, tipo, horizonte = rnd.choice(SEM_LUGAR)
+            cidade = ""
+        else:
+            texto, tipo, horizonte, cidade = rnd.choice(LLM), "llm", None, ""
+        if rnd.random() < 0.3:
+            texto = texto.lower()
+        corpus.append((texto, tipo, cidade, horizonte))
+    return corpus
+
+
+def avaliar(corpus, resultados) -> dict:
+    """Acerto (tipo+lugar+horizonte) e precisão/revocação do tipo, por intenção."""
+    erros = []
+    vp, previstos, reais = {}, {}, {}
+    for (texto, tipo, cidade, horizonte), r in zip(corpus, resultados):
+        previstos[r.tipo] = previstos.get(r.tipo, 0) + 1
+        reais[tipo] = reais.get(tipo, 0) + 1
+        if r.tipo == tipo:
+            vp[tipo] = vp.get(tipo, 0) + 1
+        ok = r.tipo == tipo and r.cidade.lower() == cidade.lower()
+        if horizonte is not None:
+            ok = ok and r.horizonte == horizonte
+        if not ok:
+            erros.append({"texto": texto, "esperado": [tipo, cidade, horizonte], "obtido": list(r)})
+    por_intencao = {
+        t: {"precisao": round(vp.get(t, 0) / previstos[t], 4) if previstos.get(t) else None,
+            "revocacao": round(vp.get(t, 0) / reais[t], 4) if reais.get(t) else None}
+        for t in sorted(set(previstos) | set(reais))
+    }
+    return {"mensagens": len(corpus), "acerto": round(1 - len(erros) / len(corpus), 4),
+            "por_intencao": por_intencao, "exemplos_de_erro": erros[:10]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=3000)
+    ap.add_argument("--repeticoes", type=int, default=5)
+    args = ap.parse_args()
+
+    corpus = gerar_corpus(args.n)
+    textos = [c[0] for c in corpus]
+
+    melhor = float("inf")
+    for _ in range(args.repeticoes):
+        t0 = time.perf_counter()
+        resultados = [classificar(t) for t in textos]
+        melhor = min(melhor, time.perf_counter() - t0)
+
+    resultado_modelos = avaliar(corpus, resultados)
+    resultado_fora = avaliar(FORA_DOS_MODELOS, [classificar(c[0]) for c in FORA_DOS_MODELOS])
+
+    print(json.dumps({
+        "bench": "roteador_intencoes",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mensagens": len(corpus),
+        "msgs_por_s": round(len(corpus) / melhor),
+        "us_por_msg": round(melhor / len(corpus) * 1e6, 2),
+        "modelos": resultado_modelos,
+        "fora_dos_modelos": resultado_fora,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
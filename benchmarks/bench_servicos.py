@@ -0,0 +1,171 @@
+"""
+Benchmark ponta a ponta dos caminhos que dependem de serviços externos:
+Clima.geocode, Clima.consultar_api / consultar_horario, main.ia e os gráficos.
+
+Tudo roda contra o servidor_falso.py (Open-Meteo local, com latência e taxa
+de erro configuráveis) e um LLM falso, então os números são comparáveis
+entre máquinas e versões sem tocar nos serviços reais.
+
+Cenários:
+- frio x quente: primeira chamada (caches vazios) e repetição;
+- horizonte longo: conversão da previsão horária com --dias (até 16);
+- sessões concorrentes: N sessões simultâneas (geocode -> previsão ->
+  gráficos -> pergunta ao LLM), com latência por sessão e vazão total.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_servicos.py --latencia-ms 40 --taxa-erro 0.02 --sessoes 16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import Clima  # noqa: E402
+import graficos  # noqa: E402
+import main  # noqa: E402
+from cache import ArmazemSQLite  # noqa: E402
+from servidor_falso import LLMFalso, ServidorFalso  # noqa: E402
+
+CIDADES = [
+    "São Paulo", "Lisboa", "Porto Alegre", "Rio de Janeiro", "Belo Horizonte",
+    "Curitiba", "Recife", "Paris", "London", "New York", "Tokyo",
+    "Fortaleza", "Salvador", "Manaus", "Porto", "Buenos Aires", "Madrid",
+]
+
+
+def limpar_caches(dir_tmp: str) -> None:
+    Clima._cache_previsao.limpar()
+    Clima._cache_geocode.limpar()
+    # SQLite de geocodificação novo a cada rodada (não mexe no arquivo do app)
+    Clima._armazem_geocode = ArmazemSQLite(
+        os.path.join(dir_tmp, f"geo_{time.perf_counter_ns()}.sqlite3"), tabela="geocode")
+    main._cache_respostas.limpar()
+    main._armazem_respostas = None
+    graficos._cache_graficos.limpar()
+
+
+def resumo(tempos_s) -> dict:
+    ms = np.asarray(tempos_s, dtype=np.float64) * 1000
+    if ms.size == 0:
+        return {}
+    return {
+        "n": int(ms.size),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def medir(func, repeticoes: int = 1):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    return tempos
+
+
+def frio_quente(nome: str, func, dir_tmp: str, repeticoes: int) -> dict:
+    """Mede a chamada com caches vazios e depois repetida (cache quente)."""
+    frio = []
+    for _ in range(repeticoes):
+        limpar_caches(dir_tmp)
+        frio += medir(func)
+    quente = medir(func, repeticoes)
+    return {"cenario": nome, "frio": resumo(frio), "quente": resumo(quente)}
+
+
+def sessao(cidade: str, llm: LLMFalso) -> float:
+    """Uma sessão típica: acha o lugar, consulta a previsão, desenha e pergunta ao LLM."""
+    t0 = time.perf_counter()
+    lugar = main._resolver_lugar(cidade)   # geocode + dict no formato do app
+    hourly, daily = Clima.consultar_api(lugar)
+    graficos.grafico_temp_horaria(lugar, hourly)
+    graficos.grafico_semana_min_max(lugar, daily)
+    graficos.grafico_semana_chuva(lugar, daily)
+    main.ia(f"como funciona um inversor em {cidade}?", modelo=llm)
+    return time.perf_counter() - t0
+
+
+def main_():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latencia-ms", type=float, default=40.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--taxa-erro", type=float, default=0.0)
+    ap.add_argument("--llm-primeiro-ms", type=float, default=300.0)
+    ap.add_argument("--dias", type=int, default=16, help="horizonte do cenário longo (máx. 16)")
+    ap.add_argument("--sessoes", type=int, default=16)
+    ap.add_argument("--repeticoes", type=int, default=5)
+    args = ap.parse_args()
+
+    srv = ServidorFalso(args.latencia_ms, args.jitter_ms, args.taxa_erro).iniciar()
+    srv.apontar_clima()
+    llm = LLMFalso(primeiro_ms=args.llm_primeiro_ms)
+    lugar = {"nome": "Lisboa", "latitude": 38.71667, "longitude": -9.13333, "timezone": "Europe/Lisbon"}
+    resultados = []
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        r = args.repeticoes
+        resultados.append(frio_quente("geocode", lambda: Clima.geocode("Lisboa, Portugal"), dir_tmp, r))
+        resultados.append(frio_quente("consultar_api", lambda: Clima.consultar_api(lugar), dir_tmp, r))
+        resultados.append(frio_quente("ia_llm", lambda: main.ia("o que é irradiância?", modelo=llm), dir_tmp, r))
+        resultados.append(frio_quente("ia_clima", lambda: main.ia("previsão do tempo em Lisboa"), dir_tmp, r))
+
+        def desenhar():
+            hourly, daily = Clima.consultar_api(lugar)
+            graficos.grafico_temp_horaria(lugar, hourly)
+            graficos.grafico_semana_min_max(lugar, daily)
+            graficos.grafico_semana_chuva(lugar, daily)
+        resultados.append(frio_quente("graficos", desenhar, dir_tmp, r))
+
+        # horizonte longo: só a conversão (JSON já no cache)
+        dias_antes = Clima.DIAS_PREVISAO
+        Clima.DIAS_PREVISAO = args.dias
+        limpar_caches(dir_tmp)
+        Clima.get_forecast(lugar["latitude"], lugar["longitude"], lugar["timezone"])
+        horas = len(Clima.consultar_horario(lugar))
+        resultados.append({
+            "cenario": f"consultar_horario_{args.dias}d",
+            "horas": horas,
+            "quente": resumo(medir(lambda: Clima.consultar_horario(lugar), r * 4)),
+        })
+        Clima.DIAS_PREVISAO = dias_antes
+
+        # sessões concorrentes (caches frios no início)
+        limpar_caches(dir_tmp)
+        cidades = [CIDADES[i % len(CIDADES)] for i in range(args.sessoes)]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessoes) as ex:
+            tempos = list(ex.map(lambda c: sessao(c, llm), cidades))
+        total = time.perf_counter() - t0
+        resultados.append({
+            "cenario": "sessoes_concorrentes",
+            "sessoes": args.sessoes,
+            "por_sessao": resumo(tempos),
+            "total_ms": round(total * 1000, 2),
+            "sessoes_por_s": round(args.sessoes / total, 2),
+        })
+
+    srv.parar()
+    print(json.dumps({
+        "bench": "servicos",
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "latencia_ms": args.latencia_ms, "jitter_ms": args.jitter_ms, "taxa_erro": args.taxa_erro,
+            "llm_primeiro_ms": args.llm_primeiro_ms, "dias": args.dias,
+        },
+        "requisicoes_servidor": srv.requisicoes,
+        "llm_chamadas": llm.chamadas,
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main_()
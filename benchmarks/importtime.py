@@ -0,0 +1,80 @@
+"""
+Relatório de tempo de import (python -X importtime) dos módulos do app.
+
+Serve como checagem de regressão do cold start: falha (código 1) se algum
+módulo pesado que deveria ser carregado sob demanda aparecer no import de
+`main`/`Clima`, ou se o tempo total passar do orçamento.
+
+Uso (na raiz do projeto):
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --orcamento-ms 1500 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Carregados só no primeiro uso (chat, gráficos, usina, consulta em lote)
+PROIBIDOS = [
+    "google.generativeai",
+    "matplotlib",
+    "sems_portal_api",
+    "aiohttp",
+    "streamlit",
+]
+
+_re_linha = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir(modulo: str):
+    """Roda `import modulo` num processo novo e devolve [(nome, self_us, cumul_us, nivel)]."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"falha ao importar {modulo}:\n{proc.stderr[-2000:]}")
+    linhas = []
+    for linha in proc.stderr.splitlines():
+        m = _re_linha.match(linha)
+        if m:
+            linhas.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return linhas
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--modulos", nargs="+", default=["Clima", "main"])
+    ap.add_argument("--orcamento-ms", type=float, default=2000.0,
+                    help="tempo máximo de import (cumulativo) por módulo")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    relatorio, falhas = {}, []
+    for modulo in args.modulos:
+        linhas = medir(modulo)
+        nomes = {nome for nome, *_ in linhas}
+        total_ms = next((c for nome, _, c, _ in linhas if nome == modulo), 0) / 1000
+        pesados = [p for p in PROIBIDOS if any(n == p or n.startswith(p + ".") for n in nomes)]
+        top = sorted(linhas, key=lambda l: l[2], reverse=True)[:args.top]
+        relatorio[modulo] = {
+            "total_ms": round(total_ms, 1),
+            "modulos_importados": len(linhas),
+            "top_cumulativo_ms": [(nome, round(c / 1000, 1)) for nome, _, c, _ in top],
+            "pesados_no_import": pesados,
+        }
+        if pesados:
+            falhas.append(f"{modulo}: importa {', '.join(pesados)} no carregamento")
+        if total_ms > args.orcamento_ms:
+            falhas.append(f"{modulo}: {total_ms:.0f} ms > orçamento de {args.orcamento_ms:.0f} ms")
+
+    print(json.dumps({"importtime": relatorio, "falhas": falhas}, indent=2, ensure_ascii=False))
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
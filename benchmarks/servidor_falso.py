@@ -0,0 +1,182 @@
+"""
+Substitutos locais da Open-Meteo e do Gemini para os benchmarks.
+
+- ServidorFalso: servidor HTTP em 127.0.0.1 que responde geocodificação
+  (gravações em benchmarks/gravacoes/geocode.json; nomes desconhecidos ganham
+  coordenadas sintéticas estáveis) e previsão (no formato unixtime da API,
+  com o horizonte pedido em forecast_days e vários locais por requisição).
+  Latência e taxa de erro (503) são configuráveis.
+- LLMFalso: objeto com generate_content(msg, stream=False) que imita o
+  tempo até o primeiro pedaço e a vazão do modelo.
+
+Uso em outro script:
+    srv = ServidorFalso(latencia_ms=40, taxa_erro=0.02).iniciar()
+    srv.apontar_clima()   # Clima.FORECAST_URL/GEOCODE_URL -> servidor local
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+GRAVACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gravacoes")
+
+
+def _carregar_geocode():
+    caminho = os.path.join(GRAVACOES, "geocode.json")
+    with open(caminho, encoding="utf-8") as f:
+        return {nome.casefold(): dados for nome, dados in json.load(f).items()}
+
+
+def _geocode_sintetico(nome: str):
+    h = int(hashlib.blake2b(nome.casefold().encode(), digest_size=8).hexdigest(), 16)
+    return {"results": [{
+        "name": nome.title(),
+        "latitude": round(-33 + (h % 3800) / 100, 4),
+        "longitude": round(-73 + (h // 3800 % 3800) / 100, 4),
+        "country_code": "BR", "country": "Brasil", "timezone": "America/Sao_Paulo",
+    }]}
+
+
+def previsao_sintetica(lat: float, lon: float, dias: int, agora: float = None):
+    """JSON no formato da Open-Meteo (timeformat=unixtime, timezone GMT)."""
+    agora = time.time() if agora is None else agora
+    ini = int(agora // 86400 * 86400)
+    epoch_h = ini + np.arange(dias * 24, dtype=np.int64) * 3600
+    hora = (epoch_h // 3600 + round(lon / 15)) % 24
+    sol = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None)
+    rng = np.random.default_rng(int(abs(lat * 1000 + lon)))
+    nuvens = rng.uniform(0, 100, epoch_h.size).round()
+    ghi = (sol * 950 * (1 - nuvens / 140)).round()
+    temp = (18 + 8 * sol + rng.normal(0, 1, epoch_h.size)).round(1)
+    chuva = np.where(rng.random(epoch_h.size) < 0.08, rng.uniform(0.1, 4, epoch_h.size), 0).round(1)
+    epoch_d = ini + np.arange(dias, dtype=np.int64) * 86400
+    return {
+        "latitude": lat, "longitude": lon, "timezone": "GMT", "utc_offset_seconds": 0,
+        "current": {"time": int(agora // 900 * 900), "temperature_2m": float(temp[0]),
+                    "precipitation": 0.0, "weather_code": 2},
+        "hourly": {
+            "time": epoch_h.tolist(),
+            "temperature_2m": temp.tolist(),
+            "precipitation": chuva.tolist(),
+            "shortwave_radiation": ghi.tolist(),
+            "direct_radiation": (ghi * 0.7).round().tolist(),
+            "diffuse_radiation": (ghi * 0.3).round().tolist(),
+            "direct_normal_irradiance": (ghi * 0.9).round().tolist(),
+            "cloud_cover": nuvens.tolist(),
+        },
+        "daily": {
+            "time": epoch_d.tolist(),
+            "temperature_2m_max": temp.reshape(dias, 24).max(axis=1).tolist(),
+            "temperature_2m_min": temp.reshape(dias, 24).min(axis=1).tolist(),
+            "precipitation_sum": chuva.reshape(dias, 24).sum(axis=1).round(1).tolist(),
+        },
+    }
+
+
+class ServidorFalso:
+    """Open-Meteo local com latência (média ± jitter) e taxa de erro configuráveis."""
+
+    def __init__(self, latencia_ms: float = 0.0, jitter_ms: float = 0.0, taxa_erro: float = 0.0,
+                 semente: int = 1):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_erro = taxa_erro
+        self._rnd = random.Random(semente)
+        self._lock = threading.Lock()
+        self._geocode = _carregar_geocode()
+        self.requisicoes = {"geocode": 0, "forecast": 0, "erros": 0}
+        self._srv = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._srv.server_port}"
+
+    def _sortear(self):
+        with self._lock:
+            atraso = max(0.0, self.latencia_ms + self._rnd.uniform(-self.jitter_ms, self.jitter_ms))
+            erro = self._rnd.random() < self.taxa_erro
+        return atraso / 1000, erro
+
+    def _responder(self, caminho: str, q: dict):
+        if "search" in caminho:
+            nome = q.get("name", "")
+            self.requisicoes["geocode"] += 1
+            return self._geocode.get(nome.casefold()) or _geocode_sintetico(nome)
+        self.requisicoes["forecast"] += 1
+        dias = int(q.get("forecast_days", 7))
+        lats = [float(v) for v in q["latitude"].split(",")]
+        lons = [float(v) for v in q["longitude"].split(",")]
+        corpos = [previsao_sintetica(a, b, dias) for a, b in zip(lats, lons)]
+        return corpos if len(corpos) > 1 else corpos[0]
+
+    def iniciar(self) -> "ServidorFalso":
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                u = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(u.query).items()}
+                atraso, erro = servidor._sortear()
+                time.sleep(atraso)
+                if erro:
+                    servidor.requisicoes["erros"] += 1
+                    corpo, status = b'{"error": true, "reason": "falha simulada"}', 503
+                else:
+                    corpo, status = json.dumps(servidor._responder(u.path, q)).encode(), 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._srv.daemon_threads = True
+        threading.Thread(target=self._srv.serve_forever, name="servidor-falso", daemon=True).start()
+        return self
+
+    def apontar_clima(self) -> None:
+        """Faz o Clima usar este servidor no lugar da Open-Meteo."""
+        import Clima
+        Clima.FORECAST_URL = f"{self.url}/v1/forecast"
+        Clima.GEOCODE_URL = f"{self.url}/v1/search"
+
+    def parar(self) -> None:
+        if self._srv is not None:
+            self._srv.shutdown()
+            self._srv.server_close()
+
+
+class LLMFalso:
+    """Imita o GenerativeModel: espera `primeiro_ms` e solta `pedacos` a cada `ms_por_pedaco`."""
+
+    def __init__(self, primeiro_ms: float = 400.0, pedacos: int = 20, ms_por_pedaco: float = 15.0):
+        self.primeiro_ms = primeiro_ms
+        self.pedacos = pedacos
+        self.ms_por_pedaco = ms_por_pedaco
+        self.chamadas = 0
+
+    def _partes(self, msg: str):
+        time.sleep(self.primeiro_ms / 1000)
+        for i in range(self.pedacos):
+            if i:
+                time.sleep(self.ms_por_pedaco / 1000)
+            yield SimpleNamespace(text=f"parte {i} sobre {msg[:20]}. ")
+
+    def generate_content(self, msg: str, stream: bool = False):
+        self.chamadas += 1
+        partes = self._partes(msg)
+        if stream:
+            return partes
+        return SimpleNamespace(text="".join(p.text for p in partes))
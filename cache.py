@@ -0,0 +1,179 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# ------------------ NORMALIZAÇÃO DE CHAVES ------------------ #
+_re_pontuacao = re.compile(r"[^\w\s]", re.UNICODE)
+_re_espacos = re.compile(r"\s+")
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Normaliza texto para uso como chave de cache:
+    minúsculas, sem acentos, sem pontuação e com espaços colapsados.
+    """
+    t = unicodedata.normalize("NFKD", (texto or "").casefold())
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    t = _re_pontuacao.sub(" ", t)
+    return _re_espacos.sub(" ", t).strip()
+
+# ------------------ CACHE LRU COM EXPIRAÇÃO ------------------ #
+_AUSENTE = object()
+
+
+class CacheTTL:
+    """
+    Cache LRU em memória com expiração por entrada.
+    Compartilhado entre as sessões do Streamlit (protegido por lock).
+    Com `max_bytes`, também limita a soma de len(valor) (ex.: imagens em bytes).
+    """
+
+    def __init__(self, max_itens: int = 256, ttl: float = 300.0, max_bytes: Optional[int] = None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._dados: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+        self.removidos = 0
+
+    def get(self, chave: Hashable, default: Any = None) -> Any:
+        """Retorna o valor se existir e não estiver vencido; senão `default`."""
+        agora = time.time()
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                self.misses += 1
+                return default
+            valor, expira_em = item
+            if expira_em <= agora:
+                del self._dados[chave]
+                self.bytes -= self._tamanho(valor)
+                self.expirados += 1
+                self.misses += 1
+                return default
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def set(self, chave: Hashable, valor: Any, expira_em: Optional[float] = None,
+            ttl: Optional[float] = None) -> None:
+        """
+        Guarda um valor. A validade vem de `expira_em` (epoch) ou,
+        se não informado, de `ttl` (padrão do cache).
+        """
+        if expira_em is None:
+            expira_em = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            antigo = self._dados.pop(chave, _AUSENTE)
+            if antigo is not _AUSENTE:
+                self.bytes -= self._tamanho(antigo[0])
+            self._dados[chave] = (valor, expira_em)
+            self.bytes += self._tamanho(valor)
+            while len(self._dados) > self.max_itens or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._dados) > 1
+            ):
+                _, (removido, _) = self._dados.popitem(last=False)
+                self.bytes -= self._tamanho(removido)
+                self.removidos += 1
+
+    def _tamanho(self, valor: Any) -> int:
+        return len(valor) if self.max_bytes is not None else 0
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+            self.bytes = 0
+
+    def valores(self) -> list:
+        """Valores ainda válidos (sem mexer na ordem do LRU nem nos contadores)."""
+        agora = time.time()
+        with self._lock:
+            return [v for v, expira_em in self._dados.values() if expira_em > agora]
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de uso (hits/misses/expirados/removidos por LRU)."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_hit": (self.hits / total) if total else 0.0,
+                "expirados": self.expirados,
+                "removidos": self.removidos,
+                "tamanho": len(self._dados),
+                "max_itens": self.max_itens,
+                "bytes": self.bytes,
+            }
+
+
+# ------------------ ARMAZÉM PERSISTENTE (SQLITE) ------------------ #
+class ArmazemSQLite:
+    """
+    Chave/valor em SQLite com expiração, para sobreviver a reinícios do Streamlit.
+    Os valores são gravados como JSON. Se o arquivo não puder ser aberto,
+    o armazém fica desativado e as consultas simplesmente não encontram nada.
+    """
+
+    def __init__(self, caminho: str, tabela: str = "cache"):
+        self.caminho = caminho
+        self.tabela = tabela
+        self._lock = threading.Lock()
+        try:
+            self._con = sqlite3.connect(caminho, check_same_thread=False, timeout=5)
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute(
+                f"CREATE TABLE IF NOT EXISTS {tabela} ("
+                "chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira_em REAL NOT NULL)"
+            )
+            self._con.commit()
+        except sqlite3.Error:
+            self._con = None
+
+    def get(self, chave: str) -> Tuple[bool, Any, float]:
+        """Retorna (encontrado, valor, expira_em); entradas vencidas não contam."""
+        if self._con is None:
+            return False, None, 0.0
+        try:
+            with self._lock:
+                row = self._con.execute(
+                    f"SELECT valor, expira_em FROM {self.tabela} WHERE chave = ?", (chave,)
+                ).fetchone()
+        except sqlite3.Error:
+            return False, None, 0.0
+        if not row or row[1] <= time.time():
+            return False, None, 0.0
+        return True, json.loads(row[0]), row[1]
+
+    def set(self, chave: str, valor: Any, ttl: float) -> None:
+        if self._con is None:
+            return
+        try:
+            with self._lock:
+                self._con.execute(
+                    f"INSERT OR REPLACE INTO {self.tabela} (chave, valor, expira_em) VALUES (?, ?, ?)",
+                    (chave, json.dumps(valor, ensure_ascii=False), time.time() + ttl),
+                )
+                self._con.commit()
+        except sqlite3.Error:
+            pass
+
+    def limpar_expirados(self) -> None:
+        if self._con is None:
+            return
+        try:
+            with self._lock:
+                self._con.execute(f"DELETE FROM {self.tabela} WHERE expira_em <= ?", (time.time(),))
+                self._con.commit()
+        except sqlite3.Error:
+            pass
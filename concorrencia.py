@@ -0,0 +1,125 @@
+"""
+Controle de chamadas externas compartilhado por todas as sessões do processo.
+
+- VooUnico: chamadas idênticas simultâneas (mesma chave) esperam uma única
+  execução em andamento e recebem o mesmo resultado (single-flight);
+- BaldeTokens: orçamento de requisições por segundo (token bucket). Em rajadas
+  as chamadas entram numa fila (esperam a vez) em vez de tomar 429 da API.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Voo:
+    __slots__ = ("pronto", "valor", "erro", "esperando")
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.valor = None
+        self.erro: Optional[BaseException] = None
+        self.esperando = 0
+
+
+class VooUnico:
+    """Coalesce chamadas concorrentes com a mesma chave numa só execução."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo: Dict[Hashable, _Voo] = {}
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    def executar(self, chave: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Executa `func()` se ninguém estiver executando a mesma `chave`; senão
+        espera a execução em andamento e devolve o resultado dela (ou relança
+        a mesma exceção).
+        """
+        with self._lock:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = _Voo()
+                self.execucoes += 1
+            else:
+                voo.esperando += 1
+                self.coalescidas += 1
+
+        if not lider:
+            voo.pronto.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.valor
+
+        try:
+            voo.valor = func()
+            return voo.valor
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_voo.pop(chave, None)
+            voo.pronto.set()
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            em_voo = len(self._em_voo)
+        return {"execucoes": self.execucoes, "coalescidas": self.coalescidas, "em_voo": em_voo}
+
+
+class BaldeTokens:
+    """
+    Token bucket com reserva: cada chamada reserva um token e espera o tempo
+    necessário para ele existir. Assim a fila é justa (ordem de chegada) e a
+    vazão nunca passa de `taxa_por_s`, com rajadas de até `capacidade`.
+    """
+
+    def __init__(self, taxa_por_s: float, capacidade: float):
+        self.taxa_por_s = float(taxa_por_s)
+        self.capacidade = float(capacidade)
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+        self.esperas = 0
+        self.recusadas = 0
+
+    def reservar(self, n: float = 1, espera_max: Optional[float] = None) -> Optional[float]:
+        """
+        Reserva `n` tokens e devolve quantos segundos esperar antes de usar.
+        Se a espera passar de `espera_max`, não reserva e devolve None.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa_por_s)
+            self._ultimo = agora
+            espera = max(0.0, (n - self._tokens) / self.taxa_por_s)
+            if espera_max is not None and espera > espera_max:
+                self.recusadas += 1
+                return None
+            self._tokens -= n
+            if espera > 0:
+                self.esperas += 1
+            return espera
+
+    def aguardar(self, n: float = 1, espera_max: Optional[float] = None) -> bool:
+        """Versão bloqueante de reservar(): dorme até a vez chegar. False se recusada."""
+        espera = self.reservar(n, espera_max)
+        if espera is None:
+            return False
+        if espera > 0:
+            time.sleep(espera)
+        return True
+
+    def estatisticas(self) -> Dict[str, float]:
+        with self._lock:
+            decorrido = time.monotonic() - self._ultimo
+            tokens = min(self.capacidade, self._tokens + decorrido * self.taxa_por_s)
+        return {
+            "taxa_por_s": self.taxa_por_s,
+            "capacidade": self.capacidade,
+            "tokens": round(tokens, 2),   # negativo = fila de espera
+            "esperas": self.esperas,
+            "recusadas": self.recusadas,
+        }
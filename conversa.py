@@ -0,0 +1,184 @@
+"""
+Histórico do chat por sessão, com tamanho limitado.
+
+As últimas mensagens ficam num ring buffer (são as que a aba desenha como
+balões a cada rerun); as que saem dele vão para um arquivo compacto, também
+limitado, mostrado só quando o usuário pede. Memória e tempo de render ficam
+constantes, não importa quanto a conversa dure.
+
+O que vai para o Gemini é outra coisa (ContextoConversa): os últimos turnos
+que cabem num orçamento de tokens, um resumo rolante dos turnos mais antigos
+e os resultados das consultas de clima numa linha compacta cada. O prompt
+tem tamanho limitado, então a latência de cada turno não cresce com a conversa.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+MAX_RECENTES = 30
+MAX_ANTIGAS = 300
+
+# orçamento do contexto enviado ao Gemini (tokens estimados por caracteres)
+CONTEXTO_TOKENS = int(os.getenv("CHAT_CONTEXTO_TOKENS", "1500"))
+RESUMO_TOKENS = CONTEXTO_TOKENS // 5       # resumo dos turnos que saíram da janela
+FATOS_TOKENS = CONTEXTO_TOKENS // 5        # resultados de clima já mostrados
+TURNO_TOKENS_MAX = CONTEXTO_TOKENS // 4    # um turno longo não expulsa todos os outros
+CARACTERES_POR_TOKEN = 4
+RESUMO_PERGUNTA_CHARS = 80
+RESUMO_RESPOSTA_CHARS = 120
+FATO_CHARS = 320
+
+
+class Mensagem(NamedTuple):
+    role: str      # "user" ou "assistant"
+    content: str
+
+
+class HistoricoChat:
+    """Ring buffer das mensagens recentes + arquivo das anteriores (e o contexto do Gemini)."""
+
+    def __init__(self, max_recentes: int = MAX_RECENTES, max_antigas: int = MAX_ANTIGAS):
+        self.recentes: deque = deque(maxlen=max_recentes)
+        self.antigas: deque = deque(maxlen=max_antigas)
+        self.descartadas = 0
+        self.contexto = ContextoConversa()
+
+    def adicionar(self, role: str, content: str) -> Mensagem:
+        if len(self.recentes) == self.recentes.maxlen:
+            if len(self.antigas) == self.antigas.maxlen:
+                self.descartadas += 1
+            self.antigas.append(self.recentes[0])
+        m = Mensagem(role, content or "")
+        self.recentes.append(m)
+        return m
+
+    def __iter__(self) -> Iterator[Mensagem]:
+        return iter(self.recentes)
+
+    def __len__(self) -> int:
+        return len(self.antigas) + len(self.recentes)
+
+    def texto_antigas(self) -> str:
+        """Mensagens arquivadas num único bloco de markdown (um elemento só na tela)."""
+        rotulo = {"user": "Você", "assistant": "Solar I.A."}
+        return "\n\n".join(f"**{rotulo.get(m.role, m.role)}:** {m.content}" for m in self.antigas)
+
+
+# ------------------ CONTEXTO PARA O GEMINI ------------------ #
+def estimar_tokens(texto: str) -> int:
+    """Estimativa barata (~4 caracteres por token), boa o bastante para orçamento."""
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def compactar(texto: str, limite: Optional[int] = None) -> str:
+    """Markdown de uma resposta numa linha só (sem negrito/listas), cortada em `limite` caracteres."""
+    linha = re.sub(r"[*_`#]+", "", texto or "")
+    linha = "; ".join(p.strip(" -•") for p in linha.splitlines() if p.strip(" -•"))
+    if limite is not None and len(linha) > limite:
+        linha = linha[: limite - 1].rstrip() + "…"
+    return linha
+
+
+def _primeira_frase(texto: str) -> str:
+    linha = compactar(texto)
+    m = re.search(r"(?<=[.!?])\s", linha)
+    return linha[: m.start()] if m else linha
+
+
+class Turno(NamedTuple):
+    pergunta: str
+    resposta: str
+    tokens: int
+
+
+class ContextoConversa:
+    """
+    Contexto da conversa de uma sessão para o Gemini, dentro de um orçamento fixo:
+    - turnos recentes (pergunta/resposta), os mais novos primeiro a ficar;
+    - resumo rolante: cada turno que sai da janela vira uma linha curta;
+    - fatos de clima: uma linha por (tipo, lugar, horizonte), a mais recente vale.
+    Todas as partes mantêm a própria contagem de tokens, então registrar e
+    montar o prompt custam o mesmo no 5º e no 500º turno.
+    `ultima_intencao` guarda a última pergunta de clima, para seguimentos
+    como "e amanhã?".
+    """
+
+    def __init__(self, orcamento: int = CONTEXTO_TOKENS):
+        self.orcamento = orcamento
+        self.turnos: deque = deque()
+        self.resumo: deque = deque()
+        self.fatos: "OrderedDict[tuple, str]" = OrderedDict()
+        self.ultima_intencao = None
+        self.compactados = 0
+        self._tokens_turnos = 0
+        self._tokens_resumo = 0
+        self._tokens_fatos = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.turnos or self.resumo or self.fatos)
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens_turnos + self._tokens_resumo + self._tokens_fatos
+
+    def _limite_turnos(self) -> int:
+        return self.orcamento - min(self._tokens_resumo, RESUMO_TOKENS) - min(self._tokens_fatos, FATOS_TOKENS)
+
+    def _resumir(self, turno: Turno) -> None:
+        linha = (f"- {compactar(turno.pergunta, RESUMO_PERGUNTA_CHARS)} → "
+                 f"{compactar(_primeira_frase(turno.resposta), RESUMO_RESPOSTA_CHARS)}")
+        self.resumo.append(linha)
+        self._tokens_resumo += estimar_tokens(linha)
+        while self._tokens_resumo > RESUMO_TOKENS and len(self.resumo) > 1:
+            self._tokens_resumo -= estimar_tokens(self.resumo.popleft())
+        self.compactados += 1
+
+    def registrar(self, pergunta: str, resposta: str) -> None:
+        """Turno respondido pelo Gemini (entra na janela; os mais antigos vão para o resumo)."""
+        limite = TURNO_TOKENS_MAX * CARACTERES_POR_TOKEN
+        resposta = resposta if len(resposta) <= limite else resposta[: limite - 1] + "…"
+        turno = Turno(pergunta, resposta, estimar_tokens(pergunta) + estimar_tokens(resposta))
+        with self._lock:
+            self.turnos.append(turno)
+            self._tokens_turnos += turno.tokens
+            while self._tokens_turnos > self._limite_turnos() and len(self.turnos) > 1:
+                antigo = self.turnos.popleft()
+                self._tokens_turnos -= antigo.tokens
+                self._resumir(antigo)
+
+    def registrar_ferramenta(self, pergunta: str, intencao, resposta: str) -> None:
+        """Pergunta respondida pelas funções de clima: vira um fato compacto, não um turno."""
+        chave = (intencao.tipo, intencao.cidade.lower(), intencao.horizonte)
+        linha = f"[{intencao.tipo}/{intencao.horizonte}] {compactar(resposta, FATO_CHARS)}"
+        with self._lock:
+            self.ultima_intencao = intencao
+            antigo = self.fatos.pop(chave, None)
+            if antigo is not None:
+                self._tokens_fatos -= estimar_tokens(antigo)
+            self.fatos[chave] = linha
+            self._tokens_fatos += estimar_tokens(linha)
+            while self._tokens_fatos > FATOS_TOKENS and len(self.fatos) > 1:
+                self._tokens_fatos -= estimar_tokens(self.fatos.popitem(last=False)[1])
+
+    def montar(self, msg: str) -> List[Dict]:
+        """Conteúdo para generate_content: turnos recentes + pergunta nova com resumo e fatos."""
+        with self._lock:
+            conteudo = []
+            for t in self.turnos:
+                conteudo.append({"role": "user", "parts": [t.pergunta]})
+                conteudo.append({"role": "model", "parts": [t.resposta]})
+            blocos = []
+            if self.resumo:
+                blocos.append("Resumo da conversa anterior:\n" + "\n".join(self.resumo))
+            if self.fatos:
+                blocos.append("Dados de clima já mostrados ao usuário:\n" + "\n".join(self.fatos.values()))
+        blocos.append(msg if not blocos else "Pergunta: " + msg)
+        conteudo.append({"role": "user", "parts": ["\n\n".join(blocos)]})
+        return conteudo
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {"turnos": len(self.turnos), "linhas_resumo": len(self.resumo), "fatos": len(self.fatos),
+                "tokens": self.tokens, "orcamento": self.orcamento, "compactados": self.compactados}
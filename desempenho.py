@@ -0,0 +1,330 @@
+"""
+Detector de baixo rendimento das usinas do SEMS.
+
+Compara a potência medida (curva do `sems_charts`, gravada no histórico local)
+com a potência esperada pela irradiância da previsão do Clima
+(fotovoltaico.geracao_horaria) e mantém, por usina, estatísticas móveis da
+razão medido/esperado. Cada ponto novo atualiza o estado em O(1): médias
+exponenciais (rápida e lenta), um CUSUM para quedas bruscas, uma média por
+hora do dia e um contador de pontos zerados. Nada é recalculado sobre o
+histórico inteiro; o estado fica salvo no mesmo SQLite do histórico, com o
+último horário já processado de cada usina.
+
+Sinais (heurísticos, sem dados do inversor):
+- falha no inversor: potência ~0 por vários pontos seguidos com sol esperado;
+- queda brusca (string, disjuntor...): CUSUM da razão abaixo da média lenta;
+- sombreamento: horas do dia sistematicamente abaixo das demais;
+- sujeira: média lenta caindo aos poucos abaixo da melhor já vista.
+
+A razão é comparada com a própria usina (não com 1,0): erros de kWp,
+orientação ou da previsão viram um desvio constante e não disparam alerta.
+Só entram pontos de horas cobertas pela previsão atual (de hoje em diante).
+"""
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from historico_usina import HISTORICO_DB, _EPOCH
+
+# ------------------ PARÂMETROS ------------------ #
+FRACAO_SOL_MIN = 0.10        # só avalia pontos com esperado >= 10% do kWp
+RAZAO_MAX = 2.0              # corta picos (nuvem passando, previsão ruim)
+ALFA_RAPIDO = 0.10           # ~10 pontos (~1 h com pontos de 5 min)
+ALFA_LENTO = 0.001           # ~1000 pontos (~1 semana de sol)
+ALFA_HORA = 0.05
+DECAIMENTO_REFERENCIA = 0.999995   # a melhor média esquece ~2% por mês de sol
+AMOSTRAS_MIN = 36            # antes disso a usina está "aprendendo"
+AMOSTRAS_MIN_HORA = 36       # ~3 dias daquela hora (pontos de 5 min)
+CUSUM_FOLGA = 0.05
+CUSUM_LIMITE = 1.0
+FRACAO_ZERO = 0.02           # medido < 2% do esperado conta como zerado
+ZEROS_FALHA = 4              # ~20 min zerado com sol
+QUEDA_SUJEIRA = 0.10         # média lenta 10% abaixo da melhor
+FRACAO_SOMBRA = 0.70         # hora com razão < 70% da mediana das horas
+
+SERIE_PV_PADRAO = "PCurve_Power_PV"
+
+
+def serie_pv(series: Iterable[str]) -> Optional[str]:
+    """Nome da série de potência dos painéis no gráfico do SEMS."""
+    series = list(series)
+    if SERIE_PV_PADRAO in series:
+        return SERIE_PV_PADRAO
+    return next((s for s in series if "pv" in s.lower()), None)
+
+
+def _quando(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=int(ts))
+
+
+# ------------------ ESTADO DE UMA USINA ------------------ #
+class EstadoUsina:
+    """Estatísticas móveis de uma usina; `atualizar` é O(1) por ponto."""
+
+    __slots__ = ("usina", "kwp", "ultimo_ts", "n", "rapida", "lenta", "referencia",
+                 "cusum", "zeros", "zerado_desde", "hora_media", "hora_n")
+
+    def __init__(self, usina: str, kwp: float):
+        self.usina = usina
+        self.kwp = float(kwp)
+        self.ultimo_ts = 0           # epoch local do último ponto processado
+        self.n = 0
+        self.rapida = None
+        self.lenta = None
+        self.referencia = None
+        self.cusum = 0.0
+        self.zeros = 0
+        self.zerado_desde = None
+        self.hora_media = [None] * 24
+        self.hora_n = [0] * 24
+
+    def atualizar(self, ts: int, real_kw: float, esperado_kw: float) -> bool:
+        """Processa um ponto (epoch local, kW medido, kW esperado). False se ignorado."""
+        if ts <= self.ultimo_ts:
+            return False
+        self.ultimo_ts = ts
+        if not (esperado_kw >= FRACAO_SOL_MIN * self.kwp) or not np.isfinite(real_kw):
+            return False
+
+        # potência ~0 com sol: conta antes de tudo (não entra nas médias)
+        if real_kw < FRACAO_ZERO * esperado_kw:
+            if self.zeros == 0:
+                self.zerado_desde = ts
+            self.zeros += 1
+            return True
+        self.zeros = 0
+        self.zerado_desde = None
+
+        r = min(float(real_kw) / float(esperado_kw), RAZAO_MAX)
+        self.n += 1
+        if self.lenta is None:
+            self.rapida = self.lenta = r
+        else:
+            self.rapida += ALFA_RAPIDO * (r - self.rapida)
+            self.lenta += ALFA_LENTO * (r - self.lenta)
+
+        h = (ts // 3600) % 24
+        m = self.hora_media[h]
+        if self.n >= AMOSTRAS_MIN:
+            # o CUSUM compara com o normal DESTA hora: sombra de todo dia não é queda nova
+            base = m if self.hora_n[h] >= AMOSTRAS_MIN_HORA else self.lenta
+            self.cusum = max(0.0, self.cusum + (base - r) - CUSUM_FOLGA)
+        if self.n >= 1 / ALFA_LENTO:   # a média lenta já esqueceu o valor inicial
+            ref = self.lenta if self.referencia is None else self.referencia * DECAIMENTO_REFERENCIA
+            self.referencia = max(ref, self.lenta)
+        self.hora_media[h] = r if m is None else m + ALFA_HORA * (r - m)
+        self.hora_n[h] += 1
+        return True
+
+    # ---------- leitura ----------
+    def horas_sombreadas(self) -> List[int]:
+        horas = [h for h in range(24) if self.hora_n[h] >= AMOSTRAS_MIN_HORA]
+        if len(horas) < 4:
+            return []
+        mediana = float(np.median([self.hora_media[h] for h in horas]))
+        return [h for h in horas if self.hora_media[h] < FRACAO_SOMBRA * mediana]
+
+    def diagnostico(self) -> Dict:
+        """Situação da usina: status ("ok", "atenção", "falha", "aprendendo") e causas."""
+        causas = []
+        if self.zeros >= ZEROS_FALHA:
+            desde = _quando(self.zerado_desde).strftime("%d/%m %H:%M")
+            causas.append(f"possível falha no inversor: sem geração com sol desde {desde}")
+        if self.n >= AMOSTRAS_MIN:
+            if self.cusum > CUSUM_LIMITE:
+                causas.append("queda brusca de rendimento (string, disjuntor ou inversor parcial)")
+            sombra = self.horas_sombreadas()
+            if sombra:
+                causas.append("possível sombreamento às " + ", ".join(f"{h}h" for h in sombra))
+            if self.referencia and self.lenta < (1 - QUEDA_SUJEIRA) * self.referencia:
+                perda = 1 - self.lenta / self.referencia
+                causas.append(f"rendimento {perda:.0%} abaixo do melhor já visto (possível sujeira nos painéis)")
+
+        if self.zeros >= ZEROS_FALHA:
+            status = "falha"
+        elif causas:
+            status = "atenção"
+        elif self.n >= AMOSTRAS_MIN:
+            status = "ok"
+        else:
+            status = "aprendendo"
+        return {
+            "usina": self.usina,
+            "status": status,
+            "razao_recente": None if self.rapida is None else round(self.rapida, 3),
+            "razao_media": None if self.lenta is None else round(self.lenta, 3),
+            "melhor_media": None if self.referencia is None else round(self.referencia, 3),
+            "amostras": self.n,
+            "ultimo_ponto": _quando(self.ultimo_ts) if self.ultimo_ts else None,
+            "causas": causas,
+        }
+
+    def para_dict(self) -> Dict:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> "EstadoUsina":
+        estado = cls(dados["usina"], dados["kwp"])
+        for s in cls.__slots__:
+            if s in dados:
+                setattr(estado, s, dados[s])
+        return estado
+
+
+# ------------------ POTÊNCIA ESPERADA ------------------ #
+def esperado_nos_pontos(ts: np.ndarray, geracao: Optional[pd.DataFrame]) -> np.ndarray:
+    """
+    kW esperado em cada epoch local de `ts`, a partir da geração horária
+    (date, kwh): o kWh de cada linha é a média da hora que TERMINA em `date`.
+    Pontos fora do horizonte da previsão viram NaN.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    if geracao is None or geracao.empty:
+        return np.full(ts.shape, np.nan)
+    fim_hora = ((geracao["date"].dt.tz_localize(None) - _EPOCH) // pd.Timedelta(seconds=1)).to_numpy()
+    kwh = geracao["kwh"].to_numpy(dtype=np.float64)
+    i = np.searchsorted(fim_hora, ts, side="left")   # primeira hora que termina em/depois do ponto
+    dentro = (i < len(fim_hora)) & (ts > fim_hora[0] - 3600)
+    saida = np.full(ts.shape, np.nan)
+    saida[dentro] = kwh[i[dentro]]
+    return saida
+
+
+# ------------------ MONITOR DA FROTA ------------------ #
+class MonitorDesempenho:
+    """
+    Estados de todas as usinas do processo, persistidos no SQLite do
+    histórico (tabela `desempenho`). Compartilhado entre sessões.
+    """
+
+    def __init__(self, caminho: str = HISTORICO_DB):
+        import sqlite3
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False, timeout=5)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS desempenho ("
+            "usina TEXT PRIMARY KEY, estado TEXT NOT NULL, atualizado_em REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._con.commit()
+        self._estados: Dict[str, EstadoUsina] = {}
+        for usina, estado in self._con.execute("SELECT usina, estado FROM desempenho"):
+            self._estados[usina] = EstadoUsina.de_dict(json.loads(estado))
+
+    def estado(self, usina: str, kwp: Optional[float] = None) -> EstadoUsina:
+        with self._lock:
+            estado = self._estados.get(usina)
+            if estado is None:
+                estado = self._estados[usina] = EstadoUsina(usina, kwp or 1.0)
+            elif kwp:
+                estado.kwp = float(kwp)
+            return estado
+
+    def alimentar(self, usina: str, ts, real_kw, esperado_kw, kwp: Optional[float] = None) -> int:
+        """Processa os pontos novos (ts > último processado), em ordem. Retorna quantos contaram."""
+        estado = self.estado(usina, kwp)
+        ts = np.asarray(ts, dtype=np.int64)
+        novos = ts > estado.ultimo_ts
+        usados = 0
+        with self._lock:
+            for t, r, e in zip(ts[novos].tolist(), np.asarray(real_kw)[novos].tolist(),
+                               np.asarray(esperado_kw)[novos].tolist()):
+                usados += estado.atualizar(t, r, e)
+        return usados
+
+    def salvar(self, usinas: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            estados = [self._estados[u] for u in (usinas or self._estados) if u in self._estados]
+            linhas = [(e.usina, json.dumps(e.para_dict()), time.time()) for e in estados]
+            with self._con:
+                self._con.executemany(
+                    "INSERT OR REPLACE INTO desempenho (usina, estado, atualizado_em) VALUES (?, ?, ?)",
+                    linhas,
+                )
+
+    def diagnosticos(self, usinas: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Diagnóstico das usinas pedidas (só lê o estado; nada é recalculado)."""
+        with self._lock:
+            estados = [self._estados[u] for u in (usinas or self._estados) if u in self._estados]
+            return [e.diagnostico() for e in estados]
+
+    def atualizar_usina(self, historico, usina: str, lugar: Dict, sistema: Optional[Dict] = None) -> int:
+        """Passa ao estado os pontos do histórico que chegaram desde a última vez."""
+        import fotovoltaico
+        from Clima import consultar_horario
+
+        sistema = sistema or fotovoltaico.SISTEMA_PADRAO
+        estado = self.estado(usina, sistema.get("kwp"))
+        serie = serie_pv(historico.series(usina))
+        if serie is None:
+            return 0
+        ts, watts = historico.leituras_desde(usina, serie, estado.ultimo_ts)
+        if ts.size == 0:
+            return 0
+        geracao = fotovoltaico.geracao_horaria(lugar, consultar_horario(lugar), sistema)
+        esperado = esperado_nos_pontos(ts, geracao)
+        com_previsao = ~np.isnan(esperado)
+        return self.alimentar(usina, ts[com_previsao], watts[com_previsao] / 1000.0,
+                              esperado[com_previsao])
+
+
+def atualizar_frota(monitor: MonitorDesempenho, historico, cliente,
+                    usinas: Dict[str, Dict], dia: Optional[date] = None) -> List[Dict]:
+    """
+    Atualiza várias usinas de uma vez: busca no SEMS a curva do dia de todas
+    em paralelo, aquece as previsões em lote e alimenta cada estado só com os
+    pontos novos. `usinas` = {id: {"lugar": dict, "sistema": dict}}.
+    """
+    from Clima import aquecer_previsoes
+    from Sems import rodar
+    from historico_usina import sincronizar_varias
+
+    dia = dia or date.today()
+    rodar(sincronizar_varias(historico, cliente, list(usinas), dia), timeout=120)
+    aquecer_previsoes([cfg["lugar"] for cfg in usinas.values()])
+    for usina, cfg in usinas.items():
+        monitor.atualizar_usina(historico, usina, cfg["lugar"], cfg.get("sistema"))
+    monitor.salvar(usinas)
+    return monitor.diagnosticos(usinas)
+
+
+_monitor: Optional[MonitorDesempenho] = None
+_monitor_lock = threading.Lock()
+
+
+def monitor() -> MonitorDesempenho:
+    """Monitor único do processo (estado carregado do disco uma vez só)."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = MonitorDesempenho()
+        return _monitor
+
+
+# ------------------ TEXTO PARA O CHAT ------------------ #
+_ICONES = {"ok": "✅", "atenção": "⚠️", "falha": "❌", "aprendendo": "⏳"}
+
+
+def texto_diagnostico(diagnosticos: List[Dict], nomes: Optional[Dict[str, str]] = None) -> str:
+    """Resumo em markdown dos diagnósticos (usado pelo main.ia)."""
+    nomes = nomes or {}
+    linhas = []
+    for d in diagnosticos:
+        nome = nomes.get(d["usina"], d["usina"])
+        if d["status"] == "aprendendo":
+            linhas.append(f"- {_ICONES['aprendendo']} **{nome}**: ainda aprendendo o padrão "
+                          f"({d['amostras']} pontos com sol até agora).")
+            continue
+        razao = f"{d['razao_recente']:.0%} do esperado agora, {d['razao_media']:.0%} em média" \
+            if d["razao_recente"] is not None else "sem pontos válidos"
+        texto = f"- {_ICONES[d['status']]} **{nome}**: {razao}"
+        if d["causas"]:
+            texto += "; " + "; ".join(d["causas"])
+        linhas.append(texto + ".")
+    return "\n".join(linhas)
@@ -0,0 +1,171 @@
+"""
+Estimativa de geração fotovoltaica a partir da previsão de irradiância do Clima.
+
+Todo o cálculo é vetorizado em NumPy com arrays (usinas × horas): uma frota de
+centenas de usinas num horizonte de 16 dias sai numa única operação.
+
+Modelo (simplificado, sem dependências):
+- posição do sol por fórmulas de Spencer/NOAA (declinação, equação do tempo);
+- irradiância no plano do painel pelo modelo de céu isotrópico;
+- temperatura de célula pelo NOCT e perda por temperatura (coef. de potência);
+- perdas fixas do sistema (cabos, sujeira, mismatch) e clipping no inversor.
+
+Convenção de azimute (do painel e do sol): graus a partir do NORTE, sentido
+horário (0 = Norte, 90 = Leste, 180 = Sul, 270 = Oeste). No Brasil, painéis
+virados para o norte têm azimute 0.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from Clima import consultar_horario
+
+# ------------------ SISTEMA PADRÃO ------------------ #
+SISTEMA_PADRAO = {
+    "kwp": 5.0,                  # potência de pico dos módulos (kWp)
+    "inclinacao": 20.0,          # graus em relação à horizontal
+    "azimute": 0.0,              # graus a partir do norte (0 = virado para o norte)
+    "inversor_kw": 4.6,          # potência AC máxima do inversor (clipping)
+    "eficiencia_inversor": 0.96,
+    "perdas": 0.14,              # perdas do sistema (fração)
+    "coef_temp": -0.004,         # variação de potência por °C acima de 25 °C
+    "noct": 45.0,                # temperatura nominal de operação da célula (°C)
+    "albedo": 0.2,
+}
+
+# Radiação da Open-Meteo é média da hora anterior: a posição do sol é
+# calculada no meio do intervalo
+_MEIO_INTERVALO_S = 1800
+
+
+def _param(sistemas, nome: str, n: int) -> np.ndarray:
+    """Coluna (n, 1) com o parâmetro `nome` de cada sistema (ou o padrão)."""
+    if isinstance(sistemas, dict):
+        sistemas = [sistemas] * n
+    valores = [float((s or {}).get(nome, SISTEMA_PADRAO[nome])) for s in sistemas]
+    return np.asarray(valores, dtype=np.float64).reshape(-1, 1)
+
+
+# ------------------ POSIÇÃO DO SOL ------------------ #
+def posicao_solar(epoch_s: np.ndarray, lat: np.ndarray, lon: np.ndarray):
+    """
+    Cosseno do ângulo zenital e azimute do sol (rad, a partir do norte).
+    `epoch_s` tem forma (H,) ou (P, H); `lat`/`lon` em graus, forma (P, 1).
+    """
+    t = np.asarray(epoch_s, dtype=np.float64)
+    dias = t / 86400.0
+    # dia do ano (0..365) e hora UTC fracionária
+    dia_ano = (dias - np.floor(dias / 365.2425) * 365.2425)
+    hora_utc = (t % 86400.0) / 3600.0
+    g = 2 * np.pi / 365.0 * (dia_ano + (hora_utc - 12) / 24)
+
+    decl = (0.006918 - 0.399912 * np.cos(g) + 0.070257 * np.sin(g)
+            - 0.006758 * np.cos(2 * g) + 0.000907 * np.sin(2 * g)
+            - 0.002697 * np.cos(3 * g) + 0.00148 * np.sin(3 * g))
+    eq_tempo = 229.18 * (0.000075 + 0.001868 * np.cos(g) - 0.032077 * np.sin(g)
+                         - 0.014615 * np.cos(2 * g) - 0.040849 * np.sin(2 * g))
+
+    tempo_solar = hora_utc * 60 + eq_tempo + 4 * np.asarray(lon, dtype=np.float64)
+    angulo_horario = np.radians(tempo_solar / 4 - 180)
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+
+    cos_z = np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.cos(angulo_horario)
+    cos_z = np.clip(cos_z, -1.0, 1.0)
+    azimute = np.arctan2(
+        np.sin(angulo_horario),
+        np.cos(angulo_horario) * np.sin(phi) - np.tan(decl) * np.cos(phi),
+    ) + np.pi
+    return cos_z, azimute
+
+
+# ------------------ MOTOR DA FROTA ------------------ #
+def gerar_frota(epoch_s, lat, lon, ghi, dhi, temperatura, dni=None, sistemas=None) -> np.ndarray:
+    """
+    Energia AC esperada (kWh) por hora para várias usinas de uma vez.
+
+    - `epoch_s`: (H,) ou (P, H), fim de cada hora em epoch (s);
+    - `lat`, `lon`: (P,) em graus;
+    - `ghi`, `dhi`, `dni`, `temperatura`: (P, H) em W/m² e °C;
+    - `sistemas`: dict único ou lista de P dicts (ver SISTEMA_PADRAO).
+    Retorna array (P, H) em kWh. NaN na entrada vira 0 de geração.
+    """
+    ghi = np.nan_to_num(np.atleast_2d(np.asarray(ghi, dtype=np.float64)))
+    dhi = np.nan_to_num(np.atleast_2d(np.asarray(dhi, dtype=np.float64)))
+    temperatura = np.atleast_2d(np.asarray(temperatura, dtype=np.float64))
+    temperatura = np.where(np.isnan(temperatura), 25.0, temperatura)
+    n = ghi.shape[0]
+    lat = np.asarray(lat, dtype=np.float64).reshape(-1, 1)
+    lon = np.asarray(lon, dtype=np.float64).reshape(-1, 1)
+    sistemas = SISTEMA_PADRAO if sistemas is None else sistemas
+
+    cos_z, az_sol = posicao_solar(np.asarray(epoch_s) - _MEIO_INTERVALO_S, lat, lon)
+    sol_acima = cos_z > 0.0
+
+    if dni is None:
+        # DNI a partir da componente direta horizontal (limita perto do horizonte)
+        dni = np.where(sol_acima, (ghi - dhi) / np.maximum(cos_z, 0.087), 0.0)
+    else:
+        dni = np.nan_to_num(np.atleast_2d(np.asarray(dni, dtype=np.float64)))
+    dni = np.where(sol_acima, np.clip(dni, 0.0, 1400.0), 0.0)
+
+    beta = np.radians(_param(sistemas, "inclinacao", n))
+    az_painel = np.radians(_param(sistemas, "azimute", n))
+    sen_z = np.sqrt(1.0 - cos_z ** 2)
+    cos_aoi = cos_z * np.cos(beta) + sen_z * np.sin(beta) * np.cos(az_sol - az_painel)
+
+    # irradiância no plano do painel (céu isotrópico)
+    poa = (
+        dni * np.clip(cos_aoi, 0.0, None)
+        + dhi * (1 + np.cos(beta)) / 2
+        + ghi * _param(sistemas, "albedo", n) * (1 - np.cos(beta)) / 2
+    )
+    poa = np.clip(poa, 0.0, None)
+
+    t_celula = temperatura + (_param(sistemas, "noct", n) - 20.0) / 800.0 * poa
+    fator_temp = 1.0 + _param(sistemas, "coef_temp", n) * (t_celula - 25.0)
+
+    p_dc = (_param(sistemas, "kwp", n) * poa / 1000.0 * fator_temp
+            * (1.0 - _param(sistemas, "perdas", n)))
+    p_ac = np.minimum(p_dc * _param(sistemas, "eficiencia_inversor", n),
+                      _param(sistemas, "inversor_kw", n))
+    # energia de 1 hora (kWh) = potência média (kW) × 1 h
+    return np.clip(p_ac, 0.0, None)
+
+
+# ------------------ PREVISÃO DE UM LUGAR ------------------ #
+def geracao_horaria(lugar: Dict, horario: pd.DataFrame, sistema: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+    """
+    DataFrame (date, kwh) com a geração esperada hora a hora para `lugar`,
+    a partir de uma previsão horária com colunas de irradiância.
+    """
+    colunas = {"shortwave_radiation", "diffuse_radiation", "temperature_2m"}
+    if horario is None or horario.empty or not colunas.issubset(horario.columns):
+        return None
+
+    dni = horario["direct_normal_irradiance"].to_numpy()[None, :] \
+        if "direct_normal_irradiance" in horario.columns else None
+    kwh = gerar_frota(
+        horario["time"].to_numpy(),
+        [lugar["latitude"]], [lugar["longitude"]],
+        horario["shortwave_radiation"].to_numpy()[None, :],
+        horario["diffuse_radiation"].to_numpy()[None, :],
+        horario["temperature_2m"].to_numpy()[None, :],
+        dni=dni,
+        sistemas=sistema or SISTEMA_PADRAO,
+    )[0]
+    return pd.DataFrame({"date": horario["date"].to_numpy(), "kwh": kwh.astype(np.float32)})
+
+
+def previsao_geracao(lugar: Dict, sistema: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+    """Geração horária esperada para todo o horizonte da previsão do `lugar`."""
+    return geracao_horaria(lugar, consultar_horario(lugar), sistema)
+
+
+def geracao_diaria(geracao: pd.DataFrame) -> pd.DataFrame:
+    """Soma a geração horária por dia local: DataFrame (dia, kwh)."""
+    dias = geracao["date"].dt.normalize()
+    return (
+        geracao.groupby(dias, sort=True)["kwh"].sum()
+        .rename_axis("dia").reset_index()
+    )
@@ -0,0 +1,366 @@
+"""
+Gazetteer offline: lugares povoados (nome, país, lat/lon, fuso) num arquivo
+binário lido por mmap, com índice de prefixo sem acentos.
+
+- `procurar("Lisbon", "pt")`: nome exato (normalizado) -> lugar no mesmo
+  formato do geocoding da Open-Meteo; o Clima.geocode usa isto antes da API;
+- `sugerir("sao pa")`: sugestões por prefixo para o campo de cidade.
+
+As chaves (nome e nomes alternativos, passadas por cache.normalizar_texto)
+ficam ordenadas em bytes num bloco só; a busca é binária sobre esse bloco,
+sem carregar nada na memória além das páginas tocadas. Empates no mesmo nome
+e sugestões saem pela população (o mais populoso primeiro). Países são
+reconhecidos pelo código ISO e pelos nomes em português e inglês, sem acentos
+("França", "franca", "France").
+
+O arquivo não vai no repositório: é gerado na instalação a partir do GeoNames
+(cidades com 15 mil habitantes ou mais, com os nomes alternativos em alfabeto
+latino, onde estão os em português):
+    python gazetteer.py                                # baixa cities15000.zip e gera
+    python gazetteer.py --geonames cities15000.zip     # a partir de um dump já baixado
+    python gazetteer.py --zone-tab                     # sem rede: ~400 cidades do zone.tab, sem população
+Sem o arquivo, o app segue normalmente (geocoding só pela API).
+"""
+import argparse
+import gettext
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import unicodedata
+import zipfile
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from cache import normalizar_texto
+
+GAZETTEER_ARQ = os.getenv(
+    "GAZETTEER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.bin"))
+ZONEINFO_DIR = "/usr/share/zoneinfo"
+ISO_CODES_DIR = "/usr/share/iso-codes/json"   # nomes de países em pt (pacote iso-codes), se houver
+LOCALE_DIR = "/usr/share/locale"
+MAGICO = b"GAZETA01"
+SUGESTOES_MAX = 8
+POP_ALTERNATIVOS = 50000   # nomes alternativos do GeoNames só para cidades maiores
+GEONAMES_URL = "https://download.geonames.org/export/dump/cities15000.zip"
+
+
+# ------------------ LEITURA ------------------ #
+class _Chaves:
+    """Sequência de strings em bytes lidas direto do mmap (serve ao bisect)."""
+
+    def __init__(self, mm: mmap.mmap, base: int, offsets: np.ndarray):
+        self.mm = mm
+        self.base = base
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.mm[self.base + int(self.offsets[i]):self.base + int(self.offsets[i + 1])]
+
+
+class Gazetteer:
+    def __init__(self, caminho: str = GAZETTEER_ARQ):
+        self.caminho = caminho
+        with open(caminho, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGICO)] != MAGICO:
+            raise ValueError(f"{caminho} não é um gazetteer")
+        (tamanho,) = struct.unpack_from("<I", self._mm, len(MAGICO))
+        inicio = len(MAGICO) + 4
+        self.meta = json.loads(self._mm[inicio:inicio + tamanho])
+        s = {nome: self._secao(nome) for nome in self.meta["secoes"]}
+        self.lat, self.lon, self.pop = s["lat"], s["lon"], s["pop"]
+        self.fuso, self.pais = s["fuso"], s["pais"]
+        self._nomes = _Chaves(self._mm, self.meta["secoes"]["nomes"][0], s["nome_off"])
+        self._chaves = _Chaves(self._mm, self.meta["secoes"]["chaves"][0], s["chave_off"])
+        self._chave_lugar = s["chave_lugar"]
+        self.fusos: List[str] = self.meta["fusos"]
+        self.paises: List[List[str]] = self.meta["paises"]   # [código, nome de exibição, outros nomes...]
+        self._nomes_pais = [{codigo.lower(), *(normalizar_texto(n) for n in nomes)}
+                            for codigo, *nomes in self.paises]
+
+    def _secao(self, nome: str) -> np.ndarray:
+        offset, dtype, n = self.meta["secoes"][nome]
+        return np.frombuffer(self._mm, dtype=np.dtype(dtype), count=n, offset=offset)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def lugar(self, i: int) -> Dict:
+        """Lugar `i` no formato do geocoding da Open-Meteo."""
+        i = int(i)
+        nome = self._nomes[i].decode()
+        codigo, pais = self.paises[int(self.pais[i])][:2]
+        return {
+            "name": nome,
+            "latitude": round(float(self.lat[i]), 5),
+            "longitude": round(float(self.lon[i]), 5),
+            "timezone": self.fusos[int(self.fuso[i])],
+            "country_code": codigo,
+            "country": pais,
+            "population": int(self.pop[i]),
+        }
+
+    def _faixa(self, chave: bytes, prefixo: bool):
+        """Faixa [lo, hi) das chaves iguais a `chave` (ou que começam com ela)."""
+        lo = bisect_left(self._chaves, chave)
+        hi = bisect_left(self._chaves, chave + (b"\xff" if prefixo else b"\x00"), lo)
+        return lo, hi
+
+    def _paises_conferem(self, pais: str) -> List[int]:
+        alvo = normalizar_texto(pais)
+        return [k for k, nomes in enumerate(self._nomes_pais) if alvo in nomes]
+
+    def procurar(self, nome: str, pais: Optional[str] = None) -> Optional[Dict]:
+        """Lugar com este nome exato (sem acentos/maiúsculas); o mais populoso do `pais`, se dado."""
+        chave = normalizar_texto(nome).encode()
+        if not chave:
+            return None
+        lo, hi = self._faixa(chave, prefixo=False)
+        validos = self._paises_conferem(pais) if pais else None
+        for i in self._chave_lugar[lo:hi].tolist():   # já em ordem de população
+            if validos is None or int(self.pais[i]) in validos:
+                return self.lugar(i)
+        return None
+
+    def sugerir(self, texto: str, limite: int = SUGESTOES_MAX) -> List[Dict]:
+        """Lugares cujo nome começa com `texto` ("cidade, país" filtra o país), por população."""
+        partes = [p.strip() for p in (texto or "").split(",")]
+        chave = normalizar_texto(partes[0]).encode()
+        if not chave:
+            return []
+        lo, hi = self._faixa(chave, prefixo=True)
+        candidatos = self._chave_lugar[lo:hi]
+        if len(partes) > 1 and partes[1]:
+            candidatos = candidatos[np.isin(self.pais[candidatos], self._paises_conferem(partes[1]))]
+        # índice menor = mais populoso: basta pegar os menores (sem ordenar a faixa toda)
+        k = min(len(candidatos), limite * 4)   # folga para o mesmo lugar com várias chaves
+        if k < len(candidatos):
+            candidatos = np.partition(candidatos, k - 1)[:k]
+        return [self.lugar(i) for i in np.unique(candidatos)[:limite].tolist()]
+
+
+_gazetteer: Optional[Gazetteer] = None
+_carregado = False
+_lock = threading.Lock()
+
+
+def carregar() -> Optional[Gazetteer]:
+    """Gazetteer do processo (aberto uma vez); None se o arquivo não existir."""
+    global _gazetteer, _carregado
+    with _lock:
+        if not _carregado:
+            _carregado = True
+            if os.path.exists(GAZETTEER_ARQ):
+                _gazetteer = Gazetteer(GAZETTEER_ARQ)
+        return _gazetteer
+
+
+def procurar(nome: str, pais: Optional[str] = None) -> Optional[Dict]:
+    g = carregar()
+    return g.procurar(nome, pais) if g is not None else None
+
+
+def sugerir(texto: str, limite: int = SUGESTOES_MAX) -> List[Dict]:
+    g = carregar()
+    return g.sugerir(texto, limite) if g is not None else []
+
+
+def rotulo(lugar: Dict) -> str:
+    return f"{lugar['name']}, {lugar['country']}"
+
+
+# ------------------ GERAÇÃO DO ARQUIVO ------------------ #
+def _paises_iso(zoneinfo: str) -> Dict[str, str]:
+    paises = {}
+    caminho = os.path.join(zoneinfo, "iso3166.tab")
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith("#") or "\t" not in linha:
+                    continue
+                codigo, nome = linha.rstrip("\n").split("\t")[:2]
+                paises[codigo] = nome
+    return paises
+
+
+def _nomes_iso_codes(iso_codes: str = ISO_CODES_DIR, locale: str = LOCALE_DIR) -> Dict[str, List[str]]:
+    """{código: [nome em pt, nome em inglês]} pelo pacote iso-codes; vazio se ele não existir."""
+    caminho = os.path.join(iso_codes, "iso_3166-1.json")
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        entradas = json.load(f)["3166-1"]
+    traducao = gettext.translation("iso_3166-1", locale, languages=["pt_BR", "pt"], fallback=True)
+    return {e["alpha_2"]: [traducao.gettext(e["name"]), e["name"]] for e in entradas}
+
+
+def _paises_com_nomes(paises: Dict[str, str]) -> Dict[str, List[str]]:
+    """Junta os nomes do iso3166.tab com os do iso-codes (pt primeiro, para exibição)."""
+    iso = _nomes_iso_codes()
+    nomes = {}
+    for codigo in set(paises) | set(iso):
+        todos = [*iso.get(codigo, []), paises.get(codigo)]
+        nomes[codigo] = list(dict.fromkeys(n for n in todos if n))
+    return nomes
+
+
+def _coordenada_iso6709(texto: str):
+    """"-2332-04637" -> (-23.533, -46.617) (graus/minutos[/segundos])."""
+    corte = max(texto.rfind("+"), texto.rfind("-"))
+    valores = []
+    for parte, graus_dig in ((texto[:corte], 2), (texto[corte:], 3)):
+        sinal = -1 if parte[0] == "-" else 1
+        d = parte[1:]
+        graus, resto = int(d[:graus_dig]), d[graus_dig:]
+        minutos = int(resto[:2])
+        segundos = int(resto[2:4]) if len(resto) >= 4 else 0
+        valores.append(sinal * (graus + minutos / 60 + segundos / 3600))
+    return valores[0], valores[1]
+
+
+def lugares_zone_tab(zoneinfo: str = ZONEINFO_DIR) -> List[Dict]:
+    """Cidades de referência dos fusos da IANA (zone.tab): ~400 no mundo todo."""
+    lugares = []
+    with open(os.path.join(zoneinfo, "zone.tab"), encoding="utf-8") as f:
+        for linha in f:
+            if linha.startswith("#"):
+                continue
+            codigo, coordenadas, fuso = linha.rstrip("\n").split("\t")[:3]
+            if fuso.startswith(("Antarctica/", "Etc/")):
+                continue
+            lat, lon = _coordenada_iso6709(coordenadas)
+            nome = fuso.rsplit("/", 1)[-1].replace("_", " ")
+            lugares.append({"nome": nome, "alternativos": [], "lat": lat, "lon": lon,
+                            "pais": codigo, "fuso": fuso, "pop": 0})
+    return lugares
+
+
+def _linhas_geonames(caminho: str) -> Iterator[str]:
+    """Linhas do dump, direto do .txt ou de dentro do .zip do GeoNames."""
+    if zipfile.is_zipfile(caminho):
+        with zipfile.ZipFile(caminho) as z:
+            nome = next(n for n in z.namelist() if n.endswith(".txt"))
+            with z.open(nome) as f:
+                for linha in f:
+                    yield linha.decode("utf-8")
+    else:
+        with open(caminho, encoding="utf-8") as f:
+            yield from f
+
+
+def _latino(nome: str) -> bool:
+    """Nome em alfabeto latino (pt/en/es...); descarta cirílico, CJK etc., que só incham o índice."""
+    base = unicodedata.normalize("NFKD", nome)
+    return bool(base) and all(ord(c) < 0x250 or unicodedata.combining(c) for c in base)
+
+
+def lugares_geonames(caminho: str, pop_alternativos: int = POP_ALTERNATIVOS) -> List[Dict]:
+    """Lugares de um dump do GeoNames (cities500/1000/5000/15000, .txt ou .zip)."""
+    lugares = []
+    for linha in _linhas_geonames(caminho):
+        c = linha.rstrip("\n").split("\t")
+        if len(c) < 18 or not c[17]:
+            continue
+        pop = int(c[14] or 0)
+        alternativos = [c[2]]
+        if pop >= pop_alternativos and c[3]:
+            alternativos += [n for n in c[3].split(",") if _latino(n)]
+        lugares.append({"nome": c[1], "alternativos": alternativos, "lat": float(c[4]),
+                        "lon": float(c[5]), "pais": c[8], "fuso": c[17], "pop": pop})
+    return lugares
+
+
+def baixar_geonames(url: str = GEONAMES_URL, pasta: Optional[str] = None) -> str:
+    """Baixa o dump do GeoNames (zip) e devolve o caminho local."""
+    import requests
+
+    destino = os.path.join(pasta or tempfile.gettempdir(), os.path.basename(url))
+    with requests.get(url, stream=True, timeout=(5, 60)) as r:
+        r.raise_for_status()
+        with open(destino, "wb") as f:
+            for bloco in r.iter_content(1 << 20):
+                f.write(bloco)
+    return destino
+
+
+def gerar(lugares: List[Dict], saida: str, paises: Dict[str, object], fonte: str) -> Dict:
+    """Grava o arquivo binário a partir de uma lista de lugares (`paises`: código -> nome ou [nomes])."""
+    lugares = sorted(lugares, key=lambda l: -l["pop"])   # índice menor = mais populoso
+    fusos = sorted({l["fuso"] for l in lugares})
+    codigos = sorted({l["pais"] for l in lugares})
+    idx_fuso = {f: i for i, f in enumerate(fusos)}
+    idx_pais = {c: i for i, c in enumerate(codigos)}
+
+    nomes = [l["nome"].encode() for l in lugares]
+    chaves = []
+    for i, l in enumerate(lugares):
+        vistas = {normalizar_texto(n) for n in [l["nome"], *l["alternativos"]]}
+        chaves += [(k.encode(), i) for k in vistas if k]
+    chaves.sort()   # (chave, índice): empates ficam em ordem de população
+
+    def offsets(blobs):
+        return np.concatenate([[0], np.cumsum([len(b) for b in blobs])]).astype(np.uint32)
+
+    secoes = {
+        "lat": np.array([l["lat"] for l in lugares], dtype="<f4"),
+        "lon": np.array([l["lon"] for l in lugares], dtype="<f4"),
+        "pop": np.array([l["pop"] for l in lugares], dtype="<u4"),
+        "fuso": np.array([idx_fuso[l["fuso"]] for l in lugares], dtype="<u2"),
+        "pais": np.array([idx_pais[l["pais"]] for l in lugares], dtype="<u2"),
+        "nome_off": offsets(nomes).astype("<u4"),
+        "nomes": np.frombuffer(b"".join(nomes), dtype=np.uint8),
+        "chave_off": offsets([k for k, _ in chaves]).astype("<u4"),
+        "chaves": np.frombuffer(b"".join(k for k, _ in chaves), dtype=np.uint8),
+        "chave_lugar": np.array([i for _, i in chaves], dtype="<u4"),
+    }
+
+    nomes_pais = {c: [n] if isinstance(n, str) else list(n) for c, n in paises.items()}
+    meta = {"fonte": fonte, "fusos": fusos, "paises": [[c, *(nomes_pais.get(c) or [c])] for c in codigos],
+            "secoes": {}}
+    # o cabeçalho precisa saber os offsets, que dependem do tamanho do cabeçalho: reserva espaço
+    reserva = len(json.dumps({**meta, "secoes": {n: [0, "", 0] for n in secoes}})) + 64 * len(secoes)
+    pos = len(MAGICO) + 4 + reserva
+    for nome, arr in secoes.items():
+        pos = (pos + 7) // 8 * 8
+        meta["secoes"][nome] = [pos, arr.dtype.str, int(arr.size)]
+        pos += arr.nbytes
+    cabecalho = json.dumps(meta).encode().ljust(reserva)
+
+    with open(saida, "wb") as f:
+        f.write(MAGICO + struct.pack("<I", reserva) + cabecalho)
+        for nome, arr in secoes.items():
+            f.seek(meta["secoes"][nome][0])
+            f.write(arr.tobytes())
+    return {"lugares": len(lugares), "chaves": len(chaves), "bytes": os.path.getsize(saida)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--geonames", help="dump do GeoNames já baixado (ex.: cities15000.zip ou .txt)")
+    ap.add_argument("--url", default=GEONAMES_URL, help="dump a baixar quando --geonames não é dado")
+    ap.add_argument("--zone-tab", action="store_true", help="sem rede: só as cidades do zone.tab (sem população)")
+    ap.add_argument("--zoneinfo", default=ZONEINFO_DIR, help="pasta com zone.tab e iso3166.tab")
+    ap.add_argument("--pop-alternativos", type=int, default=POP_ALTERNATIVOS)
+    ap.add_argument("--saida", default=GAZETTEER_ARQ)
+    args = ap.parse_args()
+
+    if args.zone_tab:
+        lugares = lugares_zone_tab(args.zoneinfo)
+        fonte = "zone.tab"
+    else:
+        dump = args.geonames or baixar_geonames(args.url)
+        lugares = lugares_geonames(dump, args.pop_alternativos)
+        fonte = os.path.basename(dump)
+    print(json.dumps(gerar(lugares, args.saida, _paises_com_nomes(_paises_iso(args.zoneinfo)), fonte)))
+
+
+if __name__ == "__main__":
+    main()
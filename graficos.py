@@ -0,0 +1,262 @@
+"""
+Gráficos da aba de clima, renderizados como PNG e guardados em cache.
+
+Cada gráfico é identificado por um hash do lugar + arrays de dados; enquanto a
+previsão não muda, reruns do Streamlit (trocar de aba, mandar mensagem no chat)
+reaproveitam a imagem pronta em vez de redesenhar com matplotlib.
+
+Séries longas (curvas de 5 min do inversor por semanas/meses) passam antes por
+uma redução visual (mín/máx por balde + LTTB): cada gráfico desenha no máximo
+MAX_PONTOS pontos por série, sem perder os picos. O eixo X é de datas
+(numérico), com rótulos do próprio matplotlib em vez de um texto por ponto.
+"""
+import hashlib
+import io
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import metricas
+from cache import CacheTTL
+
+# ------------------ CACHE DE IMAGENS ------------------ #
+FIG_W, FIG_H, DPI = 7, 3, 110
+MAX_BYTES_GRAFICOS = 32 * 1024 * 1024
+TTL_GRAFICO_S = 6 * 3600
+
+_cache_graficos = CacheTTL(max_itens=512, ttl=TTL_GRAFICO_S, max_bytes=MAX_BYTES_GRAFICOS)
+
+
+def _chave(tipo: str, nome: str, *arrays) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{tipo}|{nome}".encode())
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(str(a.dtype).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+def _datas(serie: pd.Series) -> np.ndarray:
+    return serie.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def _eixo_tempo(serie: pd.Series) -> np.ndarray:
+    """datetime64 no relógio local (sem fuso), que o matplotlib plota como número."""
+    if getattr(serie.dt, "tz", None) is not None:
+        serie = serie.dt.tz_localize(None)
+    return serie.to_numpy(dtype="datetime64[ns]")
+
+
+# ------------------ REDUÇÃO DE PONTOS ------------------ #
+MAX_PONTOS = 1000
+
+
+def _indices_min_max(y: np.ndarray, n_baldes: int) -> np.ndarray:
+    """Índices do mínimo e do máximo de cada balde (vetorizado; preserva picos)."""
+    n = y.size
+    tam = -(-n // n_baldes)
+    preenchido = np.full(n_baldes * tam, np.nan)
+    preenchido[:n] = y
+    m = preenchido.reshape(n_baldes, tam)
+    base = np.arange(n_baldes) * tam
+    vazio = np.isnan(m)
+    imax = np.where(vazio, -np.inf, m).argmax(axis=1) + base
+    imin = np.where(vazio, np.inf, m).argmin(axis=1) + base
+    ids = np.unique(np.concatenate([imin, imax, [0, n - 1]]))
+    return ids[ids < n]
+
+
+def _indices_lttb(x: np.ndarray, y: np.ndarray, n_saida: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: em cada balde fica o ponto que forma o maior
+    triângulo com o ponto escolhido antes e a média do balde seguinte. As médias
+    saem de somas acumuladas; só a escolha de cada balde é sequencial.
+    """
+    n = x.size
+    if n_saida >= n or n_saida < 3:
+        return np.arange(n)
+    bordas = np.linspace(1, n - 1, n_saida - 1).astype(np.int64)
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    larg = np.diff(bordas)
+    media_x = np.append((cx[bordas[1:]] - cx[bordas[:-1]]) / larg, x[-1])
+    media_y = np.append((cy[bordas[1:]] - cy[bordas[:-1]]) / larg, y[-1])
+
+    ids = np.empty(n_saida, dtype=np.int64)
+    ids[0], ids[-1] = 0, n - 1
+    a = 0
+    for i in range(n_saida - 2):
+        ini, fim = bordas[i], bordas[i + 1]
+        bx, by = media_x[i + 1], media_y[i + 1]
+        area = np.abs((x[a] - bx) * (y[ini:fim] - y[a]) - (x[a] - x[ini:fim]) * (by - y[a]))
+        a = ini + int(area.argmax())
+        ids[i + 1] = a
+    return ids
+
+
+def reduzir(x: np.ndarray, y: np.ndarray, max_pontos: int = MAX_PONTOS) -> np.ndarray:
+    """
+    Índices dos pontos a desenhar (no máximo `max_pontos`). Primeiro mín/máx
+    por balde (barato e mantém os picos), depois LTTB no que sobrou.
+    NaN fica de fora.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    validos = np.flatnonzero(~np.isnan(y))
+    if validos.size <= max_pontos:
+        return validos
+    pre = _indices_min_max(y[validos], 2 * max_pontos)
+    sel = pre[_indices_lttb(x[validos][pre], y[validos][pre], max_pontos)]
+    return validos[sel]
+
+
+def _nova_figura():
+    # Figure direto (sem pyplot): sem estado global, seguro entre sessões
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(FIG_W, FIG_H), dpi=DPI)
+    return fig, fig.add_subplot()
+
+
+def _png(fig) -> bytes:
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def _cacheado(chave: str, desenhar) -> bytes:
+    png = _cache_graficos.get(chave)
+    if png is None:
+        metricas.contar("grafico_cache_miss")
+        with metricas.span("grafico_render"):
+            png = desenhar()
+        _cache_graficos.set(chave, png)
+    else:
+        metricas.contar("grafico_cache_hit")
+    return png
+
+
+def estatisticas_cache_graficos():
+    """Hits/misses e bytes ocupados pelo cache de gráficos."""
+    return _cache_graficos.estatisticas()
+
+
+# ------------------ GRÁFICOS ------------------ #
+def grafico_temp_horaria(lugar: dict, hourly: pd.DataFrame) -> Optional[bytes]:
+    """Temperatura hora a hora (hoje)."""
+    if hourly is None or hourly.empty:
+        return None
+    datas = _datas(hourly["date"])
+    y = hourly["temperature_2m"].to_numpy()
+
+    def desenhar():
+        from matplotlib.dates import DateFormatter
+        fig, ax = _nova_figura()
+        x = _eixo_tempo(hourly["date"])
+        ids = reduzir(datas, y)
+        ax.plot(x[ids], y[ids], marker="." if ids.size <= 48 else None, linewidth=1.6)
+        ax.set_title(f"Temperatura — hoje — {lugar['nome']}")
+        ax.set_xlabel("Hora"); ax.set_ylabel("°C")
+        ax.xaxis.set_major_formatter(DateFormatter("%Hh"))
+        ax.grid(True, linestyle="--", alpha=0.35)
+        return _png(fig)
+
+    return _cacheado(_chave("temp_horaria", lugar["nome"], datas, y), desenhar)
+
+
+def grafico_semana_min_max(lugar: dict, daily: pd.DataFrame) -> Optional[bytes]:
+    """Mínimas e máximas dos próximos dias."""
+    if daily is None or not {"temperature_2m_min", "temperature_2m_max"}.issubset(daily.columns):
+        return None
+    datas = _datas(daily["date"])
+    tmin = daily["temperature_2m_min"].to_numpy()
+    tmax = daily["temperature_2m_max"].to_numpy()
+
+    def desenhar():
+        from matplotlib.dates import DateFormatter
+        fig, ax = _nova_figura()
+        xd = _eixo_tempo(daily["date"])
+        ax.plot(xd, tmin, marker="o", label="Mín")
+        ax.plot(xd, tmax, marker="o", label="Máx")
+        ax.fill_between(xd, tmin, tmax, alpha=0.15)
+        ax.xaxis.set_major_formatter(DateFormatter("%d/%m"))
+        ax.set_title(f"Temperaturas — semana — {lugar['nome']}")
+        ax.set_xlabel("Data"); ax.set_ylabel("°C"); ax.legend(loc="upper left")
+        ax.grid(True, linestyle="--", alpha=0.35)
+        return _png(fig)
+
+    return _cacheado(_chave("semana_min_max", lugar["nome"], datas, tmin, tmax), desenhar)
+
+
+def grafico_semana_chuva(lugar: dict, daily: pd.DataFrame) -> Optional[bytes]:
+    """Precipitação diária dos próximos dias."""
+    if daily is None or "precipitation_sum" not in daily.columns:
+        return None
+    datas = _datas(daily["date"])
+    yb = daily["precipitation_sum"].clip(lower=0).to_numpy()
+
+    def desenhar():
+        from matplotlib.dates import DateFormatter
+        fig, ax = _nova_figura()
+        xd = _eixo_tempo(daily["date"])
+        ax.bar(xd, yb, width=0.8)   # largura em dias
+        ax.xaxis.set_major_formatter(DateFormatter("%d/%m"))
+        ax.set_ylim(0, max(5.0, float(np.nanmax(yb)) + 2.0))
+        ax.set_title(f"Precipitação — semana — {lugar['nome']}")
+        ax.set_xlabel("Data"); ax.set_ylabel("mm")
+        ax.grid(axis="y", linestyle="--", alpha=0.5)
+        return _png(fig)
+
+    return _cacheado(_chave("semana_chuva", lugar["nome"], datas, yb), desenhar)
+
+
+def grafico_geracao(lugar: dict, geracao: pd.DataFrame) -> Optional[bytes]:
+    """Geração solar esperada hora a hora (kWh) no horizonte da previsão."""
+    if geracao is None or geracao.empty:
+        return None
+    datas = _datas(geracao["date"])
+    kwh = geracao["kwh"].to_numpy()
+
+    def desenhar():
+        fig, ax = _nova_figura()
+        x = _eixo_tempo(geracao["date"])
+        if kwh.size <= MAX_PONTOS:
+            # cada valor é a energia da hora que termina em x
+            ax.bar(x, kwh, width=-1 / 24, align="edge")
+        else:
+            ids = reduzir(datas, kwh)
+            ax.fill_between(x[ids], kwh[ids], step="pre", alpha=0.8)
+        ax.set_title(f"Geração prevista — {lugar['nome']}")
+        ax.set_xlabel("Data"); ax.set_ylabel("kWh")
+        ax.grid(axis="y", linestyle="--", alpha=0.5)
+        fig.autofmt_xdate()
+        return _png(fig)
+
+    return _cacheado(_chave("geracao", lugar["nome"], datas, kwh), desenhar)
+
+
+def grafico_usina(nome: str, historico: pd.DataFrame) -> Optional[bytes]:
+    """Curvas de potência (W) de uma usina no intervalo escolhido."""
+    if historico is None or historico.empty:
+        return None
+    series = [c for c in historico.columns if c != "date"]
+    datas = _datas(historico["date"])
+    valores = [historico[c].to_numpy() for c in series]
+
+    def desenhar():
+        fig, ax = _nova_figura()
+        x = _eixo_tempo(historico["date"])
+        for serie, y in zip(series, valores):
+            ids = reduzir(datas, y)
+            ax.plot(x[ids], y[ids], linewidth=1.0, label=serie)
+        ax.set_title(f"Potência — {nome}")
+        ax.set_xlabel("Data"); ax.set_ylabel("W")
+        if len(series) > 1:
+            ax.legend(loc="upper left", fontsize="small")
+        ax.grid(True, linestyle="--", alpha=0.35)
+        fig.autofmt_xdate()
+        return _png(fig)
+
+    return _cacheado(_chave("usina", nome + "|" + ",".join(series), datas, *valores), desenhar)
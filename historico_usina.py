@@ -0,0 +1,256 @@
+"""
+Histórico local (SQLite) das curvas de potência das usinas do SEMS.
+
+Cada dia buscado no `sems_charts` fica gravado em disco; da próxima vez só os
+dias que ainda não estão completos são pedidos ao portal (o dia de hoje é
+sempre rebuscado, porque ainda está em andamento; um dia passado que veio
+vazio é tentado de novo depois de REBUSCA_DIA_VAZIO_S). O painel lê intervalos
+longos direto do arquivo, só com as séries pedidas.
+
+Horários são guardados como "epoch local": segundos desde 1970 no relógio de
+parede da usina (o SEMS devolve "HH:MM" sem fuso).
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ao lado do módulo (como o cache de geocoding), não no diretório de onde o app foi iniciado
+HISTORICO_DB = os.getenv(
+    "SEMS_HISTORICO_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico_usinas.sqlite3"))
+
+# dia passado que o portal devolveu sem pontos: espera este tanto antes de pedir de novo
+REBUSCA_DIA_VAZIO_S = int(os.getenv("SEMS_REBUSCA_DIA_VAZIO_S", str(6 * 3600)))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _dias(inicio: date, fim: date) -> List[date]:
+    return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+
+def _epoch_local(dia: date, x) -> Optional[int]:
+    """Converte o "x" do gráfico ("HH:MM" ou "AAAA-MM-DD HH:MM[:SS]") em epoch local."""
+    try:
+        texto = str(x).strip()
+        if len(texto) <= 5:
+            h, m = texto.split(":")
+            instante = datetime(dia.year, dia.month, dia.day, int(h), int(m))
+        else:
+            instante = datetime.fromisoformat(texto)
+    except (ValueError, TypeError):
+        return None
+    return int((instante - _EPOCH).total_seconds())
+
+
+def linhas_do_grafico(dia: date, dados) -> List[Tuple[str, int, float]]:
+    """
+    Achata a resposta do GetPlantPowerChart (`lines[].xy[]`) em
+    (serie, epoch_local, valor). Pontos sem valor são descartados.
+    """
+    saida = []
+    for linha in (dados or {}).get("lines") or []:
+        serie = linha.get("key") or linha.get("name")
+        if not serie:
+            continue
+        for ponto in linha.get("xy") or []:
+            y = ponto.get("y")
+            ts = _epoch_local(dia, ponto.get("x"))
+            if y is None or ts is None:
+                continue
+            try:
+                saida.append((serie, ts, float(y)))
+            except (TypeError, ValueError):
+                continue
+    return saida
+
+
+class HistoricoUsina:
+    """
+    Armazém das curvas de potência por usina/dia.
+
+    - `dias_buscados`: quais dias já vieram do portal e se estavam completos;
+    - `leituras`: pontos (usina, série, epoch local) → valor, sem rowid,
+      ordenados pela chave primária para varreduras por intervalo.
+    """
+
+    def __init__(self, caminho: str = HISTORICO_DB):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False, timeout=5)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS dias_buscados ("
+            "usina TEXT NOT NULL, dia TEXT NOT NULL, completo INTEGER NOT NULL, "
+            "buscado_em REAL NOT NULL, PRIMARY KEY (usina, dia)) WITHOUT ROWID"
+        )
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS leituras ("
+            "usina TEXT NOT NULL, serie TEXT NOT NULL, ts INTEGER NOT NULL, valor REAL, "
+            "PRIMARY KEY (usina, serie, ts)) WITHOUT ROWID"
+        )
+        self._con.commit()
+
+    # ---------- o que falta buscar ----------
+    def dias_faltando(self, usina: str, inicio: date, fim: date, hoje: Optional[date] = None) -> List[date]:
+        """
+        Dias do intervalo que ainda não estão completos no disco (hoje sempre
+        entra). Um dia passado buscado depois de terminar e ainda incompleto
+        veio vazio: só volta depois de REBUSCA_DIA_VAZIO_S.
+        """
+        hoje = hoje or date.today()
+        fim = min(fim, hoje)
+        if fim < inicio:
+            return []
+        with self._lock:
+            buscados = {
+                r[0]: (r[1], r[2]) for r in self._con.execute(
+                    "SELECT dia, completo, buscado_em FROM dias_buscados WHERE usina = ? AND dia BETWEEN ? AND ?",
+                    (usina, inicio.isoformat(), fim.isoformat()),
+                )
+            }
+        agora = time.time()
+        faltando = []
+        for d in _dias(inicio, fim):
+            if d >= hoje or d.isoformat() not in buscados:
+                faltando.append(d)
+                continue
+            completo, buscado_em = buscados[d.isoformat()]
+            if completo:
+                continue
+            fim_do_dia = datetime.combine(d + timedelta(days=1), datetime.min.time()).timestamp()
+            if buscado_em < fim_do_dia or agora - buscado_em >= REBUSCA_DIA_VAZIO_S:
+                faltando.append(d)
+        return faltando
+
+    # ---------- gravação ----------
+    def gravar_dia(self, usina: str, dia: date, dados, hoje: Optional[date] = None) -> int:
+        """
+        Grava (substitui) os pontos de um dia. Retorna quantos pontos entraram.
+        Só um dia passado com pontos fica marcado como completo.
+        """
+        hoje = hoje or date.today()
+        linhas = linhas_do_grafico(dia, dados)
+        ini = _epoch_local(dia, "00:00")
+        with self._lock, self._con:
+            # o dia inteiro é regravado: uma nova busca de "hoje" substitui a anterior
+            self._con.execute(
+                "DELETE FROM leituras WHERE usina = ? AND ts >= ? AND ts < ?",
+                (usina, ini, ini + 86400),
+            )
+            self._con.executemany(
+                "INSERT OR REPLACE INTO leituras (usina, serie, ts, valor) VALUES (?, ?, ?, ?)",
+                [(usina, s, ts, v) for s, ts, v in linhas],
+            )
+            self._con.execute(
+                "INSERT OR REPLACE INTO dias_buscados (usina, dia, completo, buscado_em) VALUES (?, ?, ?, ?)",
+                (usina, dia.isoformat(), int(dia < hoje and bool(linhas)), time.time()),
+            )
+        return len(linhas)
+
+    # ---------- leitura ----------
+    def series(self, usina: str) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._con.execute(
+                "SELECT DISTINCT serie FROM leituras WHERE usina = ?", (usina,)
+            )]
+
+    def consultar(self, usina: str, inicio: date, fim: date,
+                  series: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        DataFrame largo (date + uma coluna por série) com os pontos entre
+        `inicio` e `fim` (inclusive). `series` limita as colunas lidas do disco.
+        """
+        ini = _epoch_local(inicio, "00:00")
+        fim_ts = _epoch_local(fim, "00:00") + 86400
+        sql = "SELECT serie, ts, valor FROM leituras WHERE usina = ? AND ts >= ? AND ts < ?"
+        params: list = [usina, ini, fim_ts]
+        if series:
+            sql += f" AND serie IN ({','.join('?' * len(series))})"
+            params += list(series)
+        with self._lock:
+            rows = self._con.execute(sql, params).fetchall()
+        if not rows:
+            return pd.DataFrame(columns=["date", *(series or [])])
+
+        serie, ts, valor = zip(*rows)
+        longo = pd.DataFrame({
+            "serie": pd.Categorical(serie),
+            "ts": np.asarray(ts, dtype=np.int64),
+            "valor": np.asarray(valor, dtype=np.float32),
+        })
+        largo = longo.pivot_table(index="ts", columns="serie", values="valor", observed=True, sort=True)
+        largo.columns = list(largo.columns)
+        largo.insert(0, "date", pd.to_datetime(largo.index.to_numpy(), unit="s"))
+        return largo.reset_index(drop=True)
+
+    def leituras_desde(self, usina: str, serie: str, ts: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(epoch local, valor) dos pontos de `serie` posteriores a `ts`, em ordem."""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT ts, valor FROM leituras WHERE usina = ? AND serie = ? AND ts > ? ORDER BY ts",
+                (usina, serie, int(ts)),
+            ).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        tss, valores = zip(*rows)
+        return np.asarray(tss, dtype=np.int64), np.asarray(valores, dtype=np.float64)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            dias = self._con.execute("SELECT COUNT(*) FROM dias_buscados").fetchone()[0]
+            pontos = self._con.execute("SELECT COUNT(*) FROM leituras").fetchone()[0]
+        return {"dias": dias, "pontos": pontos}
+
+
+# ------------------ SINCRONIZAÇÃO COM O SEMS ------------------ #
+async def sincronizar(historico: HistoricoUsina, cliente, usina: str,
+                      inicio: date, fim: date) -> Dict[str, int]:
+    """
+    Busca no SEMS (em paralelo, pelo `cliente` do Sems.py) só os dias que
+    faltam no histórico e grava no disco. Dias com erro ficam para a próxima.
+    """
+    hoje = date.today()
+    faltando = historico.dias_faltando(usina, inicio, fim, hoje)
+    if not faltando:
+        return {"buscados": 0, "erros": 0, "pontos": 0}
+    respostas = await cliente.graficos_dias(usina, faltando)
+    pontos = erros = 0
+    for dia in faltando:
+        dados = respostas.get(dia)
+        if isinstance(dados, Exception) or dados is None:
+            erros += 1
+            continue
+        pontos += historico.gravar_dia(usina, dia, dados, hoje)
+    return {"buscados": len(faltando) - erros, "erros": erros, "pontos": pontos}
+
+
+async def sincronizar_varias(historico: HistoricoUsina, cliente, usinas: List[str], dia: date) -> Dict[str, int]:
+    """Busca a curva de `dia` de várias usinas em paralelo e grava. {usina: pontos ou -1 se falhou}."""
+    hoje = date.today()
+    usinas = [u for u in usinas if historico.dias_faltando(u, dia, dia, hoje)]
+    if not usinas:
+        return {}
+    respostas = await cliente.graficos_varias(usinas, dia)
+    pontos = {}
+    for usina in usinas:
+        dados = respostas.get(usina)
+        if isinstance(dados, Exception) or dados is None:
+            pontos[usina] = -1
+            continue
+        pontos[usina] = historico.gravar_dia(usina, dia, dados, hoje)
+    return pontos
+
+
+def carregar(historico: HistoricoUsina, cliente, usina: str, inicio: date, fim: date,
+             series: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Sincroniza o intervalo (só o que falta) e devolve os dados do disco."""
+    from Sems import rodar
+    rodar(sincronizar(historico, cliente, usina, inicio, fim), timeout=300)
+    return historico.consultar(usina, inicio, fim, list(series) if series else None)
@@ -1,11 +1,15 @@
-import re, os
+import hashlib, re, os, time
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Tuple
 import pandas as pd
-import streamlit as st
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 # >>> IMPORTAÇÕES DO CLIMA <<<
 from Clima import geocode, consultar_api, lugares_cadastrados  # usa Clima.py
+from cache import ArmazemSQLite, CacheTTL, normalizar_texto
+from concorrencia import BaldeTokens, VooUnico
+import metricas
+from fotovoltaico import SISTEMA_PADRAO, geracao_diaria, previsao_geracao
 
 # Carrega as variáveis de ambiente do arquivo .env (onde está sua chave da API)
 load_dotenv()  
@@ -13,9 +17,6 @@ load_dotenv()
 # Pega a chave da API do arquivo .env
 CHAVE_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Configura o Gemini com a chave da API
-genai.configure(api_key=CHAVE_API_KEY)
-
 # Define qual modelo do Gemini você vai usar
 MODELO_ESCOLHIDO = "gemini-1.5-flash"
 
@@ -26,19 +27,205 @@ prompt_sistema = [
     "Responda sempre na língua que o usuário utilizar."
 ]
 
-# Cria uma instância do modelo com a instrução do sistema
-llm = genai.GenerativeModel(
-    model_name=MODELO_ESCOLHIDO,
-    system_instruction=prompt_sistema
-)
+# Cria a instância do modelo só no primeiro uso (o SDK do Gemini é pesado de
+# importar) e reaproveita a mesma em todo o processo
+@lru_cache(maxsize=None)
+def get_llm():
+    import google.generativeai as genai
+
+    # Configura o Gemini com a chave da API
+    genai.configure(api_key=CHAVE_API_KEY)
+
+    return genai.GenerativeModel(
+        model_name=MODELO_ESCOLHIDO,
+        system_instruction=prompt_sistema
+    )
 
-# Extrai cidade de frases como "previsão do tempo em São Paulo" / "tempo de Lisboa"
-_re_weather = re.compile(r"\b(tempo|previs[aã]o)\b.*?\b(?:em|de)\s+(.+)", re.I)
+# ---- orçamento de chamadas ao Gemini (comum a todas as sessões)
+# Rajadas esperam na fila até IA_ESPERA_MAX_S; passando disso a pergunta é
+# recusada com uma mensagem, em vez de estourar a cota da API.
+IA_REQ_POR_MIN = float(os.getenv("IA_REQ_POR_MIN", "60"))
+IA_RAJADA = float(os.getenv("IA_RAJADA", "10"))
+IA_ESPERA_MAX_S = 30.0
+_balde_gemini = BaldeTokens(IA_REQ_POR_MIN / 60.0, IA_RAJADA)
+_voo_respostas = VooUnico()   # mesma pergunta ao mesmo tempo -> 1 chamada
+
+class OrcamentoEsgotado(RuntimeError):
+    pass
+
+class FalhaLLM(RuntimeError):
+    """O Gemini (ou o modelo passado) falhou ao responder."""
+
+def _aguardar_orcamento_llm() -> None:
+    t0 = time.perf_counter()
+    if not _balde_gemini.aguardar(espera_max=IA_ESPERA_MAX_S):
+        metricas.contar("llm_recusada_orcamento")
+        raise OrcamentoEsgotado("o assistente está com muitas perguntas agora; tente de novo em instantes.")
+    metricas.observar("espera_orcamento_llm", time.perf_counter() - t0)
+
+def estatisticas_chamadas_llm():
+    return {"voo_respostas": _voo_respostas.estatisticas(), "orcamento_gemini": _balde_gemini.estatisticas()}
+
+# ---- cache de respostas do Gemini (perguntas que não são de clima)
+# Mesma pergunta (ignorando maiúsculas, acentos, pontuação e espaços) reaproveita
+# a resposta anterior. Persistência em disco é opcional: defina IA_CACHE_DB com o
+# caminho de um arquivo SQLite.
+TTL_RESPOSTA_S = 24 * 3600
+_cache_respostas = CacheTTL(max_itens=1000, ttl=TTL_RESPOSTA_S)
+_armazem_respostas = ArmazemSQLite(os.getenv("IA_CACHE_DB"), tabela="respostas") if os.getenv("IA_CACHE_DB") else None
+
+def _chave_resposta(msg: str) -> str:
+    return f"{MODELO_ESCOLHIDO}|{normalizar_texto(msg)}"
+
+def _resposta_cacheada(chave: str):
+    texto = _cache_respostas.get(chave)
+    if texto is None and _armazem_respostas is not None:
+        encontrado, texto, expira_em = _armazem_respostas.get(chave)
+        if encontrado:
+            _cache_respostas.set(chave, texto, expira_em=expira_em)
+    metricas.contar("resposta_cache_hit" if texto is not None else "resposta_cache_miss")
+    return texto
+
+def _guardar_resposta(chave: str, texto: str) -> None:
+    if not texto:
+        return
+    _cache_respostas.set(chave, texto)
+    if _armazem_respostas is not None:
+        _armazem_respostas.set(chave, texto, ttl=TTL_RESPOSTA_S)
+
+def estatisticas_cache_respostas():
+    """Hits/misses/tamanho do cache de respostas do Gemini."""
+    return _cache_respostas.estatisticas()
+
+# ---- roteador de intenções: uma passada só sobre a mensagem
+# Horizontes e palavras de clima que NÃO podem ser confundidos com nome de lugar
+_H = r"(?:hoje|amanh[aã]|agora|(?:fim\s+de\s+)?semana(?:\s+que\s+vem)?|today|tomorrow|now|week(?:end)?)"
+_ART = r"(?:(?:a|o|n[oa]|esta|essa|nesta|nessa|pr[oó]xima|this|next|de|do|da)\s+){0,2}"
+_NAO_LUGAR = (_ART + r"(?:" + _H + r"|chuva|rain|tempo|clima|temperatura|weather|gera[cç][aã]o"
+              r"|tempestades?|storms?|vento|wind|neve|snow|sol|irradi[aâ]ncia)\b")
+# Conectores que encerram o nome do lugar ("em Lisboa para amanhã", "in Paris for tomorrow")
+_FIM_LUGAR = (r"(?:para|pra|pro|for|durante|during|over|until|at[eé]|"
+              r"(?:de|pela|[àa])\s+(?:manh[aã]|tarde|noite)|(?:esta|essa|nesta|nessa)\s+(?:manh[aã]|tarde|noite)|"
+              r"tonight|right\s+now|in\s+the\s+(?:morning|afternoon|evening)|this\s+(?:morning|afternoon|evening))\b")
+
+_re_intencao = re.compile(
+    r"(?P<semana>\bsemana\b|\bweek(?:end)?\b)"
+    r"|(?P<amanha>\bamanh[aã]\b|\btomorrow\b)"
+    r"|(?P<hoje>\bhoje\b|\bagora\b|\btoday\b|\bnow\b|\btonight\b)"
+    r"|(?P<chover>\bvai\s+chover\b|\bchover[aá]\b|\bchuver[aá]\b|\bser[aá]\s+que\s+(?:vai\s+)?chove\w*"
+    r"|\bvai\s+ter\s+chuva\b|\bguarda[- ]chuvas?\b|\bumbrella\b"
+    r"|\bwill\s+it\s+rain\b|\bis\s+it\s+going\s+to\s+rain\b)"
+    r"|(?P<chuva>\bchuva\b|\brain\b)"
+    r"|(?P<chovendo>\b(?:chove|chovendo|raining|rainy)\b)"
+    r"|(?P<explicar>\bpor\s*qu[eê]\b|\bwhy\b|\bcomo\s+funciona\b|\bhow\s+(?:does|do)\b"
+    r"|\bquanto\s+tempo\b|\bhow\s+long\b|\bdiferen[cç]a\b|\bdifference\b|\bo\s+que\s+[eé]\b|\bwhat\s+is\s+(?:a|an)\b"
+    r"|\bexpli(?:que|car|ca)\b|\bexplain\b|^\s*(?:does|can)\b)"
+    r"|(?P<desempenho>\b(?:rendendo|rendimento|desempenho|performance|performing)\b)"
+    r"|(?P<posse>\b(?:minhas?|meus?|usinas?|my|plants?)\b)"
+    r"|(?P<gerar_futuro>\b(?:vou|vai|vamos|v[aã]o|irei|ir[aá]|iremos)\s+(?:\w+\s+){0,2}?(?:gerar|produzir)\b"
+    r"|\bquanto\b[^?!.;]{0,40}?\b(?:gerar|gerando|produzir|produzindo)\b"
+    r"|\bhow\s+much\b[^?!.;]{0,40}?\b(?:generat\w*|produc\w*)\b"
+    r"|\bwill\s+(?:i|we|my\s+\w+)\s+(?:generate|produce)\b)"
+    r"|(?P<geracao>\b(?:gerar|gerando|gera[cç][aã]o|produzir|produ[cç][aã]o|generate|generation|produce)\b)"
+    r"|(?P<clima>\b(?:tempo|previs[aã]o|weather|forecast)\b)"
+    r"|(?P<sensacao>\b(?:clima|temperatura|temperature|frio|calor|quente|graus|hot|cold|warm|nublado|cloudy|ensolarado|sunny"
+    r"|sol|esfria\w*|esquenta\w*|tempestades?|storms?|vento|ventando|wind|windy|neve|snow)\b)"
+    r"|(?:\b(?:em|no|na|para|in|for|at)\s+|(?<=tempo )de\s+|(?<=previs[aã]o )de\s+)"
+    r"(?!" + _NAO_LUGAR + r")"
+    r"(?P<lugar>[^?!.;]+?)(?=\s*[?!.;]|\s+" + _FIM_LUGAR + r"|\s+" + _ART + _H + r"\b|\s*$)",
+    re.I,
+)
 
-def _resolver_lugar(msg: str):
-    """Detecta cidade no texto; se não houver, usa o primeiro lugar cadastrado."""
-    m = _re_weather.search(msg or "")
-    cidade = (m.group(2).strip() if m else "").strip(", ")
+class Intencao(NamedTuple):
+    tipo: str       # "desempenho" | "geracao" | "semana" | "chuva" | "clima" | "llm"
+    cidade: str     # "" quando a mensagem não cita lugar
+    horizonte: str  # "hoje" | "amanha" | "semana"
+
+def _varrer(msg: str) -> Tuple[set, str]:
+    """Grupos do roteador encontrados na mensagem e o primeiro lugar citado."""
+    achados = set()
+    cidade = ""
+    for m in _re_intencao.finditer(msg or ""):
+        grupo = m.lastgroup
+        achados.add(grupo)
+        if grupo == "lugar" and not cidade:
+            cidade = m.group("lugar").strip(" ,")
+    return achados, cidade
+
+def classificar(msg: str) -> Intencao:
+    """Classifica a mensagem (intenção, lugar e horizonte) numa única varredura."""
+    return _intencao(*_varrer(msg))
+
+def _intencao(achados: set, cidade: str) -> Intencao:
+    if "amanha" in achados:
+        horizonte = "amanha"
+    elif "semana" in achados:
+        horizonte = "semana"
+    else:
+        horizonte = "hoje"
+
+    # 0) Rendimento da usina do usuário ("minha usina está rendendo bem?")
+    if "desempenho" in achados and "posse" in achados:
+        tipo = "desempenho"
+    # 1) Geração solar esperada ("quanto vou gerar amanhã?"): só com pista de
+    #    previsão (verbo no futuro/"quanto" ou horizonte); "o que é geração
+    #    distribuída?" segue para o Gemini
+    elif "gerar_futuro" in achados or ("geracao" in achados and achados & {"hoje", "amanha", "semana"}):
+        tipo = "geracao"
+    # 2) Perguntas explicativas sem pedido de previsão ("por que chove mais no
+    #    verão?", "difference between weather and climate") vão para o Gemini
+    elif "explicar" in achados and not achados & {"hoje", "amanha", "semana", "chover"}:
+        tipo = "llm"
+    # 3) "semana" + assunto de clima → previsão a partir de amanhã (7 dias)
+    elif "semana" in achados and achados & {"clima", "sensacao", "chuva", "chover", "chovendo"}:
+        tipo = "chuva" if achados & {"chover", "chovendo"} else "semana"
+    # 4) Perguntas de chuva ("chove"/"raining" só com lugar ou horizonte)
+    elif "chover" in achados or ("chovendo" in achados and achados & {"lugar", "hoje", "amanha"}):
+        tipo = "chuva"
+    # 5) Pedidos gerais de clima; palavras só de sensação (frio, graus, clima)
+    #    precisam de lugar ou horizonte: "o clima frio afeta os painéis?" não é previsão
+    elif "clima" in achados or ("sensacao" in achados and achados & {"lugar", "hoje", "amanha"}):
+        tipo = "clima"
+    # 6) Caso não seja clima, vai para o Gemini
+    else:
+        tipo = "llm"
+    return Intencao(tipo, cidade if tipo not in ("llm", "desempenho") else "", horizonte)
+
+# Seguimentos: mensagens curtas só com horizonte/lugar/chuva ("e amanhã?", "e em Lisboa?")
+_GRUPOS_SEGUIMENTO = {"semana", "amanha", "hoje", "lugar", "chuva", "chover", "chovendo"}
+_re_seguimento = re.compile(r"^\s*(?:e|and|what\s+about|how\s+about)\b", re.I)
+PALAVRAS_SEGUIMENTO_MAX = 6
+
+def classificar_em_contexto(msg: str, anterior: Optional[Intencao]) -> Intencao:
+    """
+    Como classificar(), mas usando a última pergunta de clima da conversa:
+    um seguimento curto repete a intenção anterior com o horizonte/lugar novos,
+    e perguntas de clima sem lugar ficam no lugar da anterior.
+    """
+    achados, cidade = _varrer(msg)
+    intencao = _intencao(achados, cidade)
+    if anterior is None or anterior.tipo in ("llm", "desempenho") or intencao.tipo == "desempenho":
+        return intencao
+    if intencao.tipo != "llm":
+        return intencao if intencao.cidade else intencao._replace(cidade=anterior.cidade)
+    if not achados or not achados <= _GRUPOS_SEGUIMENTO or len(msg.split()) > PALAVRAS_SEGUIMENTO_MAX:
+        return intencao
+    # só um lugar, sem "e ..." na frente, é pergunta nova ("energia em Portugal")
+    if "lugar" in achados and not _re_seguimento.match(msg):
+        return intencao
+    horizonte = intencao.horizonte if achados & {"semana", "amanha", "hoje"} else anterior.horizonte
+    tipo = anterior.tipo
+    if achados & {"chuva", "chovendo"}:
+        tipo = "chuva"
+    elif tipo in ("clima", "semana"):
+        tipo = "semana" if horizonte == "semana" else "clima"
+    metricas.contar("ia_seguimento")
+    return Intencao(tipo, cidade or anterior.cidade, horizonte)
+
+@metricas.cronometrado("resolver_lugar")
+def _resolver_lugar(cidade: str):
+    """Geocodifica a cidade citada; se não houver, usa o primeiro lugar cadastrado."""
+    cidade = (cidade or "").strip(", ")
 
     if not cidade:
         return lugares_cadastrados[0]
@@ -55,13 +242,23 @@ def _resolver_lugar(msg: str):
         "timezone": place.get("timezone", "auto"),
     }
 
-def _responder_clima(msg: str) -> str:
-    """Resumo agora/hoje."""
-    lugar = _resolver_lugar(msg)
-    hourly, daily = consultar_api(lugar)
+def _responder_clima(lugar, hourly, daily, horizonte: str = "hoje") -> str:
+    """Resumo agora/hoje (ou amanhã, se pedido)."""
     if hourly is None or daily is None or daily.empty:
         return "Não consegui obter a previsão agora. Tente novamente em instantes."
 
+    nome_exib = lugar.get("nome", "local")
+
+    if horizonte == "amanha" and len(daily) >= 2:
+        amanha = daily.iloc[1]
+        tmin = float(amanha.get("temperature_2m_min", float("nan")))
+        tmax = float(amanha.get("temperature_2m_max", float("nan")))
+        chuva = float(amanha.get("precipitation_sum", 0.0))
+        return (
+            f"**{nome_exib}**\n"
+            f"- Amanhã: **mín {tmin:.1f}°C / máx {tmax:.1f}°C**, chuva **{chuva:.1f} mm**"
+        )
+
     # Agora (hora mais próxima no fuso local retornado)
     now = pd.Timestamp.now(tz=hourly["date"].dt.tz)
     idx = (hourly["date"] - now).abs().idxmin()
@@ -73,7 +270,6 @@ def _responder_clima(msg: str) -> str:
     tmax = float(hoje.get("temperature_2m_max", float("nan")))
     chuva = float(hoje.get("precipitation_sum", 0.0))
 
-    nome_exib = lugar.get("nome", "local")
     return (
         f"**{nome_exib}**\n"
         f"- Agora: **{temp_now:.1f}°C**\n"
@@ -84,9 +280,7 @@ def _responder_clima(msg: str) -> str:
 _DIAS_PT = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
 
 # previsão da semana (OPÇÃO B – lista Markdown, a partir de amanhã)
-def _previsao_semana(msg: str) -> str:
-    lugar = _resolver_lugar(msg)  # função que resolve "São Paulo, Brasil" etc.
-    hourly, daily = consultar_api(lugar)
+def _previsao_semana(lugar, hourly, daily, horizonte: str = "semana") -> str:
     if daily is None or daily.empty:
         return "Não consegui obter a previsão da semana agora."
 
@@ -121,20 +315,17 @@ def _previsao_semana(msg: str) -> str:
     )
 
 # “vai chover?” hoje/amanhã/semana
-def _vai_chover(msg: str) -> str:
-    texto = (msg or "").lower()
-    lugar = _resolver_lugar(msg)
-    hourly, daily = consultar_api(lugar)
+def _vai_chover(lugar, hourly, daily, horizonte: str = "hoje") -> str:
     if (hourly is None) and (daily is None):
         return "Não consegui verificar a chuva agora."
     limiar = 0.2  # mm
 
-    if "amanhã" in texto or "amanha" in texto:
+    if horizonte == "amanha":
         if daily is None or len(daily) < 2:
             return "Não consegui calcular para amanhã."
         chuva = float((daily.iloc[1].get("precipitation_sum") or 0))
         return f"{'Sim' if chuva > limiar else 'Não'} deve chover **amanhã** em {lugar['nome']}."
-    elif "semana" in texto:
+    elif horizonte == "semana":
         if daily is None or daily.empty:
             return "Não consegui calcular para esta semana."
         tz = daily["date"].dt.tz
@@ -150,29 +341,198 @@ def _vai_chover(msg: str) -> str:
         chuva = float(hourly["precipitation"].fillna(0).sum())
         return f"{'Sim' if chuva > limiar else 'Não'} deve chover **hoje** em {lugar['nome']}."
 
-# ---- regex simples para detectar intenção de "semana"
-_re_semana = re.compile(r"\b(?:esta|essa|pr[oó]xima)?\s*semana\b", re.I)
-
-# Função que recebe uma mensagem (msg) e retorna a resposta do Gemini
-def ia(msg: str) -> str:
-    try:
-        txt = msg.lower()
+# “quanto vou gerar?” hoje/amanhã/semana (estimativa a partir da irradiância)
+def _responder_geracao(lugar, horizonte: str = "hoje", sistema=None) -> str:
+    sistema = sistema or SISTEMA_PADRAO
+    geracao = previsao_geracao(lugar, sistema)
+    if geracao is None or geracao.empty:
+        return "Não consegui estimar a geração agora."
+
+    diaria = geracao_diaria(geracao)
+    por_dia = dict(zip(diaria["dia"], diaria["kwh"]))
+    hoje = pd.Timestamp.now(tz=geracao["date"].dt.tz).normalize()
+    kwp = float(sistema.get("kwp", SISTEMA_PADRAO["kwp"]))
+
+    if horizonte == "semana":
+        linhas = []
+        for i in range(1, 8):
+            d = (hoje + pd.Timedelta(days=i)).normalize()
+            if d in por_dia:
+                linhas.append(f"- {_DIAS_PT[d.weekday()]} {d.strftime('%d/%m')}: {por_dia[d]:.1f} kWh")
+        total = sum(por_dia.get((hoje + pd.Timedelta(days=i)).normalize(), 0.0) for i in range(1, 8))
+        return (
+            f"Geração prevista em **{lugar['nome']}** ({kwp:.1f} kWp, próx. 7 dias):\n\n"
+            + "\n".join(linhas)
+            + f"\n\nTotal: **{total:.0f} kWh**."
+        )
+
+    dia = (hoje + pd.Timedelta(days=1)).normalize() if horizonte == "amanha" else hoje
+    rotulo = "amanhã" if horizonte == "amanha" else "hoje"
+    if dia not in por_dia:
+        return f"Não há previsão de irradiância para {rotulo}."
+    do_dia = geracao.loc[geracao["date"].dt.normalize() == dia]
+    pico = do_dia.loc[do_dia["kwh"].idxmax()]
+    return (
+        f"Geração prevista **{rotulo}** em **{lugar['nome']}** ({kwp:.1f} kWp): "
+        f"**{por_dia[dia]:.1f} kWh**, com pico de {float(pico['kwh']):.2f} kWh "
+        f"por volta das {(pico['date'] - pd.Timedelta(hours=1)).strftime('%Hh')}."
+    )
 
-        # 1) "semana" → mostra PREVISÃO A PARTIR DE AMANHÃ (7 dias)
-        if _re_semana.search(txt) and any(w in txt for w in ["tempo", "temperatura", "previs", "clima", "chuva"]):
-            return _previsao_semana(msg)
+# “minha usina está rendendo bem?” (lê o estado do detector; nada é recalculado)
+def _responder_desempenho(usinas=None) -> str:
+    if not usinas:
+        return "Entre na sua conta SEMS na aba **Minha usina** para eu acompanhar o rendimento."
+    import desempenho
+    diagnosticos = desempenho.monitor().diagnosticos(usinas)
+    if not diagnosticos:
+        return "Ainda não tenho medições das suas usinas. Clique em **Atualizar usinas** na aba Minha usina."
+    nomes = usinas if isinstance(usinas, dict) else None
+    return "Rendimento medido x esperado pela irradiância:\n\n" + desempenho.texto_diagnostico(diagnosticos, nomes)
+
+# Formatador de cada intenção de clima (todos recebem a mesma previsão)
+_FORMATADORES = {
+    "semana": _previsao_semana,
+    "chuva": _vai_chover,
+    "clima": _responder_clima,
+}
+
+def _responder_intencao_clima(intencao: Intencao, sistema=None, usinas=None) -> str:
+    """Resolve o lugar, busca a previsão UMA vez só e formata a resposta."""
+    if intencao.tipo == "desempenho":
+        return _responder_desempenho(usinas)
+    lugar = _resolver_lugar(intencao.cidade)
+    if intencao.tipo == "geracao":
+        return _responder_geracao(lugar, intencao.horizonte, sistema)
+    hourly, daily = consultar_api(lugar)
+    return _FORMATADORES[intencao.tipo](lugar, hourly, daily, intencao.horizonte)
 
-        # 2) Perguntas de chuva
-        if re.search(r"\bvai chover\b|\bchoverá\b|\bchuverá\b", txt):
-            return _vai_chover(msg)
+def _texto_parte(parte) -> str:
+    # pedaços sem texto (ex.: só metadados de segurança) fazem .text lançar ValueError
+    try:
+        return parte.text or ""
+    except ValueError:
+        return ""
+
+def _gerar_resposta(conteudo, chave: str, modelo=None, guardar: bool = True) -> str:
+    if guardar:
+        texto = _cache_respostas.get(chave)   # outra sessão pode ter acabado de responder
+        if texto is not None:
+            return texto
+    _aguardar_orcamento_llm()
+    try:
+        with metricas.span("llm"):
+            texto = (modelo or get_llm()).generate_content(conteudo).text
+    except Exception as e:
+        metricas.contar("llm_falha")
+        raise FalhaLLM(str(e)) from e
+    if guardar:
+        _guardar_resposta(chave, texto)
+    return texto
+
+# Pistas de que a pergunta depende da conversa ("e por quê?", "explique isso melhor")
+_re_referencia = re.compile(
+    r"\b(?:isso|isto|disso|nisso|desse|dessa|deste|desta|aquilo|anterior|acima|ele|ela|eles|elas"
+    r"|por\s*qu[eê]|that|this|those|these|it|them|why|above|previous)\b",
+    re.I,
+)
 
-        # 3) Pedidos gerais de clima/temperatura (hoje/agora)
-        if re.search(r"\b(tempo|previs[aã]o|clima|temperatura)\b", txt):
-            return _responder_clima(msg)
+def _depende_da_conversa(msg: str) -> bool:
+    return bool(_re_seguimento.match(msg) or _re_referencia.search(msg))
+
+def _preparar_llm(msg: str, contexto=None):
+    """
+    (conteúdo, chave, usa_cache). Pergunta autossuficiente (nenhum turno do
+    Gemini na sessão e sem pista de seguimento) vai sozinha e passa pelo
+    cache de respostas. Nos demais casos a resposta depende da conversa: o
+    contexto vai junto, a chave é o hash do prompt (só junta envios iguais
+    simultâneos) e nada é lido nem gravado no cache compartilhado.
+    """
+    if contexto is None or (not contexto.turnos and not _depende_da_conversa(msg)):
+        return msg, _chave_resposta(msg), True
+    conteudo = contexto.montar(msg)
+    metricas.contar("llm_com_contexto")
+    metricas.contar("llm_contexto_tokens", contexto.tokens)
+    bruto = repr(conteudo).encode()
+    return conteudo, f"{MODELO_ESCOLHIDO}|ctx|{hashlib.sha1(bruto).hexdigest()}", False
+
+def _intencao_da_sessao(msg: str, contexto=None) -> Intencao:
+    anterior = contexto.ultima_intencao if contexto is not None else None
+    return classificar_em_contexto(msg, anterior) if anterior else classificar(msg)
+
+# Igual a ia(), mas sem engolir erros: quem chama (a API) decide o que fazer
+# com OrcamentoEsgotado e FalhaLLM.
+def responder(msg: str, modelo=None, sistema=None, usinas=None, contexto=None) -> str:
+    intencao = _intencao_da_sessao(msg, contexto)
+
+    # Caso não seja clima, delega ao Gemini (se não estiver no cache)
+    if intencao.tipo == "llm":
+        conteudo, chave, usa_cache = _preparar_llm(msg, contexto)
+        texto = _resposta_cacheada(chave) if usa_cache else None
+        if texto is None:
+            texto = _voo_respostas.executar(chave, lambda: _gerar_resposta(conteudo, chave, modelo, usa_cache))
+        if contexto is not None:
+            contexto.registrar(msg, texto)
+        return texto
+
+    texto = _responder_intencao_clima(intencao, sistema, usinas)
+    if contexto is not None:
+        contexto.registrar_ferramenta(msg, intencao, texto)
+    return texto
+
+# Função que recebe uma mensagem (msg) e retorna a resposta do Gemini.
+# `contexto` (conversa.ContextoConversa) é a conversa da sessão: vai junto ao
+# Gemini e é atualizado com a resposta.
+def ia(msg: str, modelo=None, sistema=None, usinas=None, contexto=None) -> str:
+    try:
+        return responder(msg, modelo, sistema, usinas, contexto)
+    except Exception as e:
+        return f"Desculpe, ocorreu um erro ao processar sua solicitação: {e}"
 
-        # 4) Caso não seja clima, delega ao Gemini
-        resposta = llm.generate_content(msg)
-        return resposta.text
+def ia_stream(msg: str, modelo=None, sistema=None, usinas=None, contexto=None) -> Iterator[str]:
+    """
+    Versão em streaming de ia(): devolve a resposta em pedaços.
+    Perguntas de clima saem de uma vez (já são rápidas); as demais vêm do
+    Gemini conforme são geradas (ou do cache de respostas). `modelo` permite usar um modelo falso
+    (qualquer objeto com generate_content(msg, stream=True)); `sistema` é a
+    configuração fotovoltaica usada nas perguntas de geração; `usinas` são
+    as usinas do SEMS da sessão ({id: nome}), para as perguntas de rendimento;
+    `contexto` é a conversa da sessão (ContextoConversa), atualizada ao fim.
+    """
+    try:
+        intencao = _intencao_da_sessao(msg, contexto)
+
+        if intencao.tipo != "llm":
+            texto = _responder_intencao_clima(intencao, sistema, usinas)
+            if contexto is not None:
+                contexto.registrar_ferramenta(msg, intencao, texto)
+            yield texto
+            return
+
+        conteudo, chave, usa_cache = _preparar_llm(msg, contexto)
+        texto = _resposta_cacheada(chave) if usa_cache else None
+        if texto is not None:
+            if contexto is not None:
+                contexto.registrar(msg, texto)
+            yield texto
+            return
+
+        _aguardar_orcamento_llm()
+        partes = []
+        t0 = time.perf_counter()
+        for parte in (modelo or get_llm()).generate_content(conteudo, stream=True):
+            texto = _texto_parte(parte)
+            if texto:
+                if not partes:
+                    metricas.observar("llm_primeiro_pedaco", time.perf_counter() - t0)
+                partes.append(texto)
+                yield texto
+        metricas.observar("llm", time.perf_counter() - t0)
+        # só guarda respostas que chegaram inteiras
+        texto = "".join(partes)
+        if usa_cache:
+            _guardar_resposta(chave, texto)
+        if contexto is not None and texto:
+            contexto.registrar(msg, texto)
 
     except Exception as e:
-        return f"Desculpe, ocorreu um erro ao processar sua solicitação: {e}"
+        yield f"Desculpe, ocorreu um erro ao processar sua solicitação: {e}"
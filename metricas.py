@@ -0,0 +1,243 @@
+"""
+Métricas leves por etapa (geocode, previsão, conversão, LLM, gráficos...).
+
+- `span("etapa")`: mede o tempo de um bloco `with` e acumula num histograma;
+- `cronometrado("etapa")`: o mesmo, como decorador;
+- `contar("evento")`: contadores (hits de cache, erros HTTP...);
+- `resumo()`: p50/p95/p99 por etapa e contadores, para o painel de diagnóstico;
+- `texto_prometheus()` / `iniciar_exportador(porta)`: formato texto do Prometheus.
+
+Com METRICAS=0 os spans viram um objeto vazio reaproveitado e os contadores
+retornam na hora: o custo por chamada fica em uma checagem de booleano.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Optional
+
+ATIVO = os.getenv("METRICAS", "1") == "1"
+PREFIXO = "painel_solar"
+
+# limites dos buckets do histograma (segundos), no estilo do Prometheus
+BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AMOSTRAS_PERCENTIL = 2048   # janela recente usada nos percentis
+
+
+class _Histograma:
+    __slots__ = ("contagens", "soma", "n", "recentes")
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS_S) + 1)   # último = +Inf
+        self.soma = 0.0
+        self.n = 0
+        self.recentes = deque(maxlen=AMOSTRAS_PERCENTIL)
+
+    def observar(self, segundos: float) -> None:
+        self.contagens[bisect_left(BUCKETS_S, segundos)] += 1
+        self.soma += segundos
+        self.n += 1
+        self.recentes.append(segundos)
+
+
+_histogramas: Dict[str, _Histograma] = {}
+_contadores: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def observar(etapa: str, segundos: float) -> None:
+    """Registra uma duração já medida."""
+    if not ATIVO:
+        return
+    with _lock:
+        h = _histogramas.get(etapa)
+        if h is None:
+            h = _histogramas[etapa] = _Histograma()
+        h.observar(segundos)
+
+
+def contar(evento: str, n: float = 1) -> None:
+    if not ATIVO:
+        return
+    with _lock:
+        _contadores[evento] = _contadores.get(evento, 0) + n
+
+
+class _Span:
+    __slots__ = ("etapa", "t0")
+
+    def __init__(self, etapa: str):
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, *_):
+        observar(self.etapa, time.perf_counter() - self.t0)
+        if tipo is not None:
+            contar(f"{self.etapa}_erro")
+        return False
+
+
+class _SpanVazio:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_VAZIO = _SpanVazio()
+
+
+def span(etapa: str):
+    """Context manager que mede o bloco e registra em `etapa`."""
+    return _Span(etapa) if ATIVO else _VAZIO
+
+
+def cronometrado(etapa: str):
+    """Decorador: mede cada chamada da função em `etapa`."""
+    def decorador(func):
+        if not ATIVO:
+            return func
+
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            with _Span(etapa):
+                return func(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+# ------------------ LEITURA ------------------ #
+def _percentil(ordenados, p: float) -> Optional[float]:
+    if not ordenados:
+        return None
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def resumo() -> Dict[str, Dict]:
+    """{"etapas": {etapa: n, p50/p95/p99 em ms}, "contadores": {...}}."""
+    with _lock:
+        copia = {k: (h.n, h.soma, sorted(h.recentes)) for k, h in _histogramas.items()}
+        contadores = dict(_contadores)
+    etapas = {}
+    for etapa, (n, soma, ordenados) in sorted(copia.items()):
+        etapas[etapa] = {
+            "n": n,
+            "media_ms": round(soma / n * 1000, 2) if n else None,
+            **{f"p{p}_ms": round(_percentil(ordenados, p) * 1000, 2) for p in (50, 95, 99)},
+        }
+    return {"etapas": etapas, "contadores": dict(sorted(contadores.items()))}
+
+
+def limpar() -> None:
+    with _lock:
+        _histogramas.clear()
+        _contadores.clear()
+
+
+def texto_prometheus() -> str:
+    """Todas as métricas no formato de exposição em texto do Prometheus."""
+    nome_h = f"{PREFIXO}_etapa_segundos"
+    nome_c = f"{PREFIXO}_eventos_total"
+    linhas = [
+        f"# HELP {nome_h} Duração das etapas do painel.",
+        f"# TYPE {nome_h} histogram",
+    ]
+    with _lock:
+        hist = {k: (list(h.contagens), h.soma, h.n) for k, h in _histogramas.items()}
+        contadores = dict(_contadores)
+    for etapa, (contagens, soma, n) in sorted(hist.items()):
+        acumulado = 0
+        for limite, c in zip(BUCKETS_S + (float("inf"),), contagens):
+            acumulado += c
+            le = "+Inf" if limite == float("inf") else repr(limite)
+            linhas.append(f'{nome_h}_bucket{{etapa="{etapa}",le="{le}"}} {acumulado}')
+        linhas.append(f'{nome_h}_sum{{etapa="{etapa}"}} {soma:.6f}')
+        linhas.append(f'{nome_h}_count{{etapa="{etapa}"}} {n}')
+    linhas += [f"# HELP {nome_c} Contadores de eventos do painel.", f"# TYPE {nome_c} counter"]
+    for evento, valor in sorted(contadores.items()):
+        linhas.append(f'{nome_c}{{evento="{evento}"}} {valor:g}')
+    return "\n".join(linhas) + "\n"
+
+
+# ------------------ MEMÓRIA ------------------ #
+def bytes_aproximados(obj, ignorar_ids=frozenset(), _vistos=None) -> int:
+    """
+    Tamanho aproximado de `obj` e do que ele referencia (DataFrames pelo
+    memory_usage(deep=True), arrays pelo nbytes). Objetos cujo id está em
+    `ignorar_ids` (compartilhados entre sessões) não entram na conta.
+    """
+    vistos = set() if _vistos is None else _vistos
+    if id(obj) in vistos or id(obj) in ignorar_ids:
+        return 0
+    vistos.add(id(obj))
+
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):     # DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "nbytes") and hasattr(obj, "dtype"):             # ndarray
+        return int(obj.nbytes)
+    total = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return total
+    if isinstance(obj, dict):
+        itens = list(obj.keys()) + list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        itens = list(obj)
+    elif hasattr(obj, "__dict__"):
+        itens = [vars(obj)]
+    elif hasattr(obj, "__slots__"):
+        itens = [getattr(obj, s, None) for s in obj.__slots__]
+    else:
+        itens = []
+    return total + sum(bytes_aproximados(i, ignorar_ids, vistos) for i in itens)
+
+
+def memoria_processo_mb() -> Optional[float]:
+    """Pico de memória residente do processo (MB), quando o SO informa."""
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ------------------ EXPORTADOR ------------------ #
+_exportador = None
+
+
+def iniciar_exportador(porta: int, host: str = "127.0.0.1"):
+    """Sobe (uma vez por processo) um servidor HTTP local com /metrics."""
+    global _exportador
+    if _exportador is not None:
+        return _exportador
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = texto_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    _exportador = ThreadingHTTPServer((host, porta), Handler)
+    _exportador.daemon_threads = True
+    threading.Thread(target=_exportador.serve_forever, name="metricas", daemon=True).start()
+    return _exportador